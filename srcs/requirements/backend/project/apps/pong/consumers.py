@@ -1,25 +1,56 @@
 import asyncio
 import json
 import logging
-import struct
+import random
+import secrets
+import time
+from pathlib import Path
+from urllib.parse import parse_qs
 
-from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings as django_settings
 
 from .services import (
     GameState,
     Ball,
     Paddle,
     Score,
+    FrameEncoder,
+    OutboundQueue,
+    OutboundQueueFullError,
+    SendRateController,
+    GameRoom,
+    GameReplay,
+    AiController,
+    get_local_room,
+    find_room,
+    join_room,
+    leave_room,
+    encode_error,
+    encode_ping,
+    decode_input,
+    game_scheduler,
+    game_log,
+    tournament_results,
+    INPUT_METRICS,
+    InvalidInputError,
+    INPUT_UPDATE_PADDLE_OPCODE,
+    INPUT_PONG_OPCODE,
+    GAME_TICK_RATE,
+    GAME_PING_INTERVAL,
+    OUTBOUND_MAX_UNACKED_BYTES,
+    GAME_IDLE_TIMEOUT,
+    GAME_ABANDON_TIMEOUT,
+    SPECTATOR_FRAME_RATES,
+    ROOM_NOT_FOUND_CLOSE_CODE,
     GAME_STATUS_INIT,
     GAME_STATUS_IDLE,
     GAME_STATUS_IN_PROGRESS,
     GAME_STATUS_ENDED,
     GAME_STATUS_PAUSED,
-    GAME_ERROR_MESSAGE_TYPE,
-    GAME_STATE_UPDATE_INTERVAL,
     BALL_DEFAULT_WIDTH,
     BALL_DEFAULT_HEIGHT,
+    AI_DEFAULT_DIFFICULTY,
 )
 
 logger = logging.getLogger("game_logs")
@@ -32,73 +63,122 @@ class PongConsumer(AsyncWebsocketConsumer):
         self.game_mode = None
         self.ball = None
         self.paddles = {}
+        self.paddle_list = []
+        self.ai_controllers = {}  # paddle index -> AiController
+        self.tick = 0
         self.score = None
+        self.frame_encoder = None
+        self.outbound = OutboundQueue(
+            self.write, max_unacked_bytes=OUTBOUND_MAX_UNACKED_BYTES
+        )
+        self.send_rate = SendRateController()
+        self.last_ping_tick = 0
+        self.room = None
+        self.replay = None
         self.are_dimensions_set = False
-        self.game_update_task = None
-        self.paddle_update_task = None
-        self.pause_event = asyncio.Event()
-        self.pause_event.set()
+        self.is_paused = False
+        self.is_idle = False
+        self.is_client_visible = True
+        self.last_input_tick = 0
+        self.rest_started_at = None  # when the game stopped being simulated
         self.tournament_id = None
         self.players = {}
         self.is_tournament_updated = False
+        self.action_handlers = {
+            "update_dimensions": self.handle_update_dimensions,
+            "start": self.handle_start,
+            "pause": self.handle_pause,
+            "resume": self.handle_resume,
+            "stop": self.handle_stop,
+            "visibility": self.handle_visibility,
+            "update_paddle": self.handle_paddle,
+        }
+        self.input_handlers = {
+            INPUT_UPDATE_PADDLE_OPCODE: self.handle_paddle_input,
+            INPUT_PONG_OPCODE: self.handle_pong,
+        }
 
     async def connect(self):
         self.game_state = GameState()
         self.ball = Ball()
         await self.accept()
+        self.outbound.start()
         await self.set_game_status(GAME_STATUS_IDLE)
         logger.info("✓ Pong WebSocket Connected")
 
     async def disconnect(self, close_code):
-        if self.game_update_task:
-            self.game_update_task.cancel()
+        if game_scheduler.has_game(self):
+            game_scheduler.remove_game(self)
             await self.set_game_status(GAME_STATUS_ENDED)
-        logger.debug("ⓘ Pong WebSocket Disconnected")
+        await self.close_room()
+        self.release_game()
+        await self.outbound.stop()
+        logger.debug(
+            f"ⓘ Pong WebSocket Disconnected. Outbound: {self.outbound.get_stats()}, "
+            f"send rate: {self.send_rate.get_stats()}"
+        )
 
-    async def receive(self, text_data=None, bytes_data=None):
+    async def send(self, text_data=None, bytes_data=None):
+        # Never wait on the client here: messages are queued for the writer task
         try:
-            data = json.loads(text_data)
-            action = data.get("action")
-
-            if action == "update_dimensions":
-                await self.handle_update_dimensions(data)
-
-            elif action == "start":
-                self.pause_event.set()
-                await self.handle_start(data)
+            self.outbound.put(text_data=text_data, bytes_data=bytes_data)
+        except OutboundQueueFullError as e:
+            logger.error(f"✕ Closing connection of slow client: {e}")
+            game_scheduler.remove_game(self)
+            await self.close_room()
+            self.release_game()
+            await self.outbound.stop()
+            await self.close(code=1013)
+
+    async def write(self, text_data=None, bytes_data=None):
+        await super().send(text_data=text_data, bytes_data=bytes_data)
 
-            elif action == "pause":
-                self.pause_event.clear()
-                await self.set_game_status(GAME_STATUS_PAUSED)
+    async def receive(self, text_data=None, bytes_data=None):
+        if bytes_data is not None:
+            await self.receive_input(bytes_data)
+            return
 
-            elif action == "resume":
-                self.pause_event.set()
-                await self.set_game_status(GAME_STATUS_IN_PROGRESS)
+        try:
+            data = json.loads(text_data)
+        except json.JSONDecodeError:
+            await self.send(text_data=json.dumps({"error": "Invalid JSON"}))
+            return
 
-            elif action == "stop":
-                self.pause_event.set()
-                await self.handle_stop()
+        handler = self.action_handlers.get(data.get("action"))
+        if handler is None:
+            await self.send(text_data=json.dumps({"error": "Unknown action"}))
+            return
 
-            elif action == "update_paddle":
-                await self.handle_paddle(data)
+        await handler(data)
 
-            else:
-                await self.send(text_data=json.dumps({"error": "Unknown action"}))
+    async def receive_input(self, bytes_data):
+        # Paddle inputs skip JSON entirely: fixed size struct, opcode dispatch
+        try:
+            opcode, paddle_index, direction, sequence = decode_input(bytes_data)
+        except InvalidInputError as e:
+            await self.send_game_error(str(e))
+            return
 
-        except json.JSONDecodeError:
-            await self.send(text_data=json.dumps({"error": "Invalid JSON"}))
+        handler = self.input_handlers.get(opcode)
+        if handler is None:
+            await self.send_game_error(f"Unknown input opcode: {opcode}")
+            return
 
-    async def update_tournament(self):
-        from project.apps.tournaments.services import update_bracket
+        INPUT_METRICS[opcode].inc()
+        handler(paddle_index, direction, sequence)
 
-        score = self.score.get_score()
-        winner = score.get("winner")
-        winner_name = self.players[winner][0]
+    def report_tournament_result(self):
+        score = self.score
+        winner_name = self.players[score.winner][0]
+        loser_name = self.players[3 - score.winner][0]
 
-        await sync_to_async(update_bracket)(
+        # Applied in the background: one result per match, however reported
+        tournament_results.submit(
+            (self.tournament_id, frozenset((winner_name, loser_name))),
             self.tournament_id,
             winner_name,
-            {"left": score.get("left"), "right": score.get("right")},
+            loser_name,
+            {"left": score.left, "right": score.right},
         )
 
     async def handle_update_dimensions(self, data):
@@ -106,15 +186,42 @@ class PongConsumer(AsyncWebsocketConsumer):
             data.get("ball_width", BALL_DEFAULT_WIDTH),
             data.get("ball_height", BALL_DEFAULT_HEIGHT),
         )
+        if self.replay and game_scheduler.has_game(self):
+            self.replay.record_dimensions(self.tick, self.ball.width, self.ball.height)
 
         if not self.are_dimensions_set:
             self.are_dimensions_set = True
             logger.info("✓ Dimensions set successfully")
             await self.send_game_state()
 
+    async def handle_pause(self, data):
+        self.is_paused = True
+        self.update_rest()
+        await self.set_game_status(GAME_STATUS_PAUSED)
+
+    async def handle_resume(self, data):
+        self.is_paused = False
+        self.update_rest()
+        await self.set_game_status(GAME_STATUS_IN_PROGRESS)
+
+    async def handle_visibility(self, data):
+        # A hidden tab renders nothing: its game rests until it is shown again
+        self.is_client_visible = bool(data.get("visible", True))
+        if game_scheduler.has_game(self):
+            self.is_idle = not self.is_client_visible
+            self.last_input_tick = self.tick
+            self.update_rest()
+
     async def handle_start(self, data):
         logger.debug(f"ⓘ Game Settings: {data}")
 
+        self.is_paused = False
+        self.is_idle = not self.is_client_visible
+        self.rest_started_at = None
+        self.tick = 0
+        self.last_input_tick = 0
+        self.last_ping_tick = 0
+
         await self.set_game_status(GAME_STATUS_INIT)
 
         self.players = {1: [], 2: []}
@@ -172,8 +279,11 @@ class PongConsumer(AsyncWebsocketConsumer):
             return
 
         self.paddles = {}
+        self.paddle_list = []
+        self.ai_controllers = {}
         try:
             self.paddles = {}
+            ai_difficulties = {}
             for ctrl in controllers:
                 paddle_name = ctrl["name"]
                 paddle_side = ctrl["side"]
@@ -182,7 +292,20 @@ class PongConsumer(AsyncWebsocketConsumer):
                 else:
                     self.players[2].append(paddle_name)
                 self.paddles[paddle_name] = Paddle(name=paddle_name, side=paddle_side)
+                if ctrl.get("controlled_by") == "ai":
+                    ai_difficulties[paddle_name] = ctrl.get(
+                        "difficulty", AI_DEFAULT_DIFFICULTY
+                    )
                 logger.info(f"✓ Created paddle: {paddle_name}")
+            # Binary inputs address paddles by their index in the controllers list
+            self.paddle_list = list(self.paddles.values())
+            # AI paddles are driven by the server, their client inputs are ignored
+            self.ai_controllers = {
+                index: AiController(paddle, ai_difficulties[paddle.name])
+                for index, paddle in enumerate(self.paddle_list)
+                if paddle.name in ai_difficulties
+            }
+            self.frame_encoder = FrameEncoder(len(self.paddles))
         except Exception as e:
             logger.error(f"✕ Failed to create paddles: {e}")
             await self.set_game_status(GAME_STATUS_IDLE)
@@ -190,13 +313,13 @@ class PongConsumer(AsyncWebsocketConsumer):
             return
 
         try:
-            if self.game_update_task:
+            if game_scheduler.has_game(self):
                 self.ball.reset(self.game_mode)
                 for paddle in self.paddles.values():
                     paddle.reset()
-                self.game_update_task.cancel()
+                game_scheduler.remove_game(self)
                 logger.info(
-                    "✓ Game update loop canceled as part of initializing a new loop process"
+                    "✓ Game removed from scheduler as part of initializing a new game"
                 )
                 await self.set_game_status(GAME_STATUS_ENDED)
         except Exception as e:
@@ -208,11 +331,14 @@ class PongConsumer(AsyncWebsocketConsumer):
             return
 
         try:
-            self.game_update_task = asyncio.create_task(self.game_update_loop())
+            await self.open_room()
+            self.start_replay(settings.get("game"))
+            game_scheduler.add_game(self)
+            self.update_rest()
             await self.set_game_status(GAME_STATUS_IN_PROGRESS)
-            logger.info("✓ Game update loop started")
+            logger.info("✓ Game added to scheduler")
         except Exception as e:
-            logger.error(f"✕ Failed to start new game update loop: {e}")
+            logger.error(f"✕ Failed to add game to scheduler: {e}")
             await self.set_game_status(GAME_STATUS_IDLE)
             await self.send(
                 text_data=json.dumps({"error": "Failed to start game loop"})
@@ -221,105 +347,363 @@ class PongConsumer(AsyncWebsocketConsumer):
     async def handle_paddle(self, data):
         paddle_name = data.get("name")
         direction = data.get("direction", 0)
+        sequence = data.get("sequence")
 
         if paddle_name in self.paddles:
-            self.paddles[paddle_name].set_direction(direction)
+            paddle = self.paddles[paddle_name]
+            paddle_index = self.paddle_list.index(paddle)
+            if paddle_index in self.ai_controllers:
+                return
+            if sequence is None:
+                paddle.set_direction(direction)
+            elif not paddle.apply_input(direction, sequence):
+                return
+            self.record_input(paddle_index)
+            self.record_activity()
+
+    def handle_paddle_input(self, paddle_index, direction, sequence):
+        # Stale or duplicated inputs are dropped, the frame ack tells the client
+        if (
+            paddle_index < len(self.paddle_list)
+            and paddle_index not in self.ai_controllers
+        ):
+            if self.paddle_list[paddle_index].apply_input(direction, sequence):
+                self.record_input(paddle_index)
+                self.record_activity()
+
+    def handle_pong(self, paddle_index, direction, ping_id):
+        self.send_rate.receive_pong(ping_id, time.monotonic())
+        self.outbound.acknowledge(ping_id)
+
+    def record_activity(self):
+        # Any player input brings an idle game back to full rate
+        self.last_input_tick = self.tick
+        if self.is_idle and self.is_client_visible:
+            self.is_idle = False
+            self.update_rest()
+            logger.debug("ⓘ Player input received, game is active again")
+
+    def update_rest(self):
+        # Paused and idle games are not simulated, and are stopped once abandoned
+        if self.is_paused or self.is_idle:
+            if self.rest_started_at is None:
+                self.rest_started_at = time.monotonic()
+        else:
+            self.rest_started_at = None
+            game_scheduler.wake()
+
+    def release_game(self):
+        # Per game state that is only needed while the game is simulated
+        self.ai_controllers = {}
+        self.frame_encoder = None
+        self.is_paused = False
+        self.is_idle = False
+        self.rest_started_at = None
+
+    def start_replay(self, game):
+        # Seeding the ball is all it takes to make the game reproducible
+        seed = secrets.randbits(64)
+        self.ball.rng = random.Random(seed)
+        score_settings = None
+        if self.score and game:
+            score_settings = (self.score.end_score, self.score.is_deuce_on)
+        self.replay = GameReplay(
+            seed,
+            self.game_mode,
+            [(paddle.name, paddle.side) for paddle in self.paddle_list],
+            score_settings,
+            self.ball.get_state(),
+        )
+
+    def record_input(self, paddle_index):
+        if self.replay:
+            paddle = self.paddle_list[paddle_index]
+            self.replay.record_input(
+                self.tick, paddle_index, paddle.direction, paddle.input_sequence
+            )
+
+    async def save_replay(self, game_id):
+        replay, self.replay = self.replay, None
+        if not (replay and replay.ticks and django_settings.GAME_REPLAY_DIR):
+            return
+
+        path = Path(django_settings.GAME_REPLAY_DIR) / f"{game_id}.replay"
+        try:
+            data = replay.to_bytes()
+            await asyncio.to_thread(path.write_bytes, data)
+            logger.info(f"✓ Replay saved: {path} ({len(data)} bytes)")
+        except OSError as e:
+            logger.error(f"✕ Failed to save replay: {e}")
 
-    async def handle_stop(self):
-        if self.game_update_task:
-            self.game_update_task.cancel()
+    async def handle_stop(self, data=None):
+        game_scheduler.remove_game(self)
+        self.release_game()
 
         self.score = None
 
         await self.set_game_status(GAME_STATUS_ENDED)
+        await self.close_room()
         await self.set_game_status(GAME_STATUS_IDLE)
 
+    async def end_game(self):
+        # The match has a winner: nothing is left to simulate or stream
+        game_scheduler.remove_game(self)
+        self.release_game()
+        logger.info(f"✓ Game ended, winner: {self.score.winner}")
+
+        # The last frame is sent: put the ball back on court for the next match
+        self.ball.reset(self.game_mode)
+        for paddle in self.paddles.values():
+            paddle.reset()
+
+        if self.tournament_id and not self.is_tournament_updated:
+            # Never block the shared tick loop on the database
+            self.report_tournament_result()
+            self.is_tournament_updated = True
+
+        await self.set_game_status(GAME_STATUS_ENDED)
+        await self.close_room()
+
+    async def open_room(self):
+        # Each started game gets a new room, owned by this process
+        await self.close_room()
+        self.room = GameRoom(self.channel_layer, on_subscribe=self.welcome_subscriber)
+        await self.room.open(self.channel_name)
+
+    async def close_room(self):
+        if self.room is not None:
+            await self.save_replay(self.room.game_id)
+            await self.room.close()
+            self.room = None
+
+    async def room_subscribe(self, event):
+        if self.room is not None:
+            await self.room.subscribe(event.get("rate", GAME_TICK_RATE))
+
+    async def welcome_subscriber(self):
+        # The new subscriber needs the full state before it can apply deltas
+        if self.frame_encoder:
+            self.frame_encoder.request_keyframe()
+        await self.send_game_state()
+
+    async def room_unsubscribe(self, event):
+        if self.room is not None:
+            self.room.unsubscribe(event.get("rate", GAME_TICK_RATE))
+
+    async def room_ping(self, event):
+        if self.room is not None:
+            await self.room.pong(event["reply_channel"])
+
     async def set_game_status(self, status):
         self.game_state.status = status
         await self.send_game_state()
 
     async def send_game_error(self, message=""):
-        message_bytes = message.encode("utf-8")
-        message_length = len(message_bytes)
-
-        payload = struct.pack(
-            f"<B I {message_length}s",
-            GAME_ERROR_MESSAGE_TYPE,
-            message_length,
-            message_bytes,
-        )
-
-        await self.send(bytes_data=payload)
+        await self.send(bytes_data=encode_error(message))
 
     async def send_game_state(self):
-        score_data = self.score.get_score() if self.score else {}
+        score = self.score
 
         payload = {
             "type": "game_state",
             "status": self.game_state.status,
-            "leftScore": score_data.get("left", 0),
-            "rightScore": score_data.get("right", 0),
-            "isDeuce": score_data.get("is_deuce", False),
-            "isLeftAdvantage": score_data.get("is_left_advantage", False),
-            "isRightAdvantage": score_data.get("is_right_advantage", False),
-            "winner": score_data.get("winner", 0),
+            "leftScore": score.left if score else 0,
+            "rightScore": score.right if score else 0,
+            "isDeuce": score.is_deuce if score else False,
+            "isLeftAdvantage": score.is_left_advantage if score else False,
+            "isRightAdvantage": score.is_right_advantage if score else False,
+            "winner": score.winner if score else 0,
+            "gameId": self.room.game_id if self.room else None,
         }
 
-        await self.send(text_data=json.dumps(payload))
+        text_data = json.dumps(payload)
+        await self.send(text_data=text_data)
+        if self.room:
+            await self.room.publish_state(text_data)
+
+    async def step(self):
+        # AI decisions are recorded like client inputs, before the tick they apply to
+        for paddle_index, ai_controller in self.ai_controllers.items():
+            direction = ai_controller.update(self.ball)
+            if direction != ai_controller.paddle.direction:
+                ai_controller.paddle.set_direction(direction)
+                self.record_input(paddle_index)
+
+        self.tick += 1
+        if self.replay:
+            self.replay.ticks = self.tick
+        for paddle in self.paddles.values():
+            paddle.update_position()
+
+        self.ball.update_ball(self.game_mode, self.paddles.values(), self.score)
+
+        if self.ball.scored:
+            await self.send_game_state()
+
+        if (
+            game_log.trace_game_id is not None
+            and self.room
+            and game_log.is_traced(self.room.game_id, self.tick)
+        ):
+            self.trace()
+
+        # Nobody plays: AI only games never go idle on their own
+        if (
+            self.tick - self.last_input_tick >= GAME_IDLE_TIMEOUT * GAME_TICK_RATE
+            and len(self.ai_controllers) < len(self.paddle_list)
+        ):
+            self.is_idle = True
+            self.update_rest()
+            logger.info("ⓘ No player input, game is idle")
+
+    def trace(self):
+        # Only built for the traced game, on sampled ticks
+        logger.info(
+            "🔎 Game %s tick %s: ball %s, paddles %s, score %s-%s, "
+            "send rate %s, outbound %s",
+            self.room.game_id,
+            self.tick,
+            self.ball.get_current_ball_state(),
+            {index: paddle.position for index, paddle in self.paddles.items()},
+            self.score.left if self.score else 0,
+            self.score.right if self.score else 0,
+            self.send_rate.get_stats(),
+            self.outbound.get_stats(),
+        )
+
+    async def flush(self):
+        # Encoded once for this connection and every room subscriber
+        frame = self.frame_encoder.encode(
+            self.tick, self.ball, self.paddles.values(), self.send_rate.frame_interval
+        )
+        # The simulation runs at full rate, this client may get fewer frames
+        if self.send_rate.should_send(self.tick, frame):
+            await self.send(bytes_data=frame)
+        if self.room:
+            await self.room.publish_frame(frame, self.tick)
+
+        if self.tick - self.last_ping_tick >= GAME_PING_INTERVAL * GAME_TICK_RATE:
+            await self.ping()
+
+        # The final frame is out, the game stops here
+        if self.score and self.score.winner:
+            await self.end_game()
+
+    async def ping(self):
+        # Each ping also ends a measurement period of the client's link
+        self.last_ping_tick = self.tick
+        self.send_rate.check(self.outbound.dropped, self.outbound.bandwidth)
+        ping_id = self.send_rate.start_ping(time.monotonic())
+        self.outbound.put_ping(ping_id, encode_ping(ping_id, self.tick))
+
+    async def heartbeat(self):
+        if time.monotonic() - self.rest_started_at >= GAME_ABANDON_TIMEOUT:
+            logger.info("ⓘ Game abandoned, stopping it")
+            await self.handle_stop()
+            return
+
+        # An idle game is still shown: a keyframe now and then keeps it, its
+        # spectators and the proxies in between up to date
+        if self.is_idle and not self.is_paused:
+            self.frame_encoder.request_keyframe()
+            await self.flush()
+        elif self.outbound.is_held:
+            # Only the answer to a ping lets frames through again
+            await self.ping()
+
+
+class SpectatorConsumer(AsyncWebsocketConsumer):
+    """
+    Read-only view of a running game, attached to its room by game id.
+
+    Frames arrive already encoded from the room owner and are forwarded as
+    is: directly when the game runs in this process, through the channel
+    layer otherwise. The `rate` query parameter selects one of
+    SPECTATOR_FRAME_RATES. A game whose room no process owns is closed with
+    ROOM_NOT_FOUND_CLOSE_CODE.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.game_id = None
+        self.rate = GAME_TICK_RATE
+        self.outbound = OutboundQueue(self.write)
+        self.local_room = None
+        self.is_joined = False
+
+    async def connect(self):
+        self.game_id = self.scope["url_route"]["kwargs"]["game_id"]
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        try:
+            self.rate = int(query.get("rate", [GAME_TICK_RATE])[0])
+        except ValueError:
+            self.rate = None
+
+        self.local_room = get_local_room(self.game_id)
+        if self.rate not in SPECTATOR_FRAME_RATES or (
+            self.local_room is None and self.channel_layer is None
+        ):
+            logger.error(f"✕ Cannot spectate game {self.game_id}")
+            await self.close()
+            return
+
+        await self.accept()
+        if self.local_room is None and not await find_room(
+            self.channel_layer, self.game_id
+        ):
+            # Nothing would ever be published to the group of an unknown game
+            logger.error(f"✕ No game {self.game_id} to spectate")
+            await self.close(code=ROOM_NOT_FOUND_CLOSE_CODE)
+            return
+
+        self.outbound.start()
+        if self.local_room is not None:
+            await self.local_room.attach(self, self.rate)
+        else:
+            await join_room(
+                self.channel_layer, self.game_id, self.channel_name, self.rate
+            )
+        self.is_joined = True
+        logger.info(f"✓ Spectator joined game {self.game_id} at {self.rate} Hz")
+
+    async def disconnect(self, close_code):
+        await self.leave()
+        await self.outbound.stop()
+        logger.debug(f"ⓘ Spectator Disconnected. Outbound: {self.outbound.get_stats()}")
 
-    async def game_update_loop(self):
+    async def send(self, text_data=None, bytes_data=None):
         try:
-            while True:
-                if self.score:
-                    winner = self.score.get_score().get("winner")
-                    if (
-                        (winner == 1 or winner == 2)
-                        and self.tournament_id
-                        and not self.is_tournament_updated
-                    ):
-                        await self.update_tournament()
-                        self.is_tournament_updated = True
-
-                await self.pause_event.wait()
+            self.outbound.put(text_data=text_data, bytes_data=bytes_data)
+        except OutboundQueueFullError as e:
+            logger.error(f"✕ Closing connection of slow spectator: {e}")
+            await self.leave()
+            await self.outbound.stop()
+            await self.close(code=1013)
+
+    async def leave(self):
+        if not self.is_joined:
+            return
 
-                for paddle in self.paddles.values():
-                    paddle.update_position()
+        self.is_joined = False
+        if self.local_room is not None:
+            self.local_room.detach(self, self.rate)
+        else:
+            await leave_room(
+                self.channel_layer, self.game_id, self.channel_name, self.rate
+            )
 
-                updated_ball = await self.ball.update_ball(
-                    self.game_mode,
-                    self.paddles.values(),
-                    self.score,
-                    self.send_game_state,
-                )
+    async def write(self, text_data=None, bytes_data=None):
+        await super().send(text_data=text_data, bytes_data=bytes_data)
 
-                payload_format = "<f f f f B f B" + (" f f f f" * len(self.paddles))
-                payload_values = [
-                    updated_ball["position"]["x"],  # (4 bytes)
-                    updated_ball["position"]["y"],  # (4 bytes)
-                    updated_ball["velocity"]["x"],  # (4 bytes)
-                    updated_ball["velocity"]["y"],  # (4 bytes)
-                    int(updated_ball["is_out_of_bounds"]),  # (1 byte)
-                    updated_ball["curve"],  # (4 bytes)
-                    updated_ball["bounced_off_surface"],  # (1 byte)
-                ]
-
-                offset = struct.calcsize("<f f f f B f B")  # Calculate base size
-                for paddle in self.paddles.values():
-                    payload_values.extend(
-                        [
-                            paddle.width,  # (4 bytes)
-                            paddle.height,  # (4 bytes)
-                            paddle.position,  # (4 bytes)
-                            paddle.speed,  # (4 bytes)
-                        ]
-                    )
-                    offset += struct.calcsize("<f f f f")
+    async def receive(self, text_data=None, bytes_data=None):
+        await self.send(text_data=json.dumps({"error": "Spectators cannot play"}))
 
-                payload = struct.pack(payload_format, *payload_values)
-                await self.send(bytes_data=payload)
-                await asyncio.sleep(GAME_STATE_UPDATE_INTERVAL)
+    async def room_frame(self, event):
+        await self.send(bytes_data=event["bytes"])
 
-        except asyncio.CancelledError:
-            logger.info("✓ Game update loop cancelled.")
-        except Exception as e:
-            logger.error(f"✕ Error in game update loop: {e}")
+    async def room_state(self, event):
+        await self.send(text_data=event["text"])
+
+    async def room_closed(self, event):
+        self.is_joined = False
+        await self.close()
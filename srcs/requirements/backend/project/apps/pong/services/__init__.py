@@ -2,11 +2,66 @@ from .ball import Ball
 from .paddle import Paddle
 from .score import Score
 from .state import GameState
+from .clock import FixedTimestepClock
+from .scheduler import GameScheduler, game_scheduler
+from .logs import GameLog, game_log
+from .results import ResultQueue, tournament_results
+from .encoder import (
+    FrameEncoder,
+    FrameDecoder,
+    encode_error,
+    encode_ping,
+    encode_input,
+    decode_input,
+    with_frame_interval,
+)
+from .outbound import OutboundQueue
+from .rate import SendRateController
+from .room import (
+    GameRoom,
+    get_local_room,
+    find_room,
+    join_room,
+    leave_room,
+    get_room_group_name,
+    ROOM_FRAME,
+    ROOM_STATE,
+    ROOM_CLOSED,
+)
+from .replay import GameReplay, replay_game, replay_frames
+from .ai import AiController, predict_intercept
+from .metrics import (
+    registry as metrics_registry,
+    INPUTS as INPUT_METRICS,
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+)
+from .exceptions import InvalidInputError, OutboundQueueFullError
 from .constants import (
+    GAME_TICK_RATE,
     GAME_STATE_UPDATE_INTERVAL,
+    GAME_MAX_CATCH_UP_TICKS,
+    GAME_HEARTBEAT_INTERVAL,
+    GAME_IDLE_TIMEOUT,
+    GAME_ABANDON_TIMEOUT,
+    GAME_TRACE_INTERVAL,
     GAME_STATE_MESSAGE_TYPE,
     GAME_UPDATE_MESSAGE_TYPE,
     GAME_ERROR_MESSAGE_TYPE,
+    GAME_PING_MESSAGE_TYPE,
+    GAME_PROTOCOL_VERSION,
+    GAME_KEYFRAME_INTERVAL,
+    INPUT_UPDATE_PADDLE_OPCODE,
+    INPUT_PONG_OPCODE,
+    OUTBOUND_QUEUE_SIZE,
+    OUTBOUND_MAX_UNACKED_BYTES,
+    RESULT_WORKERS,
+    RESULT_QUEUE_SIZE,
+    RESULT_RETRY_DELAYS,
+    FRAME_RATES,
+    SPECTATOR_FRAME_RATES,
+    ROOM_PING_TIMEOUT,
+    ROOM_NOT_FOUND_CLOSE_CODE,
+    GAME_PING_INTERVAL,
     GAME_STATUS_IDLE,
     GAME_STATUS_INIT,
     GAME_STATUS_IN_PROGRESS,
@@ -32,4 +87,7 @@ from .constants import (
     MAX_CURVE_ANGLE,
     BALL_DEFAULT_VELOCITY_Y_OPTIONS,
     PAUSE_ON_RESET,
+    BALL_HIT_STOP_TICKS,
+    AI_DIFFICULTY_OPTIONS,
+    AI_DEFAULT_DIFFICULTY,
 )
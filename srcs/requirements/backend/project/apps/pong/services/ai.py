@@ -0,0 +1,161 @@
+import cmath
+import math
+import random
+from functools import lru_cache
+
+from .constants import (
+    PADDLE_DEACCELERATION,
+    BALL_CURVE_DECAY,
+    BALL_MIN_CURVE,
+    AI_DIFFICULTY_OPTIONS,
+    AI_DEFAULT_DIFFICULTY,
+    AI_DEAD_ZONE,
+)
+
+
+@lru_cache(maxsize=256)
+def get_curve_rotations(curve, max_curve_angle):
+    """
+    Rotations applied to the ball's velocity by `Ball.apply_curve`, one per
+    tick until the curve dies out. They only depend on the curve, which is
+    clamped to the same few values after most hits, so they are cached.
+    """
+    rotations = []
+    while curve != 0:
+        curve = max(-max_curve_angle, min(max_curve_angle, curve))
+        rotations.append(cmath.exp(1j * math.radians(curve)))
+        curve *= BALL_CURVE_DECAY
+        if abs(curve) < BALL_MIN_CURVE:
+            curve = 0
+    return tuple(rotations)
+
+
+def fold(y, radius_y):
+    """
+    Bring a position computed as if there were no walls back on the court.
+
+    Wall bounces are exact reflections, so this is the same as bouncing
+    between them. Returns the position and whether the ball ends up flying
+    the other way.
+    """
+    court = 100 - 2 * radius_y
+    if court <= 0:
+        return y, False
+    offset = (y - radius_y) % (2 * court)
+    if offset <= court:
+        return radius_y + offset, False
+    return radius_y + 2 * court - offset, True
+
+
+def predict_intercept(ball, plane_x):
+    """
+    Predict where the ball crosses the vertical line x = `plane_x`.
+
+    Returns (ticks, y): the tick during which the ball crosses it and its y
+    position at that moment, following the same rules as `Ball.update_ball`
+    without paddles. While the ball curves, it is followed tick by tick
+    with cached rotations (the curve dies out after ~110 ticks at most);
+    afterwards it flies straight and the rest is solved at once.
+    """
+    x = ball.position_x
+    y = ball.position_y
+    radius_y = ball.radius_y
+    ticks = ball.pause_timer + ball.hit_stop_timer
+
+    if ball.velocity_x == 0 or (plane_x - x) / ball.velocity_x < 0:
+        return None
+
+    # Curve phase: the velocity is a complex number, a wall bounce conjugates it
+    velocity = complex(ball.velocity_x, ball.velocity_y)
+    for rotation in get_curve_rotations(ball.curve, ball.max_curve_angle):
+        velocity *= rotation
+        time = (plane_x - x) / velocity.real
+        if time <= 1:
+            return ticks + 1, fold(y + velocity.imag * max(0, time), radius_y)[0]
+
+        x += velocity.real
+        y, is_reflected = fold(y + velocity.imag, radius_y)
+        if is_reflected:
+            velocity = velocity.conjugate()
+        ticks += 1
+
+    # Straight phase
+    time = max(0, (plane_x - x) / velocity.real)
+    return ticks + max(1, math.ceil(time)), fold(y + velocity.imag * time, radius_y)[0]
+
+
+class AiController:
+    """
+    Server-side AI for one paddle.
+
+    The ball's flight between two paddle hits is fully determined, so the
+    intercept is predicted once per flight and cached; every decision in
+    between only steers the paddle towards it. The difficulty sets how
+    often the AI decides and how far off its aim is.
+    """
+
+    def __init__(self, paddle, difficulty=AI_DEFAULT_DIFFICULTY, rng=None):
+        self.paddle = paddle
+        self.reaction_ticks, self.aim_error = AI_DIFFICULTY_OPTIONS.get(
+            difficulty, AI_DIFFICULTY_OPTIONS[AI_DEFAULT_DIFFICULTY]
+        )
+        self.rng = rng or random.Random()
+        self.ticks = 0
+        self.target = 50
+        self.flight = None  # direction of the flight the target was computed for
+        self.ticks_to_intercept = 0
+
+    def update(self, ball):
+        """Return the direction the paddle should take for the next tick."""
+        self.ticks -= 1
+        if self.ticks > 0:
+            return self.paddle.direction
+
+        self.ticks = self.reaction_ticks
+        self.update_target(ball)
+        return self.steer()
+
+    def update_target(self, ball):
+        self.ticks_to_intercept -= self.reaction_ticks
+
+        if ball.is_out_of_bounds or ball.pause_timer > 0:
+            self.flight = None
+            self.target = 50
+            return
+
+        # A flight ends with a hit (the direction changes) or a miss
+        flight = ball.velocity_x > 0
+        if flight == self.flight and self.ticks_to_intercept > 0:
+            return
+        self.flight = flight
+
+        if flight != (self.paddle.side == "right"):
+            self.ticks_to_intercept = math.inf
+            self.target = 50
+            return
+
+        # The ball meets the paddle's face with its edge
+        if self.paddle.side == "left":
+            face_x = self.paddle.width + ball.radius_x
+        else:
+            face_x = 100 - self.paddle.width - ball.radius_x
+        intercept = predict_intercept(ball, face_x)
+        if intercept is None:
+            self.target = 50
+            return
+        self.ticks_to_intercept, y = intercept
+        self.target = y + self.rng.gauss(0, self.aim_error)
+
+    def steer(self):
+        paddle = self.paddle
+        half_height = paddle.height / 1.8
+        target = max(half_height, min(paddle.boundary - half_height, self.target))
+        gap = target - paddle.position
+        if abs(gap) <= AI_DEAD_ZONE:
+            return 0
+
+        # Let the paddle glide to a stop instead of overshooting
+        stopping_distance = paddle.speed**2 / (2 * PADDLE_DEACCELERATION)
+        if paddle.speed * gap > 0 and stopping_distance >= abs(gap):
+            return 0
+        return 1 if gap > 0 else -1
@@ -1,4 +1,3 @@
-import asyncio
 import logging
 import math
 import random
@@ -18,16 +17,48 @@ from .constants import (
     BALL_MAX_VELOCITY_CHANGE_ON_HIT,
     MAX_CURVE_ANGLE,
     MAX_CURVE_ANGLE_OPTIONS,
+    BALL_CURVE_DECAY,
+    BALL_MIN_CURVE,
     PAUSE_ON_RESET,
+    BALL_HIT_STOP_TICKS,
+    BALL_MAX_COLLISIONS_PER_TICK,
+    GAME_TICK_RATE,
 )
+from .logs import game_log
 
 logger = logging.getLogger("game_logs")
 
 
 class Ball:
-    def __init__(self, width=BALL_DEFAULT_WIDTH, height=BALL_DEFAULT_HEIGHT):
-        self.position = {"x": BALL_DEFAULT_POSITION_X, "y": BALL_DEFAULT_POSITION_Y}
-        self.velocity = {"x": BALL_MIN_VELOCITY_X, "y": BALL_MIN_VELOCITY_Y}
+    # Flat slotted fields: the tick loop reads and writes them without allocating
+    __slots__ = (
+        "rng",
+        "position_x",
+        "position_y",
+        "velocity_x",
+        "velocity_y",
+        "width",
+        "height",
+        "radius_x",
+        "radius_y",
+        "is_out_of_bounds",
+        "curve",
+        "bouncedOffSurface",
+        "pause_timer",
+        "hit_stop_timer",
+        "scored",
+        "max_curve_angle",
+        "min_velocity_x",
+        "min_velocity_y",
+    )
+
+    def __init__(self, width=BALL_DEFAULT_WIDTH, height=BALL_DEFAULT_HEIGHT, rng=None):
+        # Each game owns its RNG, seeded to make the game reproducible
+        self.rng = rng or random.Random()
+        self.position_x = BALL_DEFAULT_POSITION_X
+        self.position_y = BALL_DEFAULT_POSITION_Y
+        self.velocity_x = BALL_MIN_VELOCITY_X
+        self.velocity_y = BALL_MIN_VELOCITY_Y
         self.width = width
         self.height = height
         self.radius_x = width / 4
@@ -36,31 +67,69 @@ class Ball:
         self.curve = 0
         self.bouncedOffSurface = 0
         self.pause_timer = 0
+        self.hit_stop_timer = 0
+        self.scored = False
         self.max_curve_angle = MAX_CURVE_ANGLE
         self.min_velocity_x = BALL_MIN_VELOCITY_X
         self.min_velocity_y = BALL_MIN_VELOCITY_Y
 
     def get_current_ball_state(self):
+        # Allocates, for logs and tests: the game loop reads the fields directly
         return {
-            "position": self.position,
-            "velocity": self.velocity,
+            "position": {"x": self.position_x, "y": self.position_y},
+            "velocity": {"x": self.velocity_x, "y": self.velocity_y},
             "is_out_of_bounds": self.is_out_of_bounds,
             "curve": self.curve,
             "bounced_off_surface": self.bouncedOffSurface,
+            "hit_stop": self.hit_stop_timer,
         }
 
     def reset(self, game_mode):
-        self.position = {"x": BALL_DEFAULT_POSITION_X, "y": BALL_DEFAULT_POSITION_Y}
-        self.velocity = {
-            "x": self.min_velocity_x * random.choice([-1, 1]),
-            "y": self.min_velocity_y,
-        }
+        self.position_x = BALL_DEFAULT_POSITION_X
+        self.position_y = BALL_DEFAULT_POSITION_Y
+        self.velocity_x = self.min_velocity_x * self.rng.choice([-1, 1])
+        self.velocity_y = self.min_velocity_y
         self.is_out_of_bounds = False
         self.curve = 0
         self.bouncedOffSurface = 0
+        self.hit_stop_timer = 0
         if game_mode != DEMO_GAME_MODE:
-            self.pause_timer = PAUSE_ON_RESET * 60
-        return self.get_current_ball_state()
+            self.pause_timer = PAUSE_ON_RESET * GAME_TICK_RATE
+
+    def get_state(self):
+        # Complete simulation state, JSON serializable (the RNG is seeded apart)
+        return {
+            "position": {"x": self.position_x, "y": self.position_y},
+            "velocity": {"x": self.velocity_x, "y": self.velocity_y},
+            "width": self.width,
+            "height": self.height,
+            "is_out_of_bounds": self.is_out_of_bounds,
+            "curve": self.curve,
+            "bounced_off_surface": self.bouncedOffSurface,
+            "pause_timer": self.pause_timer,
+            "hit_stop_timer": self.hit_stop_timer,
+            "max_curve_angle": self.max_curve_angle,
+            "min_velocity_x": self.min_velocity_x,
+            "min_velocity_y": self.min_velocity_y,
+        }
+
+    def set_state(self, state):
+        self.position_x = state["position"]["x"]
+        self.position_y = state["position"]["y"]
+        self.velocity_x = state["velocity"]["x"]
+        self.velocity_y = state["velocity"]["y"]
+        self.width = state["width"]
+        self.height = state["height"]
+        self.radius_x = self.width / 4
+        self.radius_y = self.height / 4
+        self.is_out_of_bounds = state["is_out_of_bounds"]
+        self.curve = state["curve"]
+        self.bouncedOffSurface = state["bounced_off_surface"]
+        self.pause_timer = state["pause_timer"]
+        self.hit_stop_timer = state["hit_stop_timer"]
+        self.max_curve_angle = state["max_curve_angle"]
+        self.min_velocity_x = state["min_velocity_x"]
+        self.min_velocity_y = state["min_velocity_y"]
 
     def set_ball_speed(self, speed):
         speed_multiplier = BALL_SPEED_MULTIPLIERS.get(speed, 1.0)
@@ -84,7 +153,7 @@ class Ball:
         )
 
     def calculate_velocity_adjustment(self, paddle_position, paddle_height):
-        relative_hit_position = (self.position["y"] - paddle_position) / (
+        relative_hit_position = (self.position_y - paddle_position) / (
             paddle_height / 2
         )
         return abs(
@@ -97,142 +166,177 @@ class Ball:
                 -self.max_curve_angle, min(self.max_curve_angle, self.curve)
             )
             curve_radians = math.radians(self.curve)
-            current_speed = math.sqrt(self.velocity["x"] ** 2 + self.velocity["y"] ** 2)
-            angle = math.atan2(self.velocity["y"], self.velocity["x"]) + curve_radians
+            current_speed = math.sqrt(self.velocity_x**2 + self.velocity_y**2)
+            angle = math.atan2(self.velocity_y, self.velocity_x) + curve_radians
 
-            self.velocity["x"] = current_speed * math.cos(angle)
-            self.velocity["y"] = current_speed * math.sin(angle)
+            self.velocity_x = current_speed * math.cos(angle)
+            self.velocity_y = current_speed * math.sin(angle)
 
             # Gradually reduce curve effect
-            self.curve *= 0.98
-            if abs(self.curve) < 0.05:
+            self.curve *= BALL_CURVE_DECAY
+            if abs(self.curve) < BALL_MIN_CURVE:
                 self.curve = 0
 
-    async def update_ball(self, game_mode, paddles, score, send_game_state):
+    def update_ball(self, game_mode, paddles, score):
+        self.scored = False
+
         if self.pause_timer > 0:
             self.pause_timer -= 1
-            return self.get_current_ball_state()
-
-        winner = 0
+            return
 
-        if score:
-            winner = score.get_score().get("winner")
+        # Hit-stop: the ball freezes for a few ticks after a paddle hit
+        if self.hit_stop_timer > 0:
+            self.hit_stop_timer -= 1
+            return
 
-        if winner == 1 or winner == 2:
-            return self.reset(game_mode)
+        # The match is over: the ball stays where it is
+        if score and score.winner:
+            return
 
         self.apply_curve()
-        self.position["x"] += self.velocity["x"]
-        self.position["y"] += self.velocity["y"]
 
-        # Ball boundaries
-        ball_left = self.position["x"] - self.radius_x
-        ball_right = self.position["x"] + self.radius_x
-        ball_top = self.position["y"] - self.radius_y
-        ball_bottom = self.position["y"] + self.radius_y
-
-        for paddle in paddles:
-            paddle_lower_boundary = (
-                paddle.position - (paddle.height / 2) - PADDLE_BOUNDARY_GRACE_OFFSET
-            )
-            paddle_upper_boundary = (
-                paddle.position + (paddle.height / 2) + PADDLE_BOUNDARY_GRACE_OFFSET
-            )
+        if (
+            self.is_out_of_bounds
+            and self.position_x - self.radius_x > 0
+            and self.position_x + self.radius_x < 100
+        ):
+            self.is_out_of_bounds = False
+            if game_log.debug:
+                logger.debug("ⓘ Ball is set to be in bounds")
+
+        paddle = self.move(paddles)
+        if paddle is not None:
+            self.hit_paddle(paddle)
+            return
 
-            if self.is_out_of_bounds and ball_left > 0 and ball_right < 100:
-                self.is_out_of_bounds = False
+        # Ball boundaries
+        ball_left = self.position_x - self.radius_x
+        ball_right = self.position_x + self.radius_x
+
+        if (
+            paddles
+            and not self.is_out_of_bounds
+            and (ball_left <= 0 or ball_right >= 100)
+        ):
+            if score:
+                score.update_score(1 - (ball_left <= 0), 1 - (ball_right >= 100))
+            self.scored = True
+
+            if game_log.debug:
                 logger.debug(
-                    f"ⓘ Ball is set to be in bounds: "
-                    f"ball_left { ball_left }, ball_left + width { ball_left + self.width }, "
-                    f"ball_right { ball_right }, ball_right + width { ball_right + self.width }, "
+                    "ⓘ Ball is set to be out of bounds: ball_left %s, ball_right %s",
+                    ball_left,
+                    ball_right,
                 )
-
-            # Handle Paddles Collisions
-            if not self.is_out_of_bounds:
-                # Handle Left Paddle Collision
-                if paddle.side == "left":
-                    if (
-                        self.position["x"] <= paddle.width
-                        and paddle_lower_boundary
-                        <= self.position["y"]
-                        <= paddle_upper_boundary
-                    ):
-
-                        logger.debug(
-                            f"ⓘ Ball collided with LEFT paddle: ball_left { ball_left } position_x { self.position['x'] }"
-                        )
-
-                        self.velocity["x"] -= (
-                            BALL_VELOCITY_X_INCREMENT + paddle.speed / 10
-                        )
-                        self.velocity["x"] *= -1
-                        self.position["x"] = (
-                            paddle.width + self.radius_x
-                        )  # Prevent ball from clipping through
-                        self.velocity["y"] += self.calculate_velocity_adjustment(
-                            paddle.position, paddle.height
-                        )
-                        self.bouncedOffSurface = 4
-                        self.curve += paddle.speed * 3
-                        await asyncio.sleep(0.04)
-                        return self.get_current_ball_state()
-
-                # Handle Right Paddle Collision
-                if paddle.side == "right":
-                    if (
-                        self.position["x"] >= 100 - paddle.width
-                        and paddle_lower_boundary
-                        <= self.position["y"]
-                        <= paddle_upper_boundary
-                    ):
-                        logger.debug(
-                            f"ⓘ Ball collided with RIGHT paddle: ball_right { ball_right } position_x { self.position['x'] }"
-                        )
-
-                        self.velocity["x"] += (
-                            BALL_VELOCITY_X_INCREMENT + paddle.speed / 10
-                        )
-                        self.velocity["x"] *= -1
-                        self.position["x"] = (
-                            100 - paddle.width - self.radius_x
-                        )  # Prevent ball from clipping through
-                        self.velocity["y"] += self.calculate_velocity_adjustment(
-                            paddle.position, paddle.height
-                        )
-                        self.bouncedOffSurface = 2
-                        self.curve -= paddle.speed * 3
-                        await asyncio.sleep(0.04)
-                        return self.get_current_ball_state()
-
-                if ball_left <= 0 or ball_right >= 100:
-                    if score:
-                        score.update_score(
-                            1 - (ball_left <= 0), 1 - (ball_right >= 100)
-                        )
-                    await send_game_state()
-
-                    logger.debug(
-                        f"ⓘ Ball is set to be out of bounds: "
-                        f"ball_left { ball_left }, ball_left + width { ball_left + self.width }, "
-                        f"ball_right { ball_right }, ball_right + width { ball_right + self.width }, "
-                    )
-                    self.is_out_of_bounds = True
-
-        # Handle Top and Bottom Collisions
-        if ball_top <= 0 or ball_bottom >= 100:
-            self.velocity["y"] *= -1
-
-            if ball_top <= 0:
-                self.position["y"] = 0 + self.radius_y
-                self.bouncedOffSurface = 1
-            else:
-                self.position["y"] = 100 - self.radius_y
-                self.bouncedOffSurface = 3
+            self.is_out_of_bounds = True
 
         # Reset when ball goes out of boundaries
         if (ball_left + self.width + BALL_OFF_BOUNDS_OFFSET) < 0 or (
             ball_right - self.width - BALL_OFF_BOUNDS_OFFSET
         ) > 100:
-            return self.reset(game_mode)
+            self.reset(game_mode)
+
+    def move(self, paddles):
+        """
+        Move the ball by one tick of velocity with swept collisions.
+
+        Walls and paddle faces are hit at their exact time of impact within
+        the tick, so a fast ball cannot tunnel through them and the rest of
+        the movement after a wall bounce is kept. Returns the paddle hit, if
+        any: the ball stops at the impact point.
+        """
+        x = self.position_x
+        y = self.position_y
+        velocity_x = self.velocity_x
+        velocity_y = self.velocity_y
+        remaining = 1.0
+        hit = None
+
+        for _ in range(BALL_MAX_COLLISIONS_PER_TICK):
+            if velocity_y < 0:
+                wall_time = max(0.0, (self.radius_y - y) / velocity_y)
+            elif velocity_y > 0:
+                wall_time = max(0.0, (100 - self.radius_y - y) / velocity_y)
+            else:
+                wall_time = math.inf
+            event_time = min(wall_time, remaining)
 
-        return self.get_current_ball_state()
+            # The paddle faces the ball flies towards, checked before the walls
+            hit_time = math.inf
+            if not self.is_out_of_bounds:
+                for paddle in paddles:
+                    if paddle.side == "left" and velocity_x < 0:
+                        face_x = paddle.width + self.radius_x
+                    elif paddle.side == "right" and velocity_x > 0:
+                        face_x = 100 - paddle.width - self.radius_x
+                    else:
+                        continue
+                    time = (face_x - x) / velocity_x
+                    if not 0 <= time <= event_time or time >= hit_time:
+                        continue
+                    hit_y = y + velocity_y * time
+                    if (
+                        paddle.position
+                        - (paddle.height / 2)
+                        - PADDLE_BOUNDARY_GRACE_OFFSET
+                        <= hit_y
+                        <= paddle.position
+                        + (paddle.height / 2)
+                        + PADDLE_BOUNDARY_GRACE_OFFSET
+                    ):
+                        hit = paddle
+                        hit_time = time
+                        hit_face_x = face_x
+
+            if hit is not None:
+                x = hit_face_x
+                y += velocity_y * hit_time
+                break
+
+            if wall_time <= remaining:
+                x += velocity_x * wall_time
+                if velocity_y < 0:
+                    y = self.radius_y
+                    self.bouncedOffSurface = 1
+                else:
+                    y = 100 - self.radius_y
+                    self.bouncedOffSurface = 3
+                velocity_y *= -1
+                remaining -= wall_time
+                continue
+
+            x += velocity_x * remaining
+            y += velocity_y * remaining
+            break
+        else:
+            # Out of collision checks: the rest of the movement is kept, the
+            # ball stopping at the wall it would have bounced off next
+            x += velocity_x * remaining
+            y = min(max(y + velocity_y * remaining, self.radius_y), 100 - self.radius_y)
+
+        self.position_x = x
+        self.position_y = y
+        self.velocity_y = velocity_y
+        return hit
+
+    def hit_paddle(self, paddle):
+        if game_log.debug:
+            logger.debug(
+                "ⓘ Ball collided with %s paddle: position_x %s",
+                paddle.side.upper(),
+                self.position_x,
+            )
+
+        if paddle.side == "left":
+            self.velocity_x -= BALL_VELOCITY_X_INCREMENT + paddle.speed / 10
+            self.bouncedOffSurface = 4
+            self.curve += paddle.speed * 3
+        else:
+            self.velocity_x += BALL_VELOCITY_X_INCREMENT + paddle.speed / 10
+            self.bouncedOffSurface = 2
+            self.curve -= paddle.speed * 3
+        self.velocity_x *= -1
+        self.velocity_y += self.calculate_velocity_adjustment(
+            paddle.position, paddle.height
+        )
+        self.hit_stop_timer = BALL_HIT_STOP_TICKS
@@ -0,0 +1,70 @@
+import logging
+import time
+
+from .constants import GAME_STATE_UPDATE_INTERVAL, GAME_MAX_CATCH_UP_TICKS
+from .metrics import TICK_OVERRUNS, DROPPED_TICKS
+
+logger = logging.getLogger("game_logs")
+
+
+class FixedTimestepClock:
+    """
+    Converts real elapsed time (monotonic clock) into a whole number of
+    simulation ticks. Leftover time is kept in an accumulator so the
+    simulation advances by simulated time instead of by loop iterations.
+    """
+
+    def __init__(
+        self,
+        tick_interval=GAME_STATE_UPDATE_INTERVAL,
+        max_catch_up_ticks=GAME_MAX_CATCH_UP_TICKS,
+        time_source=time.monotonic,
+    ):
+        self.tick_interval = tick_interval
+        self.max_catch_up_ticks = max_catch_up_ticks
+        self.time_source = time_source
+        self.accumulator = 0.0
+        self.last_time = time_source()
+        self.tick = 0
+        self.overruns = 0  # wakeups that had to simulate more than one tick
+        self.dropped_ticks = 0  # ticks discarded by the catch-up limit
+
+    def reset(self):
+        # Forget elapsed time, e.g. after the game was paused
+        self.accumulator = 0.0
+        self.last_time = self.time_source()
+
+    def advance(self):
+        now = self.time_source()
+        self.accumulator += now - self.last_time
+        self.last_time = now
+
+        ticks_due = int(self.accumulator // self.tick_interval)
+
+        if ticks_due > 1:
+            self.overruns += 1
+            TICK_OVERRUNS.inc()
+
+        if ticks_due > self.max_catch_up_ticks:
+            dropped = ticks_due - self.max_catch_up_ticks
+            self.dropped_ticks += dropped
+            DROPPED_TICKS.inc(dropped)
+            ticks_due = self.max_catch_up_ticks
+            logger.warning(f"⚠️ Game loop is lagging, dropped {dropped} ticks")
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= ticks_due * self.tick_interval
+
+        self.tick += ticks_due
+        return ticks_due
+
+    def time_until_next_tick(self):
+        elapsed = self.accumulator + (self.time_source() - self.last_time)
+        return max(0.0, self.tick_interval - elapsed)
+
+    def get_stats(self):
+        return {
+            "tick": self.tick,
+            "overruns": self.overruns,
+            "dropped_ticks": self.dropped_ticks,
+        }
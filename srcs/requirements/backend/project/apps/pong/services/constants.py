@@ -1,7 +1,37 @@
-GAME_STATE_UPDATE_INTERVAL = 0.0167  # 60 updates per second (1 / 60)
+GAME_TICK_RATE = 60  # simulation ticks per second
+GAME_STATE_UPDATE_INTERVAL = 1 / GAME_TICK_RATE  # 60 updates per second
+GAME_MAX_CATCH_UP_TICKS = 5  # ticks simulated in one wakeup before dropping lag
+GAME_HEARTBEAT_INTERVAL = 1  # seconds between two heartbeats of a game at rest
+GAME_IDLE_TIMEOUT = 60  # seconds without player input before a game goes idle
+GAME_ABANDON_TIMEOUT = 600  # seconds a game may rest (idle or paused) before it stops
+GAME_TRACE_INTERVAL = 60  # ticks between two trace logs of the traced game
 GAME_STATE_MESSAGE_TYPE = 1
 GAME_UPDATE_MESSAGE_TYPE = 2
 GAME_ERROR_MESSAGE_TYPE = 3
+GAME_PING_MESSAGE_TYPE = 4
+GAME_PROTOCOL_VERSION = 3  # version byte of the binary game protocol
+GAME_KEYFRAME_INTERVAL = 60  # frames between two full state keyframes
+INPUT_UPDATE_PADDLE_OPCODE = 1  # binary client message: paddle direction change
+INPUT_PONG_OPCODE = 2  # binary client message: answer to a ping
+FRAME_RATES = (60, 30, 20)  # frames per second a connection can be sent
+SPECTATOR_FRAME_RATES = FRAME_RATES  # frames per second a spectator can ask for
+ROOM_PING_TIMEOUT = 1  # seconds the owner of a room has to answer it is open
+ROOM_NOT_FOUND_CLOSE_CODE = 4404  # websocket close code: no game with this id
+GAME_PING_INTERVAL = 2  # seconds between two round-trip time measurements
+RTT_SMOOTHING = 0.125  # weight of the newest round-trip time sample
+BANDWIDTH_SMOOTHING = 0.125  # weight of the newest acknowledged throughput sample
+SEND_RATE_MAX_RTT = (0.15, 0.3)  # seconds of round-trip time tolerated at 60, 30 Hz
+SEND_RATE_BANDWIDTH_HEADROOM = 1.5  # bandwidth needed, relative to the frame stream
+SEND_RATE_STEP_UP_CHECKS = 3  # good measurements in a row before a higher rate
+OUTBOUND_QUEUE_SIZE = 32  # messages buffered per connection before giving up
+OUTBOUND_MAX_UNACKED_BYTES = 16 * 1024  # written to a client before it must acknowledge
+OUTBOUND_MAX_PINGS = 32  # pings in flight remembered per connection
+RESULT_WORKERS = 2  # tournament results applied to the database at the same time
+RESULT_QUEUE_SIZE = 1024  # tournament results waiting before new ones are refused
+RESULT_RETRY_DELAYS = (1, 5, 30)  # seconds before each retry of a failed result
+RESULT_HISTORY_SIZE = 1024  # applied results remembered to drop duplicates
+POSITION_SCALE = 256  # 8.8 fixed point for positions and sizes (%)
+VELOCITY_SCALE = 4096  # 4.12 fixed point for velocities, curve and paddle speed
 GAME_STATUS_IDLE = 1  # no game is running
 GAME_STATUS_INIT = 2  # initializing new game
 GAME_STATUS_IN_PROGRESS = 4  # game in progress
@@ -36,5 +66,18 @@ BALL_VELOCITY_X_INCREMENT = 0.07
 BALL_MAX_VELOCITY_CHANGE_ON_HIT = 0.3
 MAX_CURVE_ANGLE = 0.4
 MAX_CURVE_ANGLE_OPTIONS = {1: 0.3, 2: 0.4, 3: 0.45}
+BALL_CURVE_DECAY = 0.98  # curve kept after each tick
+BALL_MIN_CURVE = 0.05  # curve below which the ball flies straight
 BALL_DEFAULT_VELOCITY_Y_OPTIONS = [1, -1]
 PAUSE_ON_RESET = 1  # seconds
+BALL_HIT_STOP_TICKS = 2  # ticks the ball freezes after a paddle hit
+BALL_MAX_COLLISIONS_PER_TICK = 8  # wall bounces resolved within one tick
+
+AI_DIFFICULTY_OPTIONS = {
+    # difficulty: (ticks between two decisions, aim error standard deviation %)
+    1: (12, 6),
+    2: (6, 3),
+    3: (2, 1),
+}
+AI_DEFAULT_DIFFICULTY = 2
+AI_DEAD_ZONE = 1  # % around its target where an AI paddle stops
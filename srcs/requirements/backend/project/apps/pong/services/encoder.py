@@ -0,0 +1,359 @@
+import struct
+
+from .constants import (
+    GAME_PROTOCOL_VERSION,
+    GAME_STATE_MESSAGE_TYPE,
+    GAME_UPDATE_MESSAGE_TYPE,
+    GAME_ERROR_MESSAGE_TYPE,
+    GAME_PING_MESSAGE_TYPE,
+    GAME_KEYFRAME_INTERVAL,
+    INPUT_UPDATE_PADDLE_OPCODE,
+    POSITION_SCALE,
+    VELOCITY_SCALE,
+)
+from .exceptions import InvalidInputError
+
+# Binary game protocol (little endian)
+#
+# Header:         message type (u8), protocol version (u8), simulation tick (u32)
+# Frame interval: ticks until the connection's next frame (u8), to interpolate over
+# Ball:           x, y (i16 position), vx, vy, curve (i16 velocity),
+#                 flags (u8: out of bounds | bounced off surface << 1 | hit stop << 4)
+# Keyframe:       header, frame interval, ball, paddle count (u8),
+#                 per paddle: width, height, position (i16 position), speed (i16 velocity),
+#                 then per paddle: last processed input sequence (u16)
+# Delta:          header, frame interval, ball, one change mask nibble per paddle (two paddles per u8),
+#                 then only the changed paddle fields, in paddle and field order,
+#                 one input ack bit per paddle (eight paddles per u8),
+#                 then for changed acks only, in paddle order: inputs since keyframe (u8)
+# Error:          header, message length (u32), utf-8 message
+# Ping:           header, ping id (u16), to be answered with a pong input
+#
+# Deltas always describe the difference to the latest keyframe, so a client
+# that misses a delta only loses that frame.
+#
+# Client input:   opcode (u8), paddle index (u8), direction (i8), input sequence (u16)
+#                 a pong carries the ping id as its sequence, other fields are 0
+
+HEADER_STRUCT = struct.Struct("<B B I")
+BALL_STRUCT = struct.Struct("<h h h h h B")
+INTERVAL_STRUCT = struct.Struct("<B")
+HEADER_AND_BALL_STRUCT = struct.Struct("<B B I B h h h h h B")
+COUNT_STRUCT = struct.Struct("<B")
+PADDLE_STRUCT = struct.Struct("<h h h h")
+FIELD_STRUCT = struct.Struct("<h")
+ACK_STRUCT = struct.Struct("<H")
+ACK_OFFSET_STRUCT = struct.Struct("<B")
+ERROR_LENGTH_STRUCT = struct.Struct("<I")
+PING_STRUCT = struct.Struct("<H")
+INPUT_STRUCT = struct.Struct("<B B b H")
+
+PADDLE_FIELDS_COUNT = 4  # width, height, position, speed
+INT16_MIN = -32768
+INT16_MAX = 32767
+ACK_OFFSET_MAX = 255
+
+
+def clamp_int16(value):
+    return max(INT16_MIN, min(INT16_MAX, value))
+
+
+def encode_error(message):
+    message_bytes = message.encode("utf-8")
+    return (
+        HEADER_STRUCT.pack(GAME_ERROR_MESSAGE_TYPE, GAME_PROTOCOL_VERSION, 0)
+        + ERROR_LENGTH_STRUCT.pack(len(message_bytes))
+        + message_bytes
+    )
+
+
+def encode_ping(ping_id, tick=0):
+    return HEADER_STRUCT.pack(
+        GAME_PING_MESSAGE_TYPE, GAME_PROTOCOL_VERSION, tick & 0xFFFFFFFF
+    ) + PING_STRUCT.pack(ping_id & 0xFFFF)
+
+
+def with_frame_interval(frame, frame_interval):
+    """Return `frame` with another frame interval, for a connection at another rate."""
+    offset = HEADER_STRUCT.size
+    if frame[offset] == frame_interval:
+        return frame
+    return frame[:offset] + bytes((frame_interval,)) + frame[offset + 1 :]
+
+
+def encode_input(paddle_index, direction, sequence, opcode=INPUT_UPDATE_PADDLE_OPCODE):
+    return INPUT_STRUCT.pack(opcode, paddle_index, direction, sequence & 0xFFFF)
+
+
+def decode_input(payload):
+    """Return (opcode, paddle index, direction, sequence) of a client input."""
+    if len(payload) != INPUT_STRUCT.size:
+        raise InvalidInputError(f"Invalid input message size: {len(payload)}")
+    return INPUT_STRUCT.unpack(payload)
+
+
+class FrameEncoder:
+    """
+    Encodes the ball and paddle state of one game into keyframes and deltas.
+
+    A keyframe is sent first and then every `keyframe_interval` frames; in
+    between, deltas only carry the paddle fields and input acknowledgements
+    that differ from the last keyframe. Every frame is stamped with the
+    simulation tick it describes. Fields are written with precompiled structs into a buffer
+    allocated once per game. ASGI servers require an immutable `bytes`
+    payload, which is why `encode` returns a copy rather than the buffer.
+    """
+
+    def __init__(self, paddle_count, keyframe_interval=GAME_KEYFRAME_INTERVAL):
+        self.paddle_count = paddle_count
+        self.keyframe_interval = keyframe_interval
+        self.mask_size = (paddle_count + 1) // 2
+        self.ack_mask_size = (paddle_count + 7) // 8
+        self.size = (
+            HEADER_STRUCT.size
+            + INTERVAL_STRUCT.size
+            + BALL_STRUCT.size
+            + max(COUNT_STRUCT.size, self.mask_size + self.ack_mask_size)
+            + (PADDLE_STRUCT.size + ACK_STRUCT.size) * paddle_count
+        )
+        self.buffer = bytearray(self.size)
+        self.view = memoryview(self.buffer)
+        self.frames_since_keyframe = 0
+        self.keyframe_paddles = None
+        self.keyframe_acks = None
+        self.raw_paddles = [None] * paddle_count
+        self.quantized_paddles = [None] * paddle_count
+
+    def request_keyframe(self):
+        self.keyframe_paddles = None
+
+    def pack_ball(self, message_type, tick, ball, frame_interval):
+        values = (
+            round(ball.position_x * POSITION_SCALE),
+            round(ball.position_y * POSITION_SCALE),
+            round(ball.velocity_x * VELOCITY_SCALE),
+            round(ball.velocity_y * VELOCITY_SCALE),
+            round(ball.curve * VELOCITY_SCALE),
+        )
+        flags = (
+            ball.is_out_of_bounds
+            | (ball.bouncedOffSurface << 1)
+            | (ball.hit_stop_timer << 4)
+        )
+
+        try:
+            HEADER_AND_BALL_STRUCT.pack_into(
+                self.buffer,
+                0,
+                message_type,
+                GAME_PROTOCOL_VERSION,
+                tick & 0xFFFFFFFF,
+                frame_interval,
+                *values,
+                flags,
+            )
+        except struct.error:
+            # Only a ball far outside the field or extremely fast can overflow
+            HEADER_AND_BALL_STRUCT.pack_into(
+                self.buffer,
+                0,
+                message_type,
+                GAME_PROTOCOL_VERSION,
+                tick & 0xFFFFFFFF,
+                frame_interval,
+                *(clamp_int16(value) for value in values),
+                flags,
+            )
+        return HEADER_AND_BALL_STRUCT.size
+
+    def pack_keyframe(self, tick, ball, paddles, acks, frame_interval):
+        offset = self.pack_ball(GAME_STATE_MESSAGE_TYPE, tick, ball, frame_interval)
+        COUNT_STRUCT.pack_into(self.buffer, offset, len(paddles))
+        offset += COUNT_STRUCT.size
+
+        for paddle in paddles:
+            PADDLE_STRUCT.pack_into(self.buffer, offset, *paddle)
+            offset += PADDLE_STRUCT.size
+
+        for ack in acks:
+            ACK_STRUCT.pack_into(self.buffer, offset, ack)
+            offset += ACK_STRUCT.size
+
+        self.keyframe_paddles = paddles
+        self.keyframe_acks = acks
+        self.frames_since_keyframe = 0
+        return offset
+
+    def pack_delta(self, tick, ball, paddles, ack_offsets, frame_interval):
+        buffer = self.buffer
+        mask_offset = self.pack_ball(
+            GAME_UPDATE_MESSAGE_TYPE, tick, ball, frame_interval
+        )
+        offset = mask_offset + self.mask_size
+        masks = 0
+
+        for index, paddle in enumerate(paddles):
+            keyframe_paddle = self.keyframe_paddles[index]
+            if paddle == keyframe_paddle:
+                continue
+
+            for field in range(PADDLE_FIELDS_COUNT):
+                if paddle[field] != keyframe_paddle[field]:
+                    masks |= 1 << (4 * index + field)
+                    FIELD_STRUCT.pack_into(buffer, offset, paddle[field])
+                    offset += FIELD_STRUCT.size
+
+        buffer[mask_offset : mask_offset + self.mask_size] = masks.to_bytes(
+            self.mask_size, "little"
+        )
+
+        ack_mask_offset = offset
+        offset += self.ack_mask_size
+        ack_mask = 0
+        for index, ack_offset in enumerate(ack_offsets):
+            if ack_offset:
+                ack_mask |= 1 << index
+                ACK_OFFSET_STRUCT.pack_into(buffer, offset, ack_offset)
+                offset += ACK_OFFSET_STRUCT.size
+
+        buffer[ack_mask_offset : ack_mask_offset + self.ack_mask_size] = (
+            ack_mask.to_bytes(self.ack_mask_size, "little")
+        )
+        self.frames_since_keyframe += 1
+        return offset
+
+    def pack(self, tick, ball, paddles, frame_interval=1):
+        quantized_paddles = self.quantized_paddles
+        raw_paddles = self.raw_paddles
+        acks = [paddle.input_sequence for paddle in paddles]
+
+        for index, paddle in enumerate(paddles):
+            raw = (paddle.width, paddle.height, paddle.position, paddle.speed)
+            # Idle paddles keep their previous quantized values
+            if raw != raw_paddles[index]:
+                raw_paddles[index] = raw
+                # Paddle values always fit: sizes and position within 0-100, |speed| <= 1.5
+                quantized_paddles[index] = (
+                    round(raw[0] * POSITION_SCALE),
+                    round(raw[1] * POSITION_SCALE),
+                    round(raw[2] * POSITION_SCALE),
+                    round(raw[3] * VELOCITY_SCALE),
+                )
+
+        if self.keyframe_paddles is not None:
+            # Acks travel as the number of inputs since the keyframe
+            ack_offsets = [
+                (ack - keyframe_ack) & 0xFFFF
+                for ack, keyframe_ack in zip(acks, self.keyframe_acks)
+            ]
+
+        if (
+            self.keyframe_paddles is None
+            or self.frames_since_keyframe + 1 >= self.keyframe_interval
+            or max(ack_offsets, default=0) > ACK_OFFSET_MAX
+        ):
+            size = self.pack_keyframe(
+                tick, ball, list(quantized_paddles), acks, frame_interval
+            )
+        else:
+            size = self.pack_delta(
+                tick, ball, quantized_paddles, ack_offsets, frame_interval
+            )
+
+        return self.view[:size]
+
+    def encode(self, tick, ball, paddles, frame_interval=1):
+        return bytes(self.pack(tick, ball, paddles, frame_interval))
+
+
+class FrameDecoder:
+    """Reference decoder of the binary game protocol, mirrors the frontend."""
+
+    def __init__(self):
+        self.keyframe_paddles = []
+        self.keyframe_acks = []
+
+    def decode(self, payload):
+        message_type, version, tick = HEADER_STRUCT.unpack_from(payload, 0)
+        if version != GAME_PROTOCOL_VERSION:
+            raise ValueError(f"Unsupported game protocol version: {version}")
+
+        offset = HEADER_STRUCT.size
+        if message_type == GAME_ERROR_MESSAGE_TYPE:
+            (length,) = ERROR_LENGTH_STRUCT.unpack_from(payload, offset)
+            offset += ERROR_LENGTH_STRUCT.size
+            return {
+                "type": message_type,
+                "error": bytes(payload[offset : offset + length]).decode("utf-8"),
+            }
+        if message_type == GAME_PING_MESSAGE_TYPE:
+            (ping_id,) = PING_STRUCT.unpack_from(payload, offset)
+            return {"type": message_type, "tick": tick, "ping_id": ping_id}
+
+        (frame_interval,) = INTERVAL_STRUCT.unpack_from(payload, offset)
+        offset += INTERVAL_STRUCT.size
+        x, y, vx, vy, curve, flags = BALL_STRUCT.unpack_from(payload, offset)
+        offset += BALL_STRUCT.size
+
+        if message_type == GAME_STATE_MESSAGE_TYPE:
+            (count,) = COUNT_STRUCT.unpack_from(payload, offset)
+            offset += COUNT_STRUCT.size
+            paddles = []
+            for _ in range(count):
+                paddles.append(PADDLE_STRUCT.unpack_from(payload, offset))
+                offset += PADDLE_STRUCT.size
+            acks = []
+            for _ in range(count):
+                acks.append(ACK_STRUCT.unpack_from(payload, offset)[0])
+                offset += ACK_STRUCT.size
+            self.keyframe_paddles = paddles
+            self.keyframe_acks = acks
+        elif message_type == GAME_UPDATE_MESSAGE_TYPE:
+            mask_offset = offset
+            offset += (len(self.keyframe_paddles) + 1) // 2
+            paddles = []
+            for index, keyframe_paddle in enumerate(self.keyframe_paddles):
+                mask = (payload[mask_offset + index // 2] >> (4 * (index % 2))) & 0xF
+                paddle = list(keyframe_paddle)
+                for field in range(PADDLE_FIELDS_COUNT):
+                    if mask & (1 << field):
+                        (paddle[field],) = FIELD_STRUCT.unpack_from(payload, offset)
+                        offset += FIELD_STRUCT.size
+                paddles.append(tuple(paddle))
+
+            ack_mask = int.from_bytes(
+                payload[offset : offset + (len(paddles) + 7) // 8], "little"
+            )
+            offset += (len(paddles) + 7) // 8
+            acks = list(self.keyframe_acks)
+            for index in range(len(acks)):
+                if ack_mask & (1 << index):
+                    (ack_offset,) = ACK_OFFSET_STRUCT.unpack_from(payload, offset)
+                    acks[index] = (acks[index] + ack_offset) & 0xFFFF
+                    offset += ACK_OFFSET_STRUCT.size
+        else:
+            raise ValueError(f"Unknown game message type: {message_type}")
+
+        return {
+            "type": message_type,
+            "tick": tick,
+            "frame_interval": frame_interval,
+            "ball": {
+                "position": {"x": x / POSITION_SCALE, "y": y / POSITION_SCALE},
+                "velocity": {"x": vx / VELOCITY_SCALE, "y": vy / VELOCITY_SCALE},
+                "curve": curve / VELOCITY_SCALE,
+                "is_out_of_bounds": bool(flags & 0x1),
+                "bounced_off_surface": (flags >> 1) & 0x7,
+                "hit_stop": flags >> 4,
+            },
+            "paddles": [
+                {
+                    "width": width / POSITION_SCALE,
+                    "height": height / POSITION_SCALE,
+                    "position": position / POSITION_SCALE,
+                    "speed": speed / VELOCITY_SCALE,
+                }
+                for width, height, position, speed in paddles
+            ],
+            "input_acks": acks,
+        }
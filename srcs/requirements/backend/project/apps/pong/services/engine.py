@@ -0,0 +1,514 @@
+import math
+import random
+
+import numpy as np
+
+from .constants import (
+    DEMO_GAME_MODE,
+    GAME_TICK_RATE,
+    PADDLE_DEFAULT_WIDTH,
+    PADDLE_DEFAULT_HEIGHT,
+    PADDLE_STRETCHING_FACTOR,
+    PADDLE_MAX_SPEED,
+    PADDLE_ACCELERATION,
+    PADDLE_DEACCELERATION,
+    PADDLE_BOUNDARY_GRACE_OFFSET,
+    BALL_OFF_BOUNDS_OFFSET,
+    BALL_DEFAULT_WIDTH,
+    BALL_DEFAULT_HEIGHT,
+    BALL_DEFAULT_POSITION_X,
+    BALL_DEFAULT_POSITION_Y,
+    BALL_MIN_VELOCITY_X,
+    BALL_MIN_VELOCITY_Y,
+    BALL_VELOCITY_X_INCREMENT,
+    BALL_MAX_VELOCITY_CHANGE_ON_HIT,
+    MAX_CURVE_ANGLE,
+    BALL_CURVE_DECAY,
+    BALL_MIN_CURVE,
+    PAUSE_ON_RESET,
+    BALL_HIT_STOP_TICKS,
+    BALL_MAX_COLLISIONS_PER_TICK,
+)
+
+SIDE_LEFT = 0
+SIDE_RIGHT = 1
+
+
+class BatchEngine:
+    """
+    Struct-of-arrays version of Ball, Paddle and Score that steps N games
+    with the same paddle count at once.
+
+    Every game follows exactly the same rules (and order of floating point
+    operations) as the scalar classes. With `exact=True` the curve rotation
+    uses the `math` module per curving ball so results are bit-for-bit equal
+    to `Ball.update_ball`; `exact=False` uses NumPy trigonometry for the
+    highest throughput.
+    """
+
+    def __init__(
+        self,
+        num_games,
+        paddle_sides,
+        is_demo=False,
+        has_score=True,
+        end_score=11,
+        is_deuce_on=True,
+        exact=True,
+        rng=None,
+    ):
+        num_paddles = len(paddle_sides)
+        shape = (num_games, num_paddles)
+
+        self.num_games = num_games
+        self.num_paddles = num_paddles
+        self.exact = exact
+        self.rng = rng if rng is not None else random
+        self.is_demo = np.broadcast_to(
+            np.asarray(is_demo, dtype=bool), num_games
+        ).copy()
+
+        # Ball
+        self.ball_x = np.full(num_games, float(BALL_DEFAULT_POSITION_X))
+        self.ball_y = np.full(num_games, float(BALL_DEFAULT_POSITION_Y))
+        self.ball_vx = np.full(num_games, BALL_MIN_VELOCITY_X)
+        self.ball_vy = np.full(num_games, BALL_MIN_VELOCITY_Y)
+        self.ball_width = np.full(num_games, float(BALL_DEFAULT_WIDTH))
+        self.ball_height = np.full(num_games, float(BALL_DEFAULT_HEIGHT))
+        self.ball_radius_x = self.ball_width / 4
+        self.ball_radius_y = self.ball_height / 4
+        self.is_out_of_bounds = np.zeros(num_games, dtype=bool)
+        self.curve = np.zeros(num_games)
+        self.bounced_off_surface = np.zeros(num_games, dtype=np.uint8)
+        self.pause_timer = np.zeros(num_games, dtype=np.int64)
+        self.hit_stop_timer = np.zeros(num_games, dtype=np.int64)
+        self.max_curve_angle = np.full(num_games, MAX_CURVE_ANGLE)
+        self.min_velocity_x = np.full(num_games, BALL_MIN_VELOCITY_X)
+        self.min_velocity_y = np.full(num_games, BALL_MIN_VELOCITY_Y)
+
+        # Paddles
+        self.paddle_side = np.broadcast_to(
+            np.asarray(paddle_sides, dtype=np.int8), shape
+        ).copy()
+        self.paddle_position = np.full(shape, 50.0)
+        self.paddle_direction = np.zeros(shape, dtype=np.int8)
+        self.paddle_speed = np.zeros(shape)
+        self.paddle_boundary = np.full(shape, 100.0)
+        self.paddle_width = np.full(shape, float(PADDLE_DEFAULT_WIDTH))
+        self.paddle_base_height = np.full(shape, float(PADDLE_DEFAULT_HEIGHT))
+        self.paddle_height = self.paddle_base_height.copy()
+
+        # Score
+        self.has_score = np.broadcast_to(
+            np.asarray(has_score, dtype=bool), num_games
+        ).copy()
+        self.end_score = np.broadcast_to(
+            np.asarray(end_score, dtype=np.int64), num_games
+        ).copy()
+        self.deuce_score = self.end_score - 1
+        self.is_deuce_on = np.broadcast_to(
+            np.asarray(is_deuce_on, dtype=bool), num_games
+        ).copy()
+        self.left_score = np.zeros(num_games, dtype=np.int64)
+        self.right_score = np.zeros(num_games, dtype=np.int64)
+        self.is_left_advantage = np.zeros(num_games, dtype=bool)
+        self.is_right_advantage = np.zeros(num_games, dtype=bool)
+        self.is_deuce = np.zeros(num_games, dtype=bool)
+        self.winner = np.zeros(num_games, dtype=np.int8)
+
+        # Per-tick events, like Ball.scored
+        self.scored = np.zeros(num_games, dtype=bool)
+
+    @classmethod
+    def from_games(cls, balls, paddle_lists, scores, game_modes, exact=True, rng=None):
+        """Build an engine whose lanes are copies of existing Ball/Paddle/Score objects."""
+        paddle_sides = [
+            SIDE_LEFT if paddle.side == "left" else SIDE_RIGHT
+            for paddle in paddle_lists[0]
+        ]
+        engine = cls(
+            len(balls),
+            paddle_sides,
+            is_demo=[mode == DEMO_GAME_MODE for mode in game_modes],
+            has_score=[score is not None for score in scores],
+            exact=exact,
+            rng=rng,
+        )
+
+        for i, (ball, paddles, score) in enumerate(zip(balls, paddle_lists, scores)):
+            engine.ball_x[i] = ball.position_x
+            engine.ball_y[i] = ball.position_y
+            engine.ball_vx[i] = ball.velocity_x
+            engine.ball_vy[i] = ball.velocity_y
+            engine.ball_width[i] = ball.width
+            engine.ball_height[i] = ball.height
+            engine.ball_radius_x[i] = ball.radius_x
+            engine.ball_radius_y[i] = ball.radius_y
+            engine.is_out_of_bounds[i] = ball.is_out_of_bounds
+            engine.curve[i] = ball.curve
+            engine.bounced_off_surface[i] = ball.bouncedOffSurface
+            engine.pause_timer[i] = ball.pause_timer
+            engine.hit_stop_timer[i] = ball.hit_stop_timer
+            engine.max_curve_angle[i] = ball.max_curve_angle
+            engine.min_velocity_x[i] = ball.min_velocity_x
+            engine.min_velocity_y[i] = ball.min_velocity_y
+
+            for j, paddle in enumerate(paddles):
+                engine.paddle_side[i, j] = (
+                    SIDE_LEFT if paddle.side == "left" else SIDE_RIGHT
+                )
+                engine.paddle_position[i, j] = paddle.position
+                engine.paddle_direction[i, j] = paddle.direction
+                engine.paddle_speed[i, j] = paddle.speed
+                engine.paddle_boundary[i, j] = paddle.boundary
+                engine.paddle_width[i, j] = paddle.width
+                engine.paddle_base_height[i, j] = paddle.base_height
+                engine.paddle_height[i, j] = paddle.height
+
+            if score is not None:
+                engine.end_score[i] = score.end_score
+                engine.deuce_score[i] = score.deuce_score
+                engine.is_deuce_on[i] = score.is_deuce_on
+                engine.left_score[i] = score.left
+                engine.right_score[i] = score.right
+                engine.is_left_advantage[i] = score.is_left_advantage
+                engine.is_right_advantage[i] = score.is_right_advantage
+                engine.is_deuce[i] = score.is_deuce
+                engine.winner[i] = score.winner
+
+        return engine
+
+    def set_directions(self, directions):
+        directions = np.asarray(directions, dtype=np.int8)
+        valid = (directions >= -1) & (directions <= 1)
+        np.copyto(self.paddle_direction, directions, where=valid)
+
+    def step(self):
+        self.update_paddles()
+        self.update_balls()
+
+    # Paddle.update_position for every paddle of every game
+    def update_paddles(self):
+        speed = self.paddle_speed
+        direction = self.paddle_direction
+
+        moving = direction != 0
+        accelerated = np.clip(
+            speed + PADDLE_ACCELERATION * direction, -PADDLE_MAX_SPEED, PADDLE_MAX_SPEED
+        )
+        slowing_down = np.maximum(speed - PADDLE_DEACCELERATION, 0)
+        slowing_up = np.minimum(speed + PADDLE_DEACCELERATION, 0)
+        speed = np.where(
+            moving,
+            accelerated,
+            np.where(speed > 0, slowing_down, np.where(speed < 0, slowing_up, speed)),
+        )
+        self.paddle_speed = speed
+
+        half_paddle_height = self.paddle_height / 1.8
+        position = np.maximum(
+            half_paddle_height,
+            np.minimum(
+                self.paddle_boundary - half_paddle_height, self.paddle_position + speed
+            ),
+        )
+        self.paddle_position = position
+
+        stretch_factor = PADDLE_STRETCHING_FACTOR + np.abs(speed) / PADDLE_MAX_SPEED
+        inside = (half_paddle_height < position) & (
+            position < self.paddle_boundary - half_paddle_height
+        )
+        base = self.paddle_base_height
+        stretched = np.minimum(np.maximum(base, base * stretch_factor), base * 2)
+        self.paddle_height = np.where(inside, stretched, base)
+
+    # Ball.update_ball for every game
+    def update_balls(self):
+        self.scored[:] = False
+
+        paused = self.pause_timer > 0
+        self.pause_timer[paused] -= 1
+
+        hit_stopped = ~paused & (self.hit_stop_timer > 0)
+        self.hit_stop_timer[hit_stopped] -= 1
+        paused |= hit_stopped
+
+        won = self.has_score & (self.winner != 0)
+        running = ~paused & ~won
+
+        self.apply_curve(running & (self.curve != 0))
+
+        radius_x = self.ball_radius_x
+        radius_y = self.ball_radius_y
+        back_in_bounds = (
+            running
+            & self.is_out_of_bounds
+            & (self.ball_x - radius_x > 0)
+            & (self.ball_x + radius_x < 100)
+        )
+        self.is_out_of_bounds[back_in_bounds] = False
+
+        hit_paddle = self.move_balls(running)
+        hit = hit_paddle >= 0
+        running &= ~hit
+
+        x = self.ball_x
+        ball_left = x - radius_x
+        ball_right = x + radius_x
+        left_out = ball_left <= 0
+        right_out = ball_right >= 100
+
+        if self.num_paddles:
+            went_out = running & ~self.is_out_of_bounds & (left_out | right_out)
+            if went_out.any():
+                self.update_scores(
+                    went_out & self.has_score,
+                    1 - left_out.astype(np.int64),
+                    1 - right_out.astype(np.int64),
+                )
+                self.scored |= went_out
+                self.is_out_of_bounds[went_out] = True
+
+        width = self.ball_width
+        off_bounds = running & (
+            ((ball_left + width + BALL_OFF_BOUNDS_OFFSET) < 0)
+            | ((ball_right - width - BALL_OFF_BOUNDS_OFFSET) > 100)
+        )
+        self.reset(off_bounds)
+
+    # Ball.move for the games in `mask`, returns the index of the paddle hit or -1
+    def move_balls(self, mask):
+        x = self.ball_x
+        y = self.ball_y
+        vx = self.ball_vx
+        vy = self.ball_vy
+        radius_x = self.ball_radius_x
+        radius_y = self.ball_radius_y
+        remaining = np.ones(self.num_games)
+        hit_paddle = np.full(self.num_games, -1, dtype=np.int64)
+        hit_time = np.full(self.num_games, np.inf)
+        hit_face_x = np.zeros(self.num_games)
+        active = mask.copy()
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for _ in range(BALL_MAX_COLLISIONS_PER_TICK):
+                wall_time = np.where(
+                    vy < 0,
+                    np.maximum(0.0, (radius_y - y) / vy),
+                    np.where(
+                        vy > 0, np.maximum(0.0, (100 - radius_y - y) / vy), np.inf
+                    ),
+                )
+                event_time = np.minimum(wall_time, remaining)
+
+                can_hit = active & ~self.is_out_of_bounds
+                for j in range(self.num_paddles):
+                    side = self.paddle_side[:, j]
+                    paddle_width = self.paddle_width[:, j]
+                    paddle_position = self.paddle_position[:, j]
+                    paddle_height = self.paddle_height[:, j]
+
+                    left = (side == SIDE_LEFT) & (vx < 0)
+                    right = (side == SIDE_RIGHT) & (vx > 0)
+                    face_x = np.where(
+                        left, paddle_width + radius_x, 100 - paddle_width - radius_x
+                    )
+                    time = (face_x - x) / vx
+                    hit_y = y + vy * time
+                    lower = (
+                        paddle_position
+                        - (paddle_height / 2)
+                        - PADDLE_BOUNDARY_GRACE_OFFSET
+                    )
+                    upper = (
+                        paddle_position
+                        + (paddle_height / 2)
+                        + PADDLE_BOUNDARY_GRACE_OFFSET
+                    )
+                    hits = (
+                        can_hit
+                        & (left | right)
+                        & (0 <= time)
+                        & (time <= event_time)
+                        & (time < hit_time)
+                        & (lower <= hit_y)
+                        & (hit_y <= upper)
+                    )
+                    hit_paddle[hits] = j
+                    hit_time[hits] = time[hits]
+                    hit_face_x[hits] = face_x[hits]
+
+                hits = active & (hit_paddle >= 0)
+                x[hits] = hit_face_x[hits]
+                y[hits] += vy[hits] * hit_time[hits]
+                active &= ~hits
+
+                walls = active & (wall_time <= remaining)
+                x[walls] += vx[walls] * wall_time[walls]
+                top = walls & (vy < 0)
+                bottom = walls & ~top
+                y[top] = radius_y[top]
+                self.bounced_off_surface[top] = 1
+                y[bottom] = 100 - radius_y[bottom]
+                self.bounced_off_surface[bottom] = 3
+                vy[walls] *= -1
+                remaining[walls] -= wall_time[walls]
+
+                rest = active & ~walls
+                x[rest] += vx[rest] * remaining[rest]
+                y[rest] += vy[rest] * remaining[rest]
+
+                active = walls
+                if not active.any():
+                    break
+            else:
+                # Out of collision checks, like Ball.move
+                x[active] += vx[active] * remaining[active]
+                y[active] = np.minimum(
+                    np.maximum(
+                        y[active] + vy[active] * remaining[active], radius_y[active]
+                    ),
+                    100 - radius_y[active],
+                )
+
+        for j in range(self.num_paddles):
+            hits = hit_paddle == j
+            if not hits.any():
+                continue
+            paddle_position = self.paddle_position[hits, j]
+            paddle_height = self.paddle_height[hits, j]
+            paddle_speed = self.paddle_speed[hits, j]
+            relative_hit_position = (y[hits] - paddle_position) / (paddle_height / 2)
+            adjustment = np.abs(
+                BALL_MAX_VELOCITY_CHANGE_ON_HIT * np.clip(relative_hit_position, -1, 1)
+            )
+
+            # Column j is not on the same side in every game
+            left = self.paddle_side[hits, j] == SIDE_LEFT
+            increment = BALL_VELOCITY_X_INCREMENT + paddle_speed / 10
+            spin = paddle_speed * 3
+            vx[hits] += np.where(left, -increment, increment)
+            self.bounced_off_surface[hits] = np.where(left, 4, 2)
+            self.curve[hits] += np.where(left, spin, -spin)
+            vx[hits] *= -1
+            vy[hits] += adjustment
+            self.hit_stop_timer[hits] = BALL_HIT_STOP_TICKS
+
+        return hit_paddle
+
+    def apply_curve(self, mask):
+        curve = np.clip(
+            self.curve[mask], -self.max_curve_angle[mask], self.max_curve_angle[mask]
+        )
+
+        if self.exact:
+            vx = self.ball_vx
+            vy = self.ball_vy
+            for i, c in zip(np.flatnonzero(mask).tolist(), curve.tolist()):
+                velocity_x = float(vx[i])
+                velocity_y = float(vy[i])
+                current_speed = math.sqrt(velocity_x**2 + velocity_y**2)
+                angle = math.atan2(velocity_y, velocity_x) + math.radians(c)
+                vx[i] = current_speed * math.cos(angle)
+                vy[i] = current_speed * math.sin(angle)
+        else:
+            vx = self.ball_vx[mask]
+            vy = self.ball_vy[mask]
+            current_speed = np.sqrt(vx**2 + vy**2)
+            angle = np.arctan2(vy, vx) + np.radians(curve)
+            self.ball_vx[mask] = current_speed * np.cos(angle)
+            self.ball_vy[mask] = current_speed * np.sin(angle)
+
+        # Gradually reduce curve effect
+        curve *= BALL_CURVE_DECAY
+        curve[np.abs(curve) < BALL_MIN_CURVE] = 0
+        self.curve[mask] = curve
+
+    # Score.update_score for the games in `mask`
+    def update_scores(self, mask, left, right):
+        self.left_score[mask] += left[mask]
+        self.right_score[mask] += right[mask]
+
+        ls = self.left_score
+        rs = self.right_score
+        end = self.end_score
+        deuce = self.deuce_score
+
+        self.is_deuce |= mask & self.is_deuce_on & (ls == deuce) & (rs == deuce)
+        in_deuce = mask & self.is_deuce
+
+        left_advantage = (
+            in_deuce & ~self.is_left_advantage & (ls == end) & (rs == deuce)
+        )
+        right_advantage = (
+            in_deuce
+            & ~left_advantage
+            & ~self.is_right_advantage
+            & (rs == end)
+            & (ls == deuce)
+        )
+        self.is_left_advantage |= left_advantage
+        self.left_score[left_advantage] -= 1
+        self.is_right_advantage |= right_advantage
+        self.right_score[right_advantage] -= 1
+
+        advantage_taken = left_advantage | right_advantage
+        both = advantage_taken & self.is_left_advantage & self.is_right_advantage
+        self.is_left_advantage[both] = False
+        self.is_right_advantage[both] = False
+
+        deciding = in_deuce & ~advantage_taken
+        left_wins = deciding & (ls == end) & self.is_left_advantage
+        right_wins = deciding & ~left_wins & (rs == end) & self.is_right_advantage
+
+        regular = mask & ~self.is_deuce
+        left_wins |= regular & (ls == end)
+        right_wins |= regular & ~(ls == end) & (rs == end)
+
+        self.winner[left_wins] = 1
+        self.winner[right_wins] = 2
+
+    def reset(self, mask):
+        indices = np.flatnonzero(mask)
+        if not indices.size:
+            return
+
+        # One draw per game in ascending order, like resetting Ball objects in turn
+        signs = np.array([self.rng.choice([-1, 1]) for _ in range(indices.size)])
+
+        self.ball_x[indices] = BALL_DEFAULT_POSITION_X
+        self.ball_y[indices] = BALL_DEFAULT_POSITION_Y
+        self.ball_vx[indices] = self.min_velocity_x[indices] * signs
+        self.ball_vy[indices] = self.min_velocity_y[indices]
+        self.is_out_of_bounds[indices] = False
+        self.curve[indices] = 0
+        self.bounced_off_surface[indices] = 0
+        self.hit_stop_timer[indices] = 0
+        timed = indices[~self.is_demo[indices]]
+        self.pause_timer[timed] = PAUSE_ON_RESET * GAME_TICK_RATE
+
+    def get_ball_state(self, index):
+        return {
+            "position": {
+                "x": float(self.ball_x[index]),
+                "y": float(self.ball_y[index]),
+            },
+            "velocity": {
+                "x": float(self.ball_vx[index]),
+                "y": float(self.ball_vy[index]),
+            },
+            "is_out_of_bounds": bool(self.is_out_of_bounds[index]),
+            "curve": float(self.curve[index]),
+            "bounced_off_surface": int(self.bounced_off_surface[index]),
+            "hit_stop": int(self.hit_stop_timer[index]),
+        }
+
+    def get_score(self, index):
+        return {
+            "left": int(self.left_score[index]),
+            "right": int(self.right_score[index]),
+            "is_left_advantage": bool(self.is_left_advantage[index]),
+            "is_right_advantage": bool(self.is_right_advantage[index]),
+            "is_deuce": bool(self.is_deuce[index]),
+            "winner": int(self.winner[index]),
+        }
@@ -0,0 +1,6 @@
+class InvalidInputError(ValueError):
+    """Raised when a binary client input message cannot be decoded."""
+
+
+class OutboundQueueFullError(Exception):
+    """Raised when a client reads too slowly to keep up with game messages."""
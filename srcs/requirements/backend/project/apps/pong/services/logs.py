@@ -0,0 +1,59 @@
+import logging
+
+from .constants import GAME_TRACE_INTERVAL
+
+logger = logging.getLogger("game_logs")
+
+
+class GameLog:
+    """
+    Switches of the game logs, read by the tick loop.
+
+    `debug` is the logger's level check, cached: the scheduler refreshes it
+    once per tick, so hot paths test a plain attribute and build no message
+    when debug logs are off. The level can be changed at runtime with
+    `set_level`, the next tick picks it up.
+
+    The trace logs the state of a single game, `trace_game_id`, every
+    `trace_interval` ticks, whatever the level: one game can be profiled in
+    production without turning on debug logs for all of them.
+    """
+
+    __slots__ = ("debug", "trace_game_id", "trace_interval")
+
+    def __init__(self):
+        self.debug = False
+        self.trace_game_id = None
+        self.trace_interval = GAME_TRACE_INTERVAL
+        self.refresh()
+
+    def refresh(self):
+        self.debug = logger.isEnabledFor(logging.DEBUG)
+
+    def set_level(self, level):
+        logger.setLevel(level)
+        self.refresh()
+        logger.info("ⓘ Game logs level set to %s", logging.getLevelName(level))
+
+    def start_trace(self, game_id, interval=GAME_TRACE_INTERVAL):
+        self.trace_game_id = game_id
+        self.trace_interval = max(1, int(interval))
+        logger.info("ⓘ Tracing game %s every %s ticks", game_id, self.trace_interval)
+
+    def stop_trace(self):
+        if self.trace_game_id is not None:
+            logger.info("ⓘ Stopped tracing game %s", self.trace_game_id)
+        self.trace_game_id = None
+
+    def is_traced(self, game_id, tick):
+        return game_id == self.trace_game_id and tick % self.trace_interval == 0
+
+    def get_state(self):
+        return {
+            "level": logging.getLevelName(logger.getEffectiveLevel()),
+            "trace_game_id": self.trace_game_id,
+            "trace_interval": self.trace_interval,
+        }
+
+
+game_log = GameLog()
@@ -0,0 +1,168 @@
+import math
+from bisect import bisect_left
+
+from .constants import INPUT_UPDATE_PADDLE_OPCODE, INPUT_PONG_OPCODE
+
+# Prometheus text exposition format
+#
+# Metrics are plain Python numbers updated in place from the event loop, so
+# recording one costs an attribute increment; everything else is done when
+# Prometheus scrapes them. Metrics sharing a name form one family, told
+# apart by their labels.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds: the tick budget is 16.7 ms at 60 Hz
+TICK_DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.0167, 0.025, 0.05, 0.1)
+RTT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.15, 0.2, 0.3, 0.5, 1, 2)
+
+
+def escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        f'{name}="{escape_label_value(value)}"' for name, value in labels.items()
+    )
+    return f"{{{pairs}}}"
+
+
+def format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.families = {}  # name -> (type, documentation, [metric])
+
+    def register(self, metric):
+        family = self.families.setdefault(
+            metric.name, (metric.type, metric.documentation, [])
+        )
+        family[2].append(metric)
+
+    def render(self):
+        lines = []
+        for name, (metric_type, documentation, metrics) in self.families.items():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for metric in metrics:
+                for suffix, labels, value in metric.collect():
+                    lines.append(
+                        f"{name}{suffix}{format_labels(labels)} {format_value(value)}"
+                    )
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, documentation, labels=None, registry=registry):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels or {}
+        self.value = 0
+        registry.register(self)
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def collect(self):
+        yield "", self.labels, self.value
+
+
+class Gauge:
+    """A value read when scraped, from `function`."""
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, function, labels=None, registry=registry):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+        self.labels = labels or {}
+        registry.register(self)
+
+    def collect(self):
+        yield "", self.labels, self.function()
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, documentation, buckets, labels=None, registry=registry):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labels = labels or {}
+        # Per bucket counts, the last one for values above every bound
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        registry.register(self)
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def collect(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            cumulative += count
+            yield "_bucket", {**self.labels, "le": format_value(bound)}, cumulative
+        yield "_sum", self.labels, self.sum
+        yield "_count", self.labels, cumulative
+
+
+TICK_DURATION = Histogram(
+    "pong_tick_duration_seconds",
+    "Time spent stepping and flushing every game for one scheduler wakeup.",
+    TICK_DURATION_BUCKETS,
+)
+TICK_OVERRUNS = Counter(
+    "pong_tick_overruns_total",
+    "Scheduler wakeups that had to simulate more than one tick.",
+)
+DROPPED_TICKS = Counter(
+    "pong_dropped_ticks_total",
+    "Ticks skipped because the game loop lagged too far behind.",
+)
+FRAMES_SENT = Counter(
+    "pong_frames_sent_total",
+    "Binary game frames written to websocket connections.",
+)
+FRAMES_DROPPED = Counter(
+    "pong_frames_dropped_total",
+    "Stale game frames dropped from the queue of a slow connection.",
+)
+WRITES_HELD = Counter(
+    "pong_writes_held_total",
+    "Times a connection stopped writing until its client acknowledged its data.",
+)
+BYTES_SENT = Counter(
+    "pong_bytes_sent_total",
+    "Bytes written to websocket connections, frames and messages.",
+)
+INPUTS = {
+    opcode: Counter(
+        "pong_inputs_total",
+        "Binary client inputs received, by kind.",
+        {"kind": kind},
+    )
+    for opcode, kind in (
+        (INPUT_UPDATE_PADDLE_OPCODE, "update_paddle"),
+        (INPUT_PONG_OPCODE, "pong"),
+    )
+}
+RTT = Histogram(
+    "pong_rtt_seconds",
+    "Round-trip times measured with pings.",
+    RTT_BUCKETS,
+)
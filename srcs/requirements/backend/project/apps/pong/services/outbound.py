@@ -0,0 +1,263 @@
+import asyncio
+import logging
+import time
+import weakref
+from collections import deque
+
+from .constants import (
+    GAME_STATE_MESSAGE_TYPE,
+    GAME_UPDATE_MESSAGE_TYPE,
+    OUTBOUND_QUEUE_SIZE,
+    OUTBOUND_MAX_PINGS,
+    BANDWIDTH_SMOOTHING,
+)
+from .exceptions import OutboundQueueFullError
+from .metrics import Gauge, FRAMES_SENT, FRAMES_DROPPED, WRITES_HELD, BYTES_SENT
+
+logger = logging.getLogger("game_logs")
+
+MESSAGE = 0  # JSON game state, errors: always delivered
+KEYFRAME = 1  # full frame: supersedes every queued frame
+DELTA = 2  # delta to the latest keyframe: supersedes the queued delta
+
+
+def get_message_kind(bytes_data):
+    if bytes_data:
+        if bytes_data[0] == GAME_UPDATE_MESSAGE_TYPE:
+            return DELTA
+        if bytes_data[0] == GAME_STATE_MESSAGE_TYPE:
+            return KEYFRAME
+    return MESSAGE
+
+
+class OutboundQueue:
+    """
+    Bounded queue between a game and one websocket connection.
+
+    `put` never waits, so a slow reader cannot hold up the tick loop; a
+    writer task drains the queue in order. While the client lags, frames
+    are coalesced: only the newest keyframe and the newest delta are kept,
+    which is enough to rebuild the latest state. Other messages are never
+    dropped; if they alone fill the queue, `put` raises
+    OutboundQueueFullError and the caller should give up on the client.
+
+    Writing to the connection does not tell whether the client reads: the
+    server buffers whatever it is given. The client's own answers do. A
+    ping put with `put_ping` is written ahead of the queue, and once the
+    client answers it (`acknowledge`) everything written before it has
+    arrived. With `max_unacked_bytes`, the writer holds frames when more
+    than that was written and not acknowledged, so the backlog of a stalled
+    client stays here, bounded and coalesced, instead of in the server's
+    buffers. Other messages are rare and never dropped: they are still
+    written, ahead of the held frames.
+
+    Between two acknowledgements during which frames were held, the client
+    read as fast as its link allowed: the bytes it acknowledged over that
+    time are its bandwidth, `bandwidth`, in bytes per second. It is None
+    when the client kept up with everything it was sent.
+    """
+
+    def __init__(
+        self,
+        send,
+        max_size=OUTBOUND_QUEUE_SIZE,
+        max_unacked_bytes=None,
+        time_source=time.monotonic,
+    ):
+        self.send = send
+        self.max_size = max_size
+        self.max_unacked_bytes = max_unacked_bytes
+        self.time_source = time_source
+        self.queue = deque()
+        self.ping = None  # (ping id, payload) to write ahead of the queue
+        self.pings = deque(maxlen=OUTBOUND_MAX_PINGS)  # (ping id, bytes sent) written
+        self.ready = asyncio.Event()
+        self.task = None
+        self.is_closed = False
+        self.is_held = False
+        self.was_held = False  # since the last acknowledgement
+        self.acked_at = None
+        self.sent = 0
+        self.bytes_sent = 0
+        self.bytes_acked = 0
+        self.dropped = 0
+        self.held = 0
+        self.max_depth = 0
+        self.bandwidth = None
+
+    def start(self):
+        self.is_closed = False
+        open_queues.add(self)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        self.queue.clear()
+        self.ping = None
+        self.is_closed = True
+        open_queues.discard(self)
+
+    def put(self, text_data=None, bytes_data=None):
+        if self.is_closed:
+            return
+
+        kind = get_message_kind(bytes_data)
+
+        if kind != MESSAGE and self.queue:
+            self.coalesce(kind)
+
+        if len(self.queue) >= self.max_size:
+            raise OutboundQueueFullError(
+                f"Outbound queue full ({len(self.queue)} messages)"
+            )
+
+        self.queue.append((kind, text_data, bytes_data))
+        self.max_depth = max(self.max_depth, len(self.queue))
+        self.ready.set()
+
+    def put_ping(self, ping_id, bytes_data):
+        if self.is_closed:
+            return
+
+        # A ping not written yet is replaced, it would tell nothing more
+        self.ping = (ping_id, bytes_data)
+        self.ready.set()
+
+    def acknowledge(self, ping_id):
+        """The client answered `ping_id`: it received everything before it."""
+        for index, (written_id, bytes_sent) in enumerate(self.pings):
+            if written_id == ping_id:
+                for _ in range(index + 1):
+                    self.pings.popleft()
+                self.update_bandwidth(bytes_sent)
+                self.bytes_acked = max(self.bytes_acked, bytes_sent)
+                self.ready.set()
+                return True
+        return False
+
+    def update_bandwidth(self, bytes_acked):
+        now = self.time_source()
+        if not self.was_held:
+            # The link carried everything, its limit is unknown
+            self.bandwidth = None
+        elif self.acked_at is not None and now > self.acked_at:
+            sample = (bytes_acked - self.bytes_acked) / (now - self.acked_at)
+            if self.bandwidth is None:
+                self.bandwidth = sample
+            else:
+                self.bandwidth += BANDWIDTH_SMOOTHING * (sample - self.bandwidth)
+        self.acked_at = now
+        self.was_held = False
+
+    def get_unacked_bytes(self):
+        return self.bytes_sent - self.bytes_acked
+
+    def is_client_behind(self):
+        return (
+            self.max_unacked_bytes is not None
+            and self.get_unacked_bytes() > self.max_unacked_bytes
+        )
+
+    def coalesce(self, kind):
+        # A keyframe replaces every queued frame, a delta only the queued delta
+        superseded = (KEYFRAME, DELTA) if kind == KEYFRAME else (DELTA,)
+        depth = len(self.queue)
+        self.queue = deque(entry for entry in self.queue if entry[0] not in superseded)
+
+        dropped = depth - len(self.queue)
+        if dropped:
+            if not self.dropped:
+                logger.warning("⚠️ Slow client, dropping stale game frames")
+            self.dropped += dropped
+            FRAMES_DROPPED.inc(dropped)
+
+    async def run(self):
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            await self.flush()
+
+    async def flush(self):
+        while True:
+            if self.ping is not None:
+                # Always written: its answer is what lets a held writer resume
+                ping_id, bytes_data = self.ping
+                self.ping = None
+                await self.write(MESSAGE, None, bytes_data)
+                self.pings.append((ping_id, self.bytes_sent))
+                continue
+
+            if not self.queue:
+                return
+
+            if not self.is_client_behind():
+                self.is_held = False
+                await self.write(*self.queue.popleft())
+                continue
+
+            # Frames wait here, coalesced, until the client acknowledges;
+            # the few other messages go ahead of them
+            self.was_held = True
+            if not self.is_held:
+                self.is_held = True
+                self.held += 1
+                WRITES_HELD.inc()
+                logger.debug(
+                    "ⓘ Client behind by %s bytes, holding its frames",
+                    self.get_unacked_bytes(),
+                )
+            index = next(
+                (i for i, entry in enumerate(self.queue) if entry[0] == MESSAGE), None
+            )
+            if index is None:
+                return
+            entry = self.queue[index]
+            del self.queue[index]
+            await self.write(*entry)
+
+    async def write(self, kind, text_data, bytes_data):
+        await self.send(text_data=text_data, bytes_data=bytes_data)
+        size = len(bytes_data or text_data)
+        self.sent += 1
+        self.bytes_sent += size
+        BYTES_SENT.inc(size)
+        if kind != MESSAGE:
+            FRAMES_SENT.inc()
+
+    def get_stats(self):
+        return {
+            "depth": len(self.queue),
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "bytes_sent": self.bytes_sent,
+            "unacked_bytes": self.get_unacked_bytes(),
+            "dropped": self.dropped,
+            "held": self.held,
+            "bandwidth": self.bandwidth,
+        }
+
+
+open_queues = weakref.WeakSet()  # queues of the connections open in this process
+
+Gauge(
+    "pong_connections",
+    "Open game and spectator connections.",
+    lambda: len(open_queues),
+)
+Gauge(
+    "pong_outbound_queue_depth_max",
+    "Deepest outbound queue among open connections.",
+    lambda: max((len(queue.queue) for queue in open_queues), default=0),
+)
+Gauge(
+    "pong_outbound_queued_messages",
+    "Messages waiting in the outbound queues of every open connection.",
+    lambda: sum(len(queue.queue) for queue in open_queues),
+)
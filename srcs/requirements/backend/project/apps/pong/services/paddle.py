@@ -12,6 +12,19 @@ logger = logging.getLogger("game_logs")
 
 
 class Paddle:
+    __slots__ = (
+        "name",
+        "side",
+        "position",
+        "direction",
+        "speed",
+        "boundary",
+        "width",
+        "base_height",
+        "height",
+        "input_sequence",
+    )
+
     def __init__(
         self,
         name,
@@ -30,6 +43,7 @@ class Paddle:
         self.width = width
         self.base_height = height  # Minimum height of the paddle
         self.height = height  # Current height of the paddle
+        self.input_sequence = 0  # Last applied client input, echoed in every frame
 
     def reset(self):
         self.position = 50
@@ -71,3 +85,11 @@ class Paddle:
     def set_direction(self, direction):
         if direction in [-1, 0, 1]:
             self.direction = direction
+
+    def apply_input(self, direction, sequence):
+        # Sequences are u16 and wrap around: only accept inputs newer than the last one
+        if 0 < (sequence - self.input_sequence) & 0xFFFF < 0x8000:
+            self.input_sequence = sequence
+            self.set_direction(direction)
+            return True
+        return False
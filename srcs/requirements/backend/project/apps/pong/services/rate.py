@@ -0,0 +1,135 @@
+import logging
+
+from .constants import (
+    GAME_TICK_RATE,
+    GAME_STATE_MESSAGE_TYPE,
+    FRAME_RATES,
+    RTT_SMOOTHING,
+    SEND_RATE_MAX_RTT,
+    SEND_RATE_BANDWIDTH_HEADROOM,
+    SEND_RATE_STEP_UP_CHECKS,
+)
+from .metrics import RTT
+
+logger = logging.getLogger("game_logs")
+
+# Weight of the newest frame in the moving frame size average
+FRAME_SIZE_SMOOTHING = 0.05
+
+
+class SendRateController:
+    """
+    Frame rate of one connection, adapted to its link.
+
+    The simulation always runs at GAME_TICK_RATE; only the frames sent to
+    the client are thinned out to one of FRAME_RATES. The rate steps down
+    as soon as the round-trip time measured with pings gets too high, the
+    outbound queue had to drop frames, or the bandwidth the client
+    acknowledged while its frames were held cannot carry the frame stream. It only steps back up after
+    SEND_RATE_STEP_UP_CHECKS good checks in a row, so that it does not flap
+    on a noisy link. Keyframes are always sent: deltas refer to them.
+    """
+
+    def __init__(self, rates=FRAME_RATES):
+        self.rates = sorted(rates, reverse=True)
+        self.level = 0
+        self.last_sent_tick = None
+        self.frame_size = 0.0  # smoothed size of the frames sent, in bytes
+        self.rtt = None  # smoothed round-trip time, in seconds
+        self.ping_id = 0
+        self.ping_sent_at = None
+        self.dropped = 0  # frames dropped by the outbound queue at the last check
+        self.good_checks = 0
+
+    @property
+    def rate(self):
+        return self.rates[self.level]
+
+    @property
+    def frame_interval(self):
+        return GAME_TICK_RATE // self.rate
+
+    def should_send(self, tick, frame):
+        # Ticks can advance by more than one per frame when the loop catches up
+        if not (
+            frame[0] == GAME_STATE_MESSAGE_TYPE
+            or self.last_sent_tick is None
+            or (tick - self.last_sent_tick) * self.rate >= GAME_TICK_RATE
+        ):
+            return False
+
+        self.last_sent_tick = tick
+        self.frame_size += FRAME_SIZE_SMOOTHING * (len(frame) - self.frame_size)
+        return True
+
+    def start_ping(self, now):
+        # A ping that was never answered is simply replaced
+        self.ping_id = (self.ping_id + 1) & 0xFFFF
+        self.ping_sent_at = now
+        return self.ping_id
+
+    def receive_pong(self, ping_id, now):
+        if ping_id != self.ping_id or self.ping_sent_at is None:
+            return
+
+        sample = now - self.ping_sent_at
+        self.ping_sent_at = None
+        RTT.observe(sample)
+        if self.rtt is None:
+            self.rtt = sample
+        else:
+            self.rtt += RTT_SMOOTHING * (sample - self.rtt)
+
+    def is_link_good_for(self, level, bandwidth):
+        if level < len(SEND_RATE_MAX_RTT) and (
+            self.rtt is not None and self.rtt > SEND_RATE_MAX_RTT[level]
+        ):
+            return False
+        # A client that keeps up never showed the limit of its link
+        needed = self.frame_size * self.rates[level] * SEND_RATE_BANDWIDTH_HEADROOM
+        return bandwidth is None or bandwidth >= needed
+
+    def check(self, dropped, bandwidth):
+        """
+        Adapt the rate to the latest measurements: `dropped` is the number
+        of frames the outbound queue dropped so far, `bandwidth` the
+        throughput it measured from the client's acknowledgements. Returns
+        True if the rate changed.
+        """
+        has_dropped = dropped > self.dropped
+        self.dropped = dropped
+
+        if self.level + 1 < len(self.rates) and (
+            has_dropped or not self.is_link_good_for(self.level, bandwidth)
+        ):
+            self.level += 1
+            self.good_checks = 0
+            logger.info(
+                f"ⓘ Send rate lowered to {self.rate} Hz "
+                f"(rtt {self.format_rtt()}, bandwidth {bandwidth})"
+            )
+            return True
+
+        if self.level > 0 and not has_dropped:
+            if not self.is_link_good_for(self.level - 1, bandwidth):
+                self.good_checks = 0
+                return False
+            self.good_checks += 1
+            if self.good_checks >= SEND_RATE_STEP_UP_CHECKS:
+                self.level -= 1
+                self.good_checks = 0
+                logger.info(
+                    f"ⓘ Send rate raised to {self.rate} Hz (rtt {self.format_rtt()})"
+                )
+                return True
+        return False
+
+    def format_rtt(self):
+        return "unknown" if self.rtt is None else f"{self.rtt * 1000:.0f} ms"
+
+    def get_stats(self):
+        return {
+            "rate": self.rate,
+            "rtt": self.rtt,
+            "frame_size": self.frame_size,
+        }
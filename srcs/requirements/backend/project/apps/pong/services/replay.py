@@ -0,0 +1,137 @@
+import json
+import random
+import struct
+import zlib
+
+from .ball import Ball
+from .paddle import Paddle
+from .score import Score
+from .encoder import FrameEncoder
+from .constants import GAME_KEYFRAME_INTERVAL
+
+# Replay file (zlib compressed, little endian)
+#
+# Header:         magic "PONG" (4s), replay version (u8), metadata length (u32)
+# Metadata:       utf-8 JSON: seed, game mode, score settings, controllers,
+#                 initial ball state, dimension changes, total ticks
+# Inputs:         per applied input: tick (u32), paddle index (u8), direction (i8),
+#                 input sequence (u16)
+
+REPLAY_MAGIC = b"PONG"
+REPLAY_VERSION = 1
+
+REPLAY_HEADER_STRUCT = struct.Struct("<4s B I")
+REPLAY_INPUT_STRUCT = struct.Struct("<I B b H")
+
+
+class GameReplay:
+    """
+    Append-only record of one game: everything needed to simulate it again.
+
+    The simulation only depends on the seed of the ball's RNG, the settings,
+    the initial ball state and the inputs applied at each tick. An input
+    recorded at tick T was applied after T steps, before step T + 1.
+    """
+
+    def __init__(self, seed, game_mode, controllers, score_settings, ball_state):
+        self.seed = seed
+        self.game_mode = game_mode
+        self.controllers = controllers  # [(name, side)] in paddle index order
+        self.score_settings = score_settings  # (end_score, is_deuce_on) or None
+        self.ball_state = ball_state
+        self.dimension_changes = []  # [(tick, width, height)]
+        self.inputs = bytearray()
+        self.ticks = 0
+
+    def record_input(self, tick, paddle_index, direction, sequence):
+        self.inputs += REPLAY_INPUT_STRUCT.pack(tick, paddle_index, direction, sequence)
+
+    def record_dimensions(self, tick, width, height):
+        self.dimension_changes.append((tick, width, height))
+
+    def iter_inputs(self):
+        return REPLAY_INPUT_STRUCT.iter_unpack(self.inputs)
+
+    def to_bytes(self):
+        metadata = json.dumps(
+            {
+                "seed": self.seed,
+                "game_mode": self.game_mode,
+                "controllers": self.controllers,
+                "score_settings": self.score_settings,
+                "ball_state": self.ball_state,
+                "dimension_changes": self.dimension_changes,
+                "ticks": self.ticks,
+            }
+        ).encode("utf-8")
+        return zlib.compress(
+            REPLAY_HEADER_STRUCT.pack(REPLAY_MAGIC, REPLAY_VERSION, len(metadata))
+            + metadata
+            + self.inputs
+        )
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = zlib.decompress(data)
+        magic, version, length = REPLAY_HEADER_STRUCT.unpack_from(data, 0)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f"Unsupported replay: {magic!r} version {version}")
+
+        offset = REPLAY_HEADER_STRUCT.size
+        metadata = json.loads(data[offset : offset + length].decode("utf-8"))
+        score_settings = metadata["score_settings"]
+        replay = cls(
+            metadata["seed"],
+            metadata["game_mode"],
+            [tuple(controller) for controller in metadata["controllers"]],
+            tuple(score_settings) if score_settings else None,
+            metadata["ball_state"],
+        )
+        replay.dimension_changes = [
+            tuple(change) for change in metadata["dimension_changes"]
+        ]
+        replay.inputs = bytearray(data[offset + length :])
+        replay.ticks = metadata["ticks"]
+        return replay
+
+
+def replay_game(replay):
+    """
+    Simulate a recorded game again, headless and as fast as possible.
+
+    Yields (tick, ball, paddles, score) after every step; the objects are
+    updated in place.
+    """
+    ball = Ball(rng=random.Random(replay.seed))
+    ball.set_state(replay.ball_state)
+    paddles = [Paddle(name=name, side=side) for name, side in replay.controllers]
+    score = Score(*replay.score_settings) if replay.score_settings else None
+
+    inputs = replay.iter_inputs()
+    next_input = next(inputs, None)
+    dimension_changes = iter(replay.dimension_changes)
+    next_dimensions = next(dimension_changes, None)
+
+    for tick in range(replay.ticks):
+        while next_input is not None and next_input[0] == tick:
+            _, paddle_index, direction, sequence = next_input
+            paddles[paddle_index].set_direction(direction)
+            paddles[paddle_index].input_sequence = sequence
+            next_input = next(inputs, None)
+        while next_dimensions is not None and next_dimensions[0] == tick:
+            ball.set_ball_dimensions(*next_dimensions[1:])
+            next_dimensions = next(dimension_changes, None)
+
+        for paddle in paddles:
+            paddle.update_position()
+        ball.update_ball(replay.game_mode, paddles, score)
+
+        yield tick + 1, ball, paddles, score
+
+
+def replay_frames(replay, keyframe_interval=GAME_KEYFRAME_INTERVAL):
+    """Yield the binary frame of every tick of a recorded game."""
+    encoder = FrameEncoder(len(replay.controllers), keyframe_interval)
+
+    for tick, ball, paddles, _ in replay_game(replay):
+        yield encoder.encode(tick, ball, paddles)
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from collections import OrderedDict
+
+from channels.db import database_sync_to_async
+
+from .constants import (
+    RESULT_WORKERS,
+    RESULT_QUEUE_SIZE,
+    RESULT_RETRY_DELAYS,
+    RESULT_HISTORY_SIZE,
+)
+
+logger = logging.getLogger("game_logs")
+
+
+class ResultQueue:
+    """
+    Game results applied in the background by a bounded pool of workers.
+
+    `submit` never waits, so the tick loop never waits on the database.
+    Results are keyed by match: one that is already queued, or was applied
+    recently, is dropped. A failing result is retried after each of
+    `retry_delays` seconds, then given up.
+    """
+
+    def __init__(
+        self,
+        handler,
+        workers=RESULT_WORKERS,
+        maxsize=RESULT_QUEUE_SIZE,
+        retry_delays=RESULT_RETRY_DELAYS,
+        history_size=RESULT_HISTORY_SIZE,
+    ):
+        self.handler = handler  # async, called with the submitted arguments
+        self.workers = workers
+        self.maxsize = maxsize
+        self.retry_delays = retry_delays
+        self.history_size = history_size
+        self.loop = None
+        self.queue = None
+        self.tasks = []
+        self.pending = set()  # keys queued or being applied
+        self.applied = OrderedDict()  # keys of the latest results applied
+        self.retries = 0
+        self.failed = 0
+
+    def submit(self, key, *args):
+        """Queue a result. Returns False if it was dropped."""
+        if key in self.pending or key in self.applied:
+            logger.debug(f"ⓘ Result {key} already reported, dropped")
+            return False
+
+        self.start()
+        try:
+            self.queue.put_nowait((key, args))
+        except asyncio.QueueFull:
+            logger.error(f"✕ Result queue full, result {key} dropped")
+            return False
+        self.pending.add(key)
+        return True
+
+    def start(self):
+        # The queue and its workers belong to the running event loop
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.loop = loop
+            self.queue = asyncio.Queue(self.maxsize)
+            self.tasks = []
+            self.pending.clear()
+
+        self.tasks = [task for task in self.tasks if not task.done()]
+        while len(self.tasks) < self.workers:
+            self.tasks.append(asyncio.create_task(self.work()))
+
+    async def work(self):
+        while True:
+            key, args = await self.queue.get()
+            try:
+                await self.apply(key, args)
+            finally:
+                self.pending.discard(key)
+                self.queue.task_done()
+
+    async def apply(self, key, args):
+        for retry, delay in enumerate((0, *self.retry_delays)):
+            if retry:
+                self.retries += 1
+                await asyncio.sleep(delay)
+            try:
+                await self.handler(*args)
+            except Exception as e:
+                logger.warning(f"⚠️ Result {key} failed (attempt {retry + 1}): {e}")
+                continue
+
+            self.applied[key] = True
+            if len(self.applied) > self.history_size:
+                self.applied.popitem(last=False)
+            return
+
+        self.failed += 1
+        logger.error(f"✕ Result {key} given up after {retry + 1} attempts")
+
+    async def join(self):
+        if self.queue is not None:
+            await self.queue.join()
+
+    def get_stats(self):
+        return {
+            "depth": self.queue.qsize() if self.queue else 0,
+            "pending": len(self.pending),
+            "retries": self.retries,
+            "failed": self.failed,
+        }
+
+
+async def record_tournament_result(tournament_id, winner_name, loser_name, score):
+    from project.apps.tournaments.services import update_bracket
+
+    # Off the event loop thread, next to other results: the lock on the
+    # tournament row orders results of the same tournament
+    await database_sync_to_async(update_bracket, thread_sensitive=False)(
+        tournament_id, winner_name, score, loser_name
+    )
+
+
+tournament_results = ResultQueue(record_tournament_result)
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import uuid
+
+from .constants import GAME_TICK_RATE, GAME_STATE_MESSAGE_TYPE, ROOM_PING_TIMEOUT
+from .encoder import with_frame_interval
+
+logger = logging.getLogger("game_logs")
+
+# Channel layer message types
+ROOM_FRAME = "room.frame"  # binary game frame, to subscribers
+ROOM_STATE = "room.state"  # JSON game state, to subscribers
+ROOM_CLOSED = "room.closed"  # the game is over or its owner left, to subscribers
+ROOM_SUBSCRIBE = "room.subscribe"  # a subscriber joined, to the owner
+ROOM_UNSUBSCRIBE = "room.unsubscribe"  # a subscriber left, to the owner
+ROOM_PING = "room.ping"  # is the room open, to the owner
+ROOM_PONG = "room.pong"  # the room is open, to the channel that asked
+
+
+def get_room_group_name(game_id, rate=GAME_TICK_RATE):
+    return f"pong.room.{game_id}.{rate}"
+
+
+def get_room_owner_group_name(game_id):
+    return f"pong.room.{game_id}.owner"
+
+
+async def join_room(channel_layer, game_id, channel_name, rate=GAME_TICK_RATE):
+    await channel_layer.group_add(get_room_group_name(game_id, rate), channel_name)
+    await channel_layer.group_send(
+        get_room_owner_group_name(game_id), {"type": ROOM_SUBSCRIBE, "rate": rate}
+    )
+
+
+async def leave_room(channel_layer, game_id, channel_name, rate=GAME_TICK_RATE):
+    await channel_layer.group_discard(get_room_group_name(game_id, rate), channel_name)
+    await channel_layer.group_send(
+        get_room_owner_group_name(game_id), {"type": ROOM_UNSUBSCRIBE, "rate": rate}
+    )
+
+
+async def find_room(channel_layer, game_id, timeout=ROOM_PING_TIMEOUT):
+    """
+    Ask the owner of the room, in whatever process it runs, if it is open.
+    False when nobody answers within `timeout` seconds.
+    """
+    reply_channel = await channel_layer.new_channel()
+    await channel_layer.group_send(
+        get_room_owner_group_name(game_id),
+        {"type": ROOM_PING, "reply_channel": reply_channel},
+    )
+    try:
+        await asyncio.wait_for(channel_layer.receive(reply_channel), timeout)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+def get_local_room(game_id):
+    """Return the room if its game runs in this process."""
+    return local_rooms.get(game_id)
+
+
+class GameRoom:
+    """
+    Channel layer address of one game.
+
+    The process that runs the simulation owns the room and is the only one
+    stepping it. It listens on the owner group, so subscribers connected to
+    any worker can announce themselves, and publishes every frame once to
+    the room group, which the channel layer fans out to them. Subscribers
+    in the owner's process attach directly and get the same frame object
+    without going through the layer. Without subscribers nothing is
+    published, so local games pay nothing.
+
+    Subscribers pick a frame rate. Lower rates skip deltas, keyframes are
+    always published to every rate. The frame interval hint is rewritten
+    for each rate.
+    """
+
+    def __init__(self, channel_layer, game_id=None, on_subscribe=None):
+        self.channel_layer = channel_layer
+        self.game_id = game_id or uuid.uuid4().hex
+        self.on_subscribe = on_subscribe
+        self.owner_group_name = get_room_owner_group_name(self.game_id)
+        self.owner_channel_name = None
+        self.subscribers = {}  # frame rate -> subscriber count on the channel layer
+        self.local_subscribers = {}  # frame rate -> consumers in this process
+        self.last_published_ticks = {}  # frame rate -> tick of the last frame
+
+    async def open(self, owner_channel_name):
+        self.owner_channel_name = owner_channel_name
+        if self.channel_layer is not None:
+            await self.channel_layer.group_add(
+                self.owner_group_name, owner_channel_name
+            )
+        local_rooms[self.game_id] = self
+        logger.debug(f"ⓘ Game room {self.game_id} opened")
+
+    async def close(self):
+        if self.owner_channel_name is None:
+            return
+
+        local_rooms.pop(self.game_id, None)
+        await self.group_send_all({"type": ROOM_CLOSED})
+        for subscribers in list(self.local_subscribers.values()):
+            for subscriber in list(subscribers):
+                await subscriber.room_closed({"type": ROOM_CLOSED})
+        if self.channel_layer is not None:
+            await self.channel_layer.group_discard(
+                self.owner_group_name, self.owner_channel_name
+            )
+        self.owner_channel_name = None
+        self.subscribers = {}
+        self.local_subscribers = {}
+        logger.debug(f"ⓘ Game room {self.game_id} closed")
+
+    async def subscribe(self, rate=GAME_TICK_RATE):
+        self.subscribers[rate] = self.subscribers.get(rate, 0) + 1
+        await self.welcome()
+
+    def unsubscribe(self, rate=GAME_TICK_RATE):
+        count = self.subscribers.get(rate, 0) - 1
+        if count > 0:
+            self.subscribers[rate] = count
+        else:
+            self.subscribers.pop(rate, None)
+
+    async def pong(self, reply_channel):
+        await self.channel_layer.send(reply_channel, {"type": ROOM_PONG})
+
+    async def attach(self, subscriber, rate=GAME_TICK_RATE):
+        # `subscriber` is a consumer of this process with async send/room_closed
+        self.local_subscribers.setdefault(rate, []).append(subscriber)
+        await self.welcome()
+
+    def detach(self, subscriber, rate=GAME_TICK_RATE):
+        subscribers = self.local_subscribers.get(rate, [])
+        if subscriber in subscribers:
+            subscribers.remove(subscriber)
+        if not subscribers:
+            self.local_subscribers.pop(rate, None)
+
+    async def welcome(self):
+        # A new subscriber needs the full state before it can apply deltas
+        if self.on_subscribe is not None:
+            await self.on_subscribe()
+
+    def get_rates(self):
+        if not self.local_subscribers:
+            return self.subscribers.keys()
+        return self.subscribers.keys() | self.local_subscribers.keys()
+
+    async def group_send_all(self, message):
+        for rate in self.subscribers:
+            await self.channel_layer.group_send(
+                get_room_group_name(self.game_id, rate), message
+            )
+
+    async def publish_frame(self, frame, tick):
+        if not self.subscribers and not self.local_subscribers:
+            return
+
+        is_keyframe = frame[0] == GAME_STATE_MESSAGE_TYPE
+        for rate in self.get_rates():
+            # Ticks can advance by more than one per frame when the loop catches up
+            last_tick = self.last_published_ticks.get(rate)
+            if not (
+                is_keyframe
+                or last_tick is None
+                or (tick - last_tick) * rate >= GAME_TICK_RATE
+            ):
+                continue
+
+            self.last_published_ticks[rate] = tick
+            rate_frame = with_frame_interval(frame, GAME_TICK_RATE // rate)
+            for subscriber in self.local_subscribers.get(rate, ()):
+                await subscriber.send(bytes_data=rate_frame)
+            if rate in self.subscribers:
+                await self.channel_layer.group_send(
+                    get_room_group_name(self.game_id, rate),
+                    {"type": ROOM_FRAME, "bytes": rate_frame},
+                )
+
+    async def publish_state(self, text):
+        for subscribers in self.local_subscribers.values():
+            for subscriber in subscribers:
+                await subscriber.send(text_data=text)
+        await self.group_send_all({"type": ROOM_STATE, "text": text})
+
+
+local_rooms = {}  # game id -> room owned by this process
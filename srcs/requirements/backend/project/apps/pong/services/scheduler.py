@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import time
+
+from .clock import FixedTimestepClock
+from .constants import GAME_HEARTBEAT_INTERVAL
+from .logs import game_log
+from .metrics import Gauge, TICK_DURATION
+
+logger = logging.getLogger("game_logs")
+
+# Weight of the newest sample in the moving tick duration average
+TICK_STATS_SMOOTHING = 0.05
+
+
+class GameScheduler:
+    """
+    Per-process tick loop shared by every active game.
+
+    A game is any object exposing:
+      - `is_paused`, `is_idle`: the game rests (neither stepped nor flushed)
+        while either is True
+      - `async step()`: advance the simulation by one tick
+      - `async flush()`: send the frame for the current state
+      - `async heartbeat()`: called about once per `heartbeat_interval`
+        seconds while the game rests
+
+    All games are stepped in a batch, then their frames are flushed together,
+    so the process wakes up once per tick instead of once per game. When
+    every game rests, the loop only wakes up for heartbeats.
+    """
+
+    def __init__(
+        self,
+        clock_factory=FixedTimestepClock,
+        heartbeat_interval=GAME_HEARTBEAT_INTERVAL,
+        time_source=time.monotonic,
+    ):
+        self.clock_factory = clock_factory
+        self.clock = None
+        self.heartbeat_interval = heartbeat_interval
+        self.time_source = time_source
+        self.next_heartbeat = 0.0
+        self.wakeup = None
+        self.games = []
+        self.task = None
+        self.ticks = 0
+        self.last_tick_duration = 0.0
+        self.last_step_duration = 0.0
+        self.last_flush_duration = 0.0
+        self.average_tick_duration = 0.0
+        self.max_tick_duration = 0.0
+
+    def add_game(self, game):
+        if game not in self.games:
+            self.games.append(game)
+            logger.debug(f"ⓘ Game added to scheduler. Active games: {len(self.games)}")
+
+        if self.task is None or self.task.done():
+            self.clock = self.clock_factory()
+            self.task = asyncio.create_task(self.run())
+            logger.info("✓ Game scheduler started")
+
+    def remove_game(self, game):
+        if game in self.games:
+            self.games.remove(game)
+            logger.debug(
+                f"ⓘ Game removed from scheduler. Active games: {len(self.games)}"
+            )
+
+    def has_game(self, game):
+        return game in self.games
+
+    def wake(self):
+        # A game stopped resting: don't wait for the next heartbeat to step it
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    @staticmethod
+    def is_running(game):
+        return not (game.is_paused or game.is_idle)
+
+    async def run(self):
+        self.wakeup = asyncio.Event()
+        self.next_heartbeat = self.time_source() + self.heartbeat_interval
+        try:
+            while self.games:
+                if self.time_source() >= self.next_heartbeat:
+                    self.next_heartbeat = self.time_source() + self.heartbeat_interval
+                    await self.heartbeat()
+
+                if not any(self.is_running(game) for game in self.games):
+                    await self.rest()
+                    continue
+
+                ticks_due = self.clock.advance()
+                if ticks_due:
+                    await self.tick(ticks_due)
+
+                await asyncio.sleep(self.clock.time_until_next_tick())
+        except asyncio.CancelledError:
+            logger.info("✓ Game scheduler cancelled.")
+            raise
+        finally:
+            logger.info(f"✓ Game scheduler stopped. Stats: {self.get_stats()}")
+
+    async def rest(self):
+        # Sleep until the next heartbeat, or until a game wakes the loop up
+        self.wakeup.clear()
+        try:
+            await asyncio.wait_for(
+                self.wakeup.wait(), self.next_heartbeat - self.time_source()
+            )
+        except asyncio.TimeoutError:
+            pass
+        # The time spent resting must not be simulated as lag
+        self.clock.reset()
+
+    async def heartbeat(self):
+        games = [game for game in self.games if not self.is_running(game)]
+        results = await asyncio.gather(
+            *(game.heartbeat() for game in games), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"✕ Error during game heartbeat: {result}")
+
+    async def tick(self, ticks_due):
+        tick_start = time.perf_counter()
+        # The level may change at runtime: checked once per tick, not per log
+        game_log.refresh()
+        games = [game for game in self.games if self.is_running(game)]
+
+        for game in games:
+            try:
+                for _ in range(ticks_due):
+                    await game.step()
+                    # The game ended or went idle during this tick
+                    if not (self.has_game(game) and self.is_running(game)):
+                        break
+            except Exception as e:
+                logger.error(f"✕ Error while stepping game, removing it: {e}")
+                self.remove_game(game)
+
+        step_end = time.perf_counter()
+
+        results = await asyncio.gather(
+            *(game.flush() for game in games if self.has_game(game)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"✕ Error while flushing game frame: {result}")
+
+        tick_end = time.perf_counter()
+
+        self.ticks += ticks_due
+        self.last_step_duration = step_end - tick_start
+        self.last_flush_duration = tick_end - step_end
+        self.last_tick_duration = tick_end - tick_start
+        self.max_tick_duration = max(self.max_tick_duration, self.last_tick_duration)
+        TICK_DURATION.observe(self.last_tick_duration)
+        self.average_tick_duration += TICK_STATS_SMOOTHING * (
+            self.last_tick_duration - self.average_tick_duration
+        )
+
+    def get_stats(self):
+        clock_stats = self.clock.get_stats() if self.clock else {}
+        return {
+            "active_games": len(self.games),
+            "ticks": self.ticks,
+            "last_tick_duration": self.last_tick_duration,
+            "last_step_duration": self.last_step_duration,
+            "last_flush_duration": self.last_flush_duration,
+            "average_tick_duration": self.average_tick_duration,
+            "max_tick_duration": self.max_tick_duration,
+            "overruns": clock_stats.get("overruns", 0),
+            "dropped_ticks": clock_stats.get("dropped_ticks", 0),
+        }
+
+
+game_scheduler = GameScheduler()
+
+Gauge(
+    "pong_active_games",
+    "Games in the scheduler of this process, by state.",
+    lambda: sum(map(game_scheduler.is_running, game_scheduler.games)),
+    {"state": "running"},
+)
+Gauge(
+    "pong_active_games",
+    "Games in the scheduler of this process, by state.",
+    lambda: sum(not game_scheduler.is_running(game) for game in game_scheduler.games),
+    {"state": "resting"},
+)
@@ -8,6 +8,18 @@ logger = logging.getLogger("game_logs")
 
 
 class Score:
+    __slots__ = (
+        "end_score",
+        "deuce_score",
+        "is_deuce_on",
+        "left",
+        "is_left_advantage",
+        "right",
+        "is_right_advantage",
+        "is_deuce",
+        "winner",
+    )
+
     def __init__(self, end_score=11, is_deuce_on=True):
         logger.debug(f"end_score: { end_score }")
         self.end_score = end_score
@@ -72,7 +84,7 @@ class Score:
             elif self.right == self.end_score:
                 self.winner = 2
 
-        logger.debug(f"ⓘ Score updated: left: {self.left}, right {self.right}")
+        logger.debug("ⓘ Score updated: left: %s, right %s", self.left, self.right)
 
     def get_score(self):
         return {
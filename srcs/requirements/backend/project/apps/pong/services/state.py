@@ -7,6 +7,8 @@ logger = logging.getLogger("game_logs")
 
 
 class GameState:
+    __slots__ = ("_status", "_countdown_value")
+
     def __init__(self):
         self._status = GAME_STATUS_IDLE
         self._countdown_value = 0
@@ -18,7 +20,7 @@ class GameState:
 
     @status.setter
     def status(self, value):
-        logger.info(f"✓ Game status successfully changed. New status: {value}")
+        logger.debug("✓ Game status successfully changed. New status: %s", value)
         self._status = value
 
     # Countdown value getters and setters
@@ -1,3 +1,1285 @@
-from django.test import TestCase
+import asyncio
+import copy
+import json
+import logging
+import random
+from unittest import skipUnless
 
-# Create your tests here.
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .consumers import PongConsumer
+from .services.metrics import MetricsRegistry, Counter, Histogram
+from .urls import websocket_urlpatterns
+from .services import (
+    GameState,
+    GameScheduler,
+    FixedTimestepClock,
+    Ball,
+    Paddle,
+    Score,
+    FrameEncoder,
+    FrameDecoder,
+    encode_error,
+    encode_ping,
+    encode_input,
+    with_frame_interval,
+    OutboundQueue,
+    OutboundQueueFullError,
+    SendRateController,
+    GameRoom,
+    GameReplay,
+    AiController,
+    predict_intercept,
+    replay_game,
+    replay_frames,
+    find_room,
+    join_room,
+    leave_room,
+    ROOM_FRAME,
+    ROOM_STATE,
+    ROOM_CLOSED,
+    ROOM_PING_TIMEOUT,
+    ROOM_NOT_FOUND_CLOSE_CODE,
+    decode_input,
+    InvalidInputError,
+    INPUT_UPDATE_PADDLE_OPCODE,
+    DEMO_GAME_MODE,
+    NEW_GAME_GAME_MODE,
+    GAME_STATE_MESSAGE_TYPE,
+    GAME_UPDATE_MESSAGE_TYPE,
+    GAME_ERROR_MESSAGE_TYPE,
+    GAME_PING_MESSAGE_TYPE,
+    GAME_PROTOCOL_VERSION,
+    BALL_HIT_STOP_TICKS,
+    GAME_TICK_RATE,
+    GAME_IDLE_TIMEOUT,
+    GAME_STATUS_ENDED,
+    game_scheduler,
+    game_log,
+    ResultQueue,
+)
+
+User = get_user_model()
+
+try:
+    import numpy as np
+
+    from .services.engine import BatchEngine
+except ImportError:
+    np = None
+
+
+@skipUnless(np, "NumPy is required for the batch engine")
+class BatchEngineDifferentialTest(SimpleTestCase):
+    SEED = 42
+    TICKS = 1800
+    GAMES = [
+        # (game_mode, ball_speed, max_ball_curve, end_score, is_deuce_on)
+        (NEW_GAME_GAME_MODE, 1, 1, 3, True),
+        (NEW_GAME_GAME_MODE, 2, 2, 2, False),
+        (NEW_GAME_GAME_MODE, 3, 3, 2, True),
+        (DEMO_GAME_MODE, 3, 2, None, False),
+    ]
+
+    def create_scalar_games(self):
+        # The engine draws from one RNG for all games, in game order
+        ball_rng = random.Random(self.SEED)
+        games = []
+        for game_mode, ball_speed, max_ball_curve, end_score, is_deuce_on in self.GAMES:
+            ball = Ball(rng=ball_rng)
+            ball.set_ball_speed(ball_speed)
+            ball.set_ball_max_curve_angle(max_ball_curve)
+            paddles = [Paddle("left", "left"), Paddle("right", "right")]
+            if len(games) % 2:
+                # Paddle order, so the side of each column, varies per game
+                paddles.reverse()
+            score = (
+                Score(end_score=end_score, is_deuce_on=is_deuce_on)
+                if end_score
+                else None
+            )
+            games.append((game_mode, ball, paddles, score))
+        return games
+
+    @staticmethod
+    def choose_directions(inputs_rng, ball, paddles):
+        directions = []
+        for paddle in paddles:
+            if inputs_rng.random() < 0.6:
+                directions.append(inputs_rng.choice([-1, 0, 1]))
+            else:
+                gap = ball.position_y - paddle.position
+                directions.append(0 if abs(gap) < 2 else (1 if gap > 0 else -1))
+        return directions
+
+    def run_scalar(self, games):
+        inputs_rng = random.Random(self.SEED)
+        history = []
+
+        for _ in range(self.TICKS):
+            tick_inputs = []
+            tick_states = []
+            for game_mode, ball, paddles, score in games:
+                directions = self.choose_directions(inputs_rng, ball, paddles)
+                tick_inputs.append(directions)
+                for paddle, direction in zip(paddles, directions):
+                    paddle.set_direction(direction)
+                    paddle.update_position()
+                ball.update_ball(game_mode, paddles, score)
+                tick_states.append(
+                    (
+                        copy.deepcopy(ball.get_current_ball_state()),
+                        ball.pause_timer,
+                        [(p.position, p.speed, p.height) for p in paddles],
+                        score.get_score() if score else None,
+                    )
+                )
+            history.append((tick_inputs, tick_states))
+        return history
+
+    def test_engine_matches_ball_paddle_and_score(self):
+        games = self.create_scalar_games()
+        engine = BatchEngine.from_games(
+            [ball for _, ball, _, _ in games],
+            [paddles for _, _, paddles, _ in games],
+            [score for _, _, _, score in games],
+            [game_mode for game_mode, _, _, _ in games],
+            rng=random.Random(self.SEED),
+        )
+
+        history = self.run_scalar(games)
+
+        hits = 0
+        for tick, (tick_inputs, tick_states) in enumerate(history):
+            engine.set_directions(tick_inputs)
+            engine.step()
+
+            for i, (ball_state, pause_timer, paddles, score) in enumerate(tick_states):
+                context = f"tick {tick}, game {i}"
+                self.assertEqual(engine.get_ball_state(i), ball_state, context)
+                self.assertEqual(engine.pause_timer[i], pause_timer, context)
+                self.assertEqual(
+                    list(
+                        zip(
+                            engine.paddle_position[i].tolist(),
+                            engine.paddle_speed[i].tolist(),
+                            engine.paddle_height[i].tolist(),
+                        )
+                    ),
+                    paddles,
+                    context,
+                )
+                if score is not None:
+                    self.assertEqual(engine.get_score(i), score, context)
+                hits += ball_state["bounced_off_surface"] in (2, 4)
+
+        self.assertGreater(hits, 0)
+        self.assertTrue(engine.winner.any())
+
+    def test_engine_keeps_the_movement_left_after_the_last_collision_check(self):
+        ball = Ball(rng=random.Random(self.SEED))
+        ball.velocity_x, ball.velocity_y = 0.5, 1000
+        engine = BatchEngine(1, [0, 1])
+        engine.ball_vx[0], engine.ball_vy[0] = ball.velocity_x, ball.velocity_y
+
+        ball.move([Paddle("left", "left"), Paddle("right", "right")])
+        engine.move_balls(np.ones(1, dtype=bool))
+
+        self.assertEqual(engine.ball_x[0], ball.position_x)
+        self.assertEqual(engine.ball_y[0], ball.position_y)
+        self.assertEqual(engine.ball_vy[0], ball.velocity_y)
+
+    def test_fast_mode_stays_close_to_exact_mode(self):
+        engines = [
+            BatchEngine(64, [0, 1], exact=exact, rng=random.Random(self.SEED))
+            for exact in (True, False)
+        ]
+        inputs_rng = np.random.default_rng(self.SEED)
+        for _ in range(120):
+            directions = inputs_rng.integers(-1, 2, size=(64, 2))
+            for engine in engines:
+                engine.set_directions(directions)
+                engine.step()
+
+        exact, fast = engines
+        np.testing.assert_allclose(fast.ball_x, exact.ball_x, atol=1e-9)
+        np.testing.assert_allclose(fast.ball_y, exact.ball_y, atol=1e-9)
+
+    def test_score_updates_match_score_class(self):
+        rng = random.Random(self.SEED)
+        settings = [(rng.randint(2, 6), rng.random() < 0.5) for _ in range(200)]
+        scores = [Score(end_score, is_deuce_on) for end_score, is_deuce_on in settings]
+        engine = BatchEngine(
+            len(settings),
+            [0, 1],
+            end_score=[end_score for end_score, _ in settings],
+            is_deuce_on=[is_deuce_on for _, is_deuce_on in settings],
+        )
+
+        for _ in range(60):
+            left = np.array([rng.randint(0, 1) for _ in scores])
+            playing = engine.winner == 0
+            engine.update_scores(playing, left, 1 - left)
+            for i, score in enumerate(scores):
+                if score.winner == 0:
+                    score.update_score(int(left[i]), int(1 - left[i]))
+                self.assertEqual(engine.get_score(i), score.get_score())
+
+        self.assertTrue(engine.is_deuce.any())
+        self.assertTrue(engine.winner.all())
+
+
+class FakeTime:
+    """Time source of a clock, moved by hand."""
+
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FixedTimestepClockTest(SimpleTestCase):
+    def setUp(self):
+        self.time = FakeTime()
+        # Binary fractions: the accumulator stays exact
+        self.clock = FixedTimestepClock(
+            tick_interval=0.25, max_catch_up_ticks=4, time_source=self.time
+        )
+
+    def test_ticks_follow_elapsed_time(self):
+        self.assertEqual(self.clock.advance(), 0)
+
+        self.time.now += 0.125
+        self.assertEqual(self.clock.advance(), 0)
+        self.assertEqual(self.clock.time_until_next_tick(), 0.125)
+
+        # The leftover time is kept for the next tick
+        self.time.now += 0.25
+        self.assertEqual(self.clock.advance(), 1)
+        self.assertEqual(self.clock.accumulator, 0.125)
+
+        self.time.now += 0.125
+        self.assertEqual(self.clock.advance(), 1)
+        self.assertEqual(self.clock.get_stats()["overruns"], 0)
+
+    def test_late_wakeup_catches_up_and_counts_an_overrun(self):
+        self.time.now += 0.75
+
+        self.assertEqual(self.clock.advance(), 3)
+        self.assertEqual(self.clock.get_stats()["overruns"], 1)
+        self.assertEqual(self.clock.get_stats()["dropped_ticks"], 0)
+
+    def test_lag_spike_is_capped_and_dropped(self):
+        self.time.now += 10.125
+
+        self.assertEqual(self.clock.advance(), 4)
+        # The rest of the spike is forgotten, not simulated later
+        self.assertEqual(self.clock.accumulator, 0.0)
+        self.time.now += 0.25
+        self.assertEqual(self.clock.advance(), 1)
+
+        self.assertEqual(
+            self.clock.get_stats(),
+            {"tick": 5, "overruns": 1, "dropped_ticks": 36},
+        )
+
+    def test_reset_forgets_elapsed_time(self):
+        self.time.now += 5
+        self.clock.reset()
+
+        self.assertEqual(self.clock.advance(), 0)
+        self.assertEqual(self.clock.time_until_next_tick(), 0.25)
+
+
+class GameSchedulerTest(SimpleTestCase):
+    class StubGame:
+        def __init__(self, name, events, fail=False):
+            self.name = name
+            self.events = events
+            self.fail = fail
+            self.is_paused = False
+            self.is_idle = False
+
+        async def step(self):
+            if self.fail:
+                raise RuntimeError("broken game")
+            self.events.append(("step", self.name))
+
+        async def flush(self):
+            self.events.append(("flush", self.name))
+
+        async def heartbeat(self):
+            self.events.append(("heartbeat", self.name))
+
+    def setUp(self):
+        self.events = []
+        self.time = FakeTime()
+        self.scheduler = GameScheduler(
+            clock_factory=lambda: FixedTimestepClock(
+                tick_interval=0.25, max_catch_up_ticks=4, time_source=self.time
+            ),
+            time_source=self.time,
+        )
+        self.scheduler.clock = self.scheduler.clock_factory()
+
+    def register(self, *games):
+        # Registered directly: the tick loop is driven by hand
+        self.scheduler.games.extend(games)
+
+    async def test_games_are_stepped_then_flushed_once_per_tick(self):
+        first = self.StubGame("first", self.events)
+        second = self.StubGame("second", self.events)
+        self.register(first, second)
+
+        await self.scheduler.tick(1)
+
+        self.assertEqual(
+            self.events,
+            [
+                ("step", "first"),
+                ("step", "second"),
+                ("flush", "first"),
+                ("flush", "second"),
+            ],
+        )
+
+    async def test_catch_up_steps_every_tick_due_and_flushes_once(self):
+        game = self.StubGame("game", self.events)
+        self.register(game)
+
+        await self.scheduler.tick(3)
+
+        self.assertEqual(self.events, [("step", "game")] * 3 + [("flush", "game")])
+
+    async def test_removed_and_resting_games_are_left_alone(self):
+        removed = self.StubGame("removed", self.events)
+        paused = self.StubGame("paused", self.events)
+        paused.is_paused = True
+        running = self.StubGame("running", self.events)
+        self.register(removed, paused, running)
+        self.scheduler.remove_game(removed)
+
+        await self.scheduler.tick(1)
+
+        self.assertEqual(self.events, [("step", "running"), ("flush", "running")])
+        self.assertFalse(self.scheduler.has_game(removed))
+
+        await self.scheduler.heartbeat()
+        self.assertEqual(self.events[-1], ("heartbeat", "paused"))
+
+    async def test_failing_game_is_removed_without_stopping_the_others(self):
+        broken = self.StubGame("broken", self.events, fail=True)
+        game = self.StubGame("game", self.events)
+        self.register(broken, game)
+
+        await self.scheduler.tick(1)
+
+        self.assertFalse(self.scheduler.has_game(broken))
+        self.assertEqual(self.events, [("step", "game"), ("flush", "game")])
+
+    async def test_stats_report_ticks_durations_and_clock_counters(self):
+        self.register(self.StubGame("game", self.events))
+        self.time.now += 10.125
+
+        await self.scheduler.tick(self.scheduler.clock.advance())
+        await self.scheduler.tick(1)
+
+        stats = self.scheduler.get_stats()
+        self.assertEqual(stats["active_games"], 1)
+        self.assertEqual(stats["ticks"], 5)
+        self.assertEqual(stats["overruns"], 1)
+        self.assertEqual(stats["dropped_ticks"], 36)
+        self.assertGreater(stats["last_tick_duration"], 0)
+        self.assertGreaterEqual(stats["max_tick_duration"], stats["last_tick_duration"])
+        self.assertAlmostEqual(
+            stats["last_tick_duration"],
+            stats["last_step_duration"] + stats["last_flush_duration"],
+        )
+
+
+class FrameProtocolTest(SimpleTestCase):
+    def play(self, ticks, paddle_count):
+        rng = random.Random(0)
+        ball = Ball()
+        paddles = [
+            Paddle(name=f"p{i}", side="left" if i % 2 == 0 else "right")
+            for i in range(paddle_count)
+        ]
+        sequence = 0
+        for tick in range(ticks):
+            if tick % 15 == 0:
+                for paddle in paddles:
+                    sequence += 1
+                    paddle.apply_input(rng.choice([-1, 0, 1]), sequence)
+            for paddle in paddles:
+                paddle.update_position()
+            ball.update_ball(DEMO_GAME_MODE, paddles, None)
+            yield tick, ball, paddles
+
+    def test_decoded_frames_match_state_within_quantization(self):
+        encoder = FrameEncoder(3, keyframe_interval=10)
+        decoder = FrameDecoder()
+        types = set()
+
+        for tick, ball, paddles in self.play(300, 3):
+            frame = decoder.decode(encoder.encode(tick, ball, paddles))
+            types.add(frame["type"])
+            self.assertEqual(frame["tick"], tick)
+            self.assertEqual(
+                frame["input_acks"], [paddle.input_sequence for paddle in paddles]
+            )
+
+            decoded_ball = frame["ball"]
+            self.assertAlmostEqual(
+                decoded_ball["position"]["x"], ball.position_x, delta=0.002
+            )
+            self.assertAlmostEqual(
+                decoded_ball["velocity"]["y"], ball.velocity_y, delta=0.0002
+            )
+            self.assertEqual(
+                decoded_ball["bounced_off_surface"], ball.bouncedOffSurface
+            )
+            self.assertEqual(decoded_ball["hit_stop"], ball.hit_stop_timer)
+            for decoded, paddle in zip(frame["paddles"], paddles):
+                self.assertAlmostEqual(
+                    decoded["position"], paddle.position, delta=0.002
+                )
+                self.assertAlmostEqual(decoded["height"], paddle.height, delta=0.002)
+                self.assertAlmostEqual(decoded["speed"], paddle.speed, delta=0.0002)
+
+        self.assertEqual(types, {GAME_STATE_MESSAGE_TYPE, GAME_UPDATE_MESSAGE_TYPE})
+
+    def test_four_paddle_frames_are_less_than_half_the_float32_layout(self):
+        paddle_count = 4
+        float32_frame_size = 4 * 4 + 1 + 4 + 1 + 1 + paddle_count * 4 * 4
+        encoder = FrameEncoder(paddle_count)
+
+        sizes = [
+            len(encoder.encode(tick, ball, paddles))
+            for tick, ball, paddles in self.play(600, paddle_count)
+        ]
+
+        self.assertLess(sum(sizes) / len(sizes), float32_frame_size / 2)
+
+    def test_error_message_round_trip(self):
+        frame = FrameDecoder().decode(encode_error("Paddle not found"))
+
+        self.assertEqual(
+            frame, {"type": GAME_ERROR_MESSAGE_TYPE, "error": "Paddle not found"}
+        )
+
+    def test_ping_and_frame_interval_round_trip(self):
+        decoder = FrameDecoder()
+        self.assertEqual(
+            decoder.decode(encode_ping(0x10002, 42)),
+            {"type": GAME_PING_MESSAGE_TYPE, "tick": 42, "ping_id": 2},
+        )
+
+        encoder = FrameEncoder(2)
+        for tick, ball, paddles in self.play(3, 2):
+            frame = encoder.encode(tick, ball, paddles, frame_interval=2)
+            self.assertEqual(decoder.decode(frame)["frame_interval"], 2)
+            frame = with_frame_interval(frame, 3)
+            self.assertEqual(decoder.decode(frame)["frame_interval"], 3)
+            self.assertEqual(decoder.decode(frame)["tick"], tick)
+
+    def test_stale_inputs_are_not_applied(self):
+        paddle = Paddle("left", "left")
+
+        self.assertTrue(paddle.apply_input(1, 1))
+        self.assertFalse(paddle.apply_input(-1, 1))
+        self.assertTrue(paddle.apply_input(-1, 3))
+        self.assertFalse(paddle.apply_input(0, 2))
+        self.assertEqual((paddle.direction, paddle.input_sequence), (-1, 3))
+
+        paddle.input_sequence = 0xFFFF
+        self.assertTrue(paddle.apply_input(1, 0))
+        self.assertEqual((paddle.direction, paddle.input_sequence), (1, 0))
+
+    def test_input_message_round_trip(self):
+        payload = encode_input(3, -1, 0x10001)
+
+        self.assertEqual(len(payload), 5)
+        self.assertEqual(decode_input(payload), (INPUT_UPDATE_PADDLE_OPCODE, 3, -1, 1))
+        with self.assertRaises(InvalidInputError):
+            decode_input(payload[:4])
+
+
+class OutboundQueueTest(SimpleTestCase):
+    KEYFRAME = bytes([GAME_STATE_MESSAGE_TYPE, 0])
+    DELTA = bytes([GAME_UPDATE_MESSAGE_TYPE, 0])
+
+    def setUp(self):
+        self.sent = []
+
+    async def send(self, text_data=None, bytes_data=None):
+        self.sent.append(text_data or bytes_data)
+
+    async def test_slow_client_keeps_messages_and_latest_frames_only(self):
+        outbound = OutboundQueue(self.send)
+        messages = [
+            self.KEYFRAME + b"1",
+            self.DELTA + b"1",
+            '{"type": "game_state"}',
+            self.DELTA + b"2",
+            encode_error("error"),
+            self.KEYFRAME + b"2",
+            self.DELTA + b"3",
+            self.DELTA + b"4",
+        ]
+        for message in messages:
+            if isinstance(message, str):
+                outbound.put(text_data=message)
+            else:
+                outbound.put(bytes_data=message)
+
+        outbound.start()
+        await asyncio.sleep(0)
+        await outbound.stop()
+
+        self.assertEqual(
+            self.sent,
+            [
+                '{"type": "game_state"}',
+                encode_error("error"),
+                self.KEYFRAME + b"2",
+                self.DELTA + b"4",
+            ],
+        )
+        self.assertEqual(outbound.get_stats()["dropped"], 4)
+
+    async def test_stalled_client_is_held_although_send_returns_at_once(self):
+        # Like a server buffering every write: only acknowledgements tell
+        outbound = OutboundQueue(self.send, max_unacked_bytes=100)
+        outbound.start()
+        deltas = [self.DELTA + bytes([i]) * 18 for i in range(20)]
+
+        outbound.put_ping(1, encode_ping(1))
+        for delta in deltas:
+            outbound.put(bytes_data=delta)
+            await self.settle()
+
+        self.assertTrue(outbound.is_held)
+        self.assertLessEqual(outbound.bytes_sent, 100 + len(deltas[0]))
+        self.assertEqual(outbound.get_stats()["depth"], 1)
+        self.assertGreater(outbound.dropped, 0)
+
+        # Messages are not held, the answer to a new ping lets frames go
+        outbound.put(text_data="state")
+        outbound.put_ping(2, encode_ping(2))
+        await self.settle()
+        self.assertEqual(self.sent[-2:], [encode_ping(2), "state"])
+        self.assertFalse(outbound.acknowledge(3))
+        self.assertTrue(outbound.acknowledge(2))
+        await self.settle()
+
+        self.assertEqual(self.sent[-1], deltas[-1])
+        self.assertFalse(outbound.is_held)
+        # Written after the ping: not acknowledged yet
+        self.assertEqual(outbound.get_unacked_bytes(), len("state") + len(deltas[-1]))
+        await outbound.stop()
+
+    async def test_bandwidth_is_measured_from_acknowledgements_while_held(self):
+        time = FakeTime()
+        outbound = OutboundQueue(self.send, max_unacked_bytes=100, time_source=time)
+        outbound.start()
+
+        outbound.put_ping(1, encode_ping(1))
+        await self.settle()
+        outbound.acknowledge(1)
+        self.assertIsNone(outbound.bandwidth)
+
+        for i in range(20):
+            outbound.put(bytes_data=self.DELTA + bytes([i]) * 18)
+            await self.settle()
+        outbound.put_ping(2, encode_ping(2))
+        await self.settle()
+        self.assertTrue(outbound.is_held)
+
+        # The client took half a second to read what was held up to ping 2
+        time.now += 0.5
+        acked_bytes = outbound.pings[-1][1] - outbound.bytes_acked
+        outbound.acknowledge(2)
+        self.assertEqual(outbound.bandwidth, acked_bytes / 0.5)
+
+        # It then keeps up: the limit of its link is unknown again
+        await self.settle()
+        outbound.put_ping(3, encode_ping(3))
+        await self.settle()
+        time.now += 2
+        outbound.acknowledge(3)
+        self.assertIsNone(outbound.bandwidth)
+        await outbound.stop()
+
+    @staticmethod
+    async def settle():
+        # Lets the writer task run until it waits again
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+    def test_queue_is_bounded(self):
+        outbound = OutboundQueue(self.send, max_size=4)
+        for _ in range(100):
+            outbound.put(bytes_data=self.DELTA)
+        for _ in range(3):
+            outbound.put(text_data="state")
+
+        with self.assertRaises(OutboundQueueFullError):
+            outbound.put(text_data="state")
+        self.assertEqual(outbound.get_stats()["depth"], 4)
+
+
+class SendRateControllerTest(SimpleTestCase):
+    KEYFRAME = bytes([GAME_STATE_MESSAGE_TYPE])
+    DELTA = bytes([GAME_UPDATE_MESSAGE_TYPE])
+
+    def measure_rtt(self, controller, rtt, count=1):
+        for _ in range(count):
+            ping_id = controller.start_ping(0.0)
+            controller.receive_pong(ping_id, rtt)
+
+    def test_frames_are_thinned_but_keyframes_are_always_sent(self):
+        controller = SendRateController()
+        controller.level = 2
+
+        sent = [
+            tick
+            for tick in range(12)
+            if controller.should_send(tick, self.KEYFRAME if tick == 4 else self.DELTA)
+        ]
+
+        self.assertEqual(controller.frame_interval, 3)
+        self.assertEqual(sent, [0, 3, 4, 7, 10])
+
+    def test_rate_steps_down_on_high_rtt_and_back_up_slowly(self):
+        controller = SendRateController()
+        self.measure_rtt(controller, 0.2)
+        self.assertTrue(controller.check(0, None))
+        self.assertEqual(controller.rate, 30)
+
+        # An unknown or stale pong does not count
+        controller.receive_pong(controller.ping_id + 1, 10.0)
+        self.assertAlmostEqual(controller.rtt, 0.2)
+
+        self.measure_rtt(controller, 0.02, count=20)
+        self.assertFalse(controller.check(0, None))
+        self.assertFalse(controller.check(0, None))
+        self.assertTrue(controller.check(0, None))
+        self.assertEqual(controller.rate, 60)
+
+    def test_dropped_frames_and_low_bandwidth_lower_the_rate(self):
+        controller = SendRateController()
+        self.assertTrue(controller.check(1, None))
+        self.assertEqual(controller.rate, 30)
+
+        controller.frame_size = 100
+        self.assertFalse(controller.check(1, 5000))
+        self.assertTrue(controller.check(1, 4000))
+        self.assertEqual(controller.rate, 20)
+        self.assertFalse(controller.check(2, 10))
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+)
+class GameRoomTest(SimpleTestCase):
+    # Header of a frame at the full rate: type, version, tick, frame interval
+    KEYFRAME = bytes([GAME_STATE_MESSAGE_TYPE, GAME_PROTOCOL_VERSION, 0, 0, 0, 0, 1])
+    DELTA = bytes([GAME_UPDATE_MESSAGE_TYPE, GAME_PROTOCOL_VERSION, 0, 0, 0, 0, 1])
+
+    async def receive_all(self, channel_layer, channel):
+        messages = []
+        while channel_layer.channels.get(channel):
+            messages.append(await channel_layer.receive(channel))
+        return messages
+
+    async def test_room_fans_out_to_subscribers_at_their_rate(self):
+        channel_layer = InMemoryChannelLayer()
+        room = GameRoom(channel_layer)
+        owner = await channel_layer.new_channel()
+        full_rate = await channel_layer.new_channel()
+        low_rate = await channel_layer.new_channel()
+        await room.open(owner)
+
+        await room.publish_frame(self.DELTA, 0)
+        await join_room(channel_layer, room.game_id, full_rate)
+        await join_room(channel_layer, room.game_id, low_rate, rate=20)
+        for message in await self.receive_all(channel_layer, owner):
+            self.assertEqual(message["type"], "room.subscribe")
+            await room.subscribe(message["rate"])
+
+        await room.publish_state("state")
+        await room.publish_frame(self.KEYFRAME + b"0", 0)
+        for tick in range(1, 7):
+            await room.publish_frame(self.DELTA + bytes([tick]), tick)
+
+        full_rate_messages = await self.receive_all(channel_layer, full_rate)
+        low_rate_messages = await self.receive_all(channel_layer, low_rate)
+        self.assertEqual(full_rate_messages[0], {"type": ROOM_STATE, "text": "state"})
+        self.assertEqual(len(full_rate_messages), 8)
+        self.assertEqual(
+            full_rate_messages[1:3],
+            [
+                {"type": ROOM_FRAME, "bytes": self.KEYFRAME + b"0"},
+                {"type": ROOM_FRAME, "bytes": self.DELTA + b"\x01"},
+            ],
+        )
+        self.assertEqual(
+            [message.get("bytes") for message in low_rate_messages],
+            [
+                None,
+                with_frame_interval(self.KEYFRAME + b"0", 3),
+                with_frame_interval(self.DELTA + b"\x03", 3),
+                with_frame_interval(self.DELTA + b"\x06", 3),
+            ],
+        )
+
+        await room.close()
+        self.assertEqual(await channel_layer.receive(low_rate), {"type": ROOM_CLOSED})
+
+    async def start_game(self):
+        communicator = WebsocketCommunicator(PongConsumer.as_asgi(), "/ws/pong/")
+        await communicator.connect()
+        await communicator.send_json_to(
+            {
+                "action": "start",
+                "data": {
+                    "mode": DEMO_GAME_MODE,
+                    "controllers": [
+                        {"name": "left", "side": "left"},
+                        {"name": "right", "side": "right"},
+                    ],
+                },
+            }
+        )
+
+        game_id = None
+        while game_id is None:
+            message = await communicator.receive_output(timeout=1)
+            if "text" in message:
+                game_id = json.loads(message["text"]).get("gameId")
+        return communicator, game_id
+
+    async def test_consumer_owns_room_of_started_game(self):
+        communicator, game_id = await self.start_game()
+
+        channel_layer = get_channel_layer()
+        subscriber = await channel_layer.new_channel()
+        await join_room(channel_layer, game_id, subscriber)
+
+        state = await channel_layer.receive(subscriber)
+        self.assertEqual(state["type"], ROOM_STATE)
+        self.assertEqual(json.loads(state["text"])["gameId"], game_id)
+        frame = await channel_layer.receive(subscriber)
+        self.assertEqual(frame["type"], ROOM_FRAME)
+        self.assertEqual(frame["bytes"][0], GAME_STATE_MESSAGE_TYPE)
+
+        await leave_room(channel_layer, game_id, subscriber)
+        self.assertTrue(await find_room(channel_layer, game_id))
+        await communicator.disconnect()
+        self.assertFalse(await find_room(channel_layer, game_id, timeout=0.1))
+
+    async def test_spectator_receives_frames_at_lower_rate(self):
+        player, game_id = await self.start_game()
+        spectator = WebsocketCommunicator(
+            URLRouter(websocket_urlpatterns), f"/ws/pong/spectate/{game_id}/?rate=30"
+        )
+        connected, _ = await spectator.connect()
+        self.assertTrue(connected)
+
+        decoder = FrameDecoder()
+        ticks = []
+        while len(ticks) < 10:
+            message = await spectator.receive_output(timeout=1)
+            if message.get("bytes"):
+                ticks.append(decoder.decode(message["bytes"])["tick"])
+
+        gaps = [later - earlier for earlier, later in zip(ticks, ticks[1:])]
+        self.assertTrue(all(gap >= 2 for gap in gaps), ticks)
+
+        await spectator.disconnect()
+        await player.disconnect()
+
+    async def test_spectator_of_unknown_game_is_closed(self):
+        spectator = WebsocketCommunicator(
+            URLRouter(websocket_urlpatterns), "/ws/pong/spectate/unknown/"
+        )
+        connected, _ = await spectator.connect()
+        self.assertTrue(connected)
+
+        message = await spectator.receive_output(timeout=ROOM_PING_TIMEOUT + 1)
+        self.assertEqual(
+            message, {"type": "websocket.close", "code": ROOM_NOT_FOUND_CLOSE_CODE}
+        )
+        await spectator.wait()
+
+
+class GameReplayTest(SimpleTestCase):
+    SEED = 7
+    TICKS = 3600
+
+    def record_game(self):
+        ball = Ball(rng=random.Random(self.SEED))
+        ball.set_ball_speed(2)
+        paddles = [Paddle("left", "left"), Paddle("right", "right")]
+        score = Score(end_score=11, is_deuce_on=True)
+        replay = GameReplay(
+            self.SEED,
+            NEW_GAME_GAME_MODE,
+            [(paddle.name, paddle.side) for paddle in paddles],
+            (11, True),
+            ball.get_state(),
+        )
+        encoder = FrameEncoder(len(paddles))
+        inputs_rng = random.Random(self.SEED + 1)
+        sequences = [1, 1]
+        states = []
+        frames = []
+
+        for tick in range(self.TICKS):
+            if tick == 600:
+                ball.set_ball_dimensions(3, 3)
+                replay.record_dimensions(tick, 3, 3)
+            for i, paddle in enumerate(paddles):
+                if inputs_rng.random() < 0.05:
+                    direction = inputs_rng.choice([-1, 0, 1])
+                    if paddle.apply_input(direction, sequences[i]):
+                        replay.record_input(tick, i, direction, sequences[i])
+                    sequences[i] += 1
+            for paddle in paddles:
+                paddle.update_position()
+            ball.update_ball(NEW_GAME_GAME_MODE, paddles, score)
+            replay.ticks = tick + 1
+
+            states.append(self.get_state(ball, paddles, score))
+            frames.append(encoder.encode(tick + 1, ball, paddles))
+        return replay, states, frames
+
+    @staticmethod
+    def get_state(ball, paddles, score):
+        return (
+            ball.get_state(),
+            [(p.position, p.direction, p.input_sequence) for p in paddles],
+            score.get_score(),
+        )
+
+    def test_replay_reproduces_every_tick(self):
+        replay, states, frames = self.record_game()
+        replay = GameReplay.from_bytes(replay.to_bytes())
+
+        replayed = [
+            self.get_state(ball, paddles, score)
+            for _, ball, paddles, score in replay_game(replay)
+        ]
+        self.assertEqual(len(replayed), self.TICKS)
+        for tick, (state, replayed_state) in enumerate(zip(states, replayed)):
+            self.assertEqual(state, replayed_state, f"tick {tick}")
+        self.assertEqual(list(replay_frames(replay)), frames)
+
+    def test_replay_file_is_a_few_kilobytes(self):
+        replay, _, _ = self.record_game()
+        # One minute of play at 60 ticks per second
+        self.assertLess(len(replay.to_bytes()) / 1024, 4)
+
+
+class SimulatePongTest(SimpleTestCase):
+    def test_matches_are_reproducible_and_finish(self):
+        from project.core.management.commands.simulate_pong import simulate_match
+
+        options = (3, 2, 2, 5, True, (1, 3), 60 * 60 * 30)
+        result = simulate_match(options)
+        self.assertIn(result["winner"], (1, 2))
+        # Advantage points under deuce are not kept in the final score
+        self.assertGreaterEqual(
+            len(result["rallies"]), result["left"] + result["right"]
+        )
+        self.assertEqual(simulate_match(options), result)
+
+
+class AiControllerTest(SimpleTestCase):
+    def test_prediction_matches_ball_trajectory(self):
+        rng = random.Random(0)
+        for _ in range(300):
+            ball = Ball(rng=rng)
+            ball.set_ball_max_curve_angle(rng.choice([1, 2, 3]))
+            ball.position_x = rng.uniform(20, 80)
+            ball.position_y = rng.uniform(10, 90)
+            ball.velocity_x = rng.choice([-1, 1]) * rng.uniform(0.6, 3)
+            ball.velocity_y = rng.uniform(-3, 3)
+            ball.curve = rng.uniform(-0.5, 0.5)
+            ball.pause_timer = 0
+            # A paddle as tall as the court catches the ball wherever it crosses
+            side = "left" if ball.velocity_x < 0 else "right"
+            paddle = Paddle(side, side, height=200)
+            face_x = paddle.width + ball.radius_x
+            if side == "right":
+                face_x = 100 - face_x
+
+            ticks, y = predict_intercept(ball, face_x)
+            for _ in range(ticks):
+                self.assertEqual(ball.hit_stop_timer, 0)
+                ball.update_ball(NEW_GAME_GAME_MODE, [paddle], None)
+            self.assertEqual(ball.hit_stop_timer, BALL_HIT_STOP_TICKS)
+            self.assertAlmostEqual(ball.position_y, y, places=6)
+
+    def test_difficulty_sets_rally_length(self):
+        from project.core.management.commands.simulate_pong import simulate_match
+
+        def get_rally_length(difficulty):
+            options = (0, 2, 2, 3, False, (difficulty, difficulty), 60 * 60 * 30)
+            rallies = simulate_match(options)["rallies"]
+            return sum(rallies) / len(rallies)
+
+        self.assertLess(get_rally_length(1), get_rally_length(3))
+        self.assertGreater(get_rally_length(3), 10)
+
+    def test_ai_paddle_ignores_client_input(self):
+        consumer = PongConsumer()
+        paddle = Paddle("cpu", "right")
+        consumer.paddles = {"cpu": paddle}
+        consumer.paddle_list = [paddle]
+        consumer.ai_controllers = {0: AiController(paddle)}
+
+        consumer.handle_paddle_input(0, 1, 1)
+        self.assertEqual(paddle.direction, 0)
+        self.assertEqual(paddle.input_sequence, 0)
+
+
+class BallCollisionTest(SimpleTestCase):
+    def create_ball(self, position, velocity):
+        ball = Ball(rng=random.Random(0))
+        ball.position_x, ball.position_y = position
+        ball.velocity_x, ball.velocity_y = velocity
+        ball.pause_timer = 0
+        return ball
+
+    def test_fast_ball_hits_paddle_it_crosses_within_a_tick(self):
+        for side, x, velocity_x in (("left", 10, -10), ("right", 90, 10)):
+            # At the end of the tick the ball would be 80, out of the paddle's reach
+            ball = self.create_ball((x, 50), (velocity_x, 30))
+            paddles = [Paddle("left", "left"), Paddle("right", "right")]
+            for paddle in paddles:
+                paddle.position = 70
+            score = Score()
+
+            ball.update_ball(NEW_GAME_GAME_MODE, paddles, score)
+
+            self.assertEqual(ball.hit_stop_timer, BALL_HIT_STOP_TICKS, side)
+            self.assertAlmostEqual(ball.position_y, 71, msg=side)
+            self.assertEqual(ball.velocity_x > 0, side == "left")
+            self.assertEqual((score.left, score.right), (0, 0))
+
+    def test_several_wall_bounces_within_a_tick(self):
+        ball = self.create_ball((50, 50), (0.5, 250))
+        ball.update_ball(DEMO_GAME_MODE, [], None)
+
+        # 46 to the bottom wall, 92 up, 92 down, 20 more up
+        self.assertAlmostEqual(ball.position_y, 100 - ball.radius_y - 20)
+        self.assertEqual(ball.velocity_y, -250)
+        self.assertEqual(ball.bouncedOffSurface, 3)
+
+    def test_movement_left_after_the_last_collision_check_is_kept(self):
+        ball = self.create_ball((50, 50), (0.5, 1000))
+        ball.move([])
+
+        # 8 bounces use 690 of the 1000 units, the rest ends on the bottom wall
+        self.assertEqual(ball.position_x, 50.5)
+        self.assertEqual(ball.position_y, 100 - ball.radius_y)
+
+
+class GameLifecycleTest(SimpleTestCase):
+    class RestingGame:
+        def __init__(self):
+            self.is_paused = False
+            self.is_idle = True
+            self.steps = 0
+            self.heartbeats = 0
+
+        async def step(self):
+            self.steps += 1
+
+        async def flush(self):
+            pass
+
+        async def heartbeat(self):
+            self.heartbeats += 1
+
+    def create_consumer(self, score=None):
+        consumer = PongConsumer()
+        consumer.game_state = GameState()
+        consumer.ball = Ball(rng=random.Random(0))
+        consumer.paddles = {
+            "left": Paddle("left", "left"),
+            "right": Paddle("right", "right"),
+        }
+        consumer.paddle_list = list(consumer.paddles.values())
+        consumer.frame_encoder = FrameEncoder(2)
+        consumer.score = score
+        return consumer
+
+    def test_ball_stays_put_once_match_is_won(self):
+        ball = Ball(rng=random.Random(0))
+        ball.pause_timer = 0
+        score = Score(end_score=1)
+        score.update_score(1, 0)
+        rng_state = ball.rng.getstate()
+
+        ball.update_ball(NEW_GAME_GAME_MODE, [], score)
+
+        self.assertEqual(ball.get_state(), Ball(rng=random.Random(0)).get_state())
+        self.assertEqual(ball.rng.getstate(), rng_state)
+
+    async def test_scheduler_only_wakes_up_for_heartbeats_while_games_rest(self):
+        scheduler = GameScheduler(heartbeat_interval=0.05)
+        game = self.RestingGame()
+        scheduler.add_game(game)
+        await asyncio.sleep(0.2)
+
+        self.assertEqual(game.steps, 0)
+        self.assertGreaterEqual(game.heartbeats, 2)
+
+        game.is_idle = False
+        scheduler.wake()
+        await asyncio.sleep(0.05)
+        self.assertGreater(game.steps, 0)
+
+        scheduler.remove_game(game)
+        await asyncio.wait_for(scheduler.task, 1)
+
+    async def test_game_ends_after_frame_with_winner(self):
+        score = Score(end_score=1)
+        score.update_score(1, 0)
+        consumer = self.create_consumer(score)
+
+        await consumer.flush()
+
+        self.assertEqual(consumer.game_state.status, GAME_STATUS_ENDED)
+        self.assertIsNone(consumer.frame_encoder)
+        self.assertFalse(game_scheduler.has_game(consumer))
+
+    async def test_ball_and_paddles_are_back_on_court_after_game_ends(self):
+        score = Score(end_score=1)
+        score.update_score(1, 0)
+        consumer = self.create_consumer(score)
+        consumer.ball.position_x = 101
+        consumer.ball.is_out_of_bounds = True
+        consumer.paddles["left"].position = 10
+
+        await consumer.flush()
+
+        self.assertFalse(consumer.ball.is_out_of_bounds)
+        self.assertEqual(
+            (consumer.ball.position_x, consumer.ball.position_y),
+            (Ball().position_x, Ball().position_y),
+        )
+        self.assertEqual(consumer.paddles["left"].position, 50)
+
+    async def test_game_goes_idle_without_player_input(self):
+        consumer = self.create_consumer(Score())
+        consumer.tick = GAME_IDLE_TIMEOUT * GAME_TICK_RATE
+
+        await consumer.step()
+        self.assertTrue(consumer.is_idle)
+        self.assertIsNotNone(consumer.rest_started_at)
+
+        consumer.handle_paddle_input(0, 1, 1)
+        self.assertFalse(consumer.is_idle)
+        self.assertIsNone(consumer.rest_started_at)
+
+    async def test_ai_only_game_never_goes_idle(self):
+        consumer = self.create_consumer()
+        consumer.ai_controllers = {
+            index: AiController(paddle)
+            for index, paddle in enumerate(consumer.paddle_list)
+        }
+        consumer.tick = GAME_IDLE_TIMEOUT * GAME_TICK_RATE
+
+        await consumer.step()
+        self.assertFalse(consumer.is_idle)
+
+
+class MetricsTest(SimpleTestCase):
+    def test_registry_renders_prometheus_text_format(self):
+        registry = MetricsRegistry()
+        for kind in ("a", "b"):
+            counter = Counter("test_total", "Test counter.", {"kind": kind}, registry)
+            counter.inc(2)
+        histogram = Histogram(
+            "test_seconds", "Test histogram.", (0.1, 1), registry=registry
+        )
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value)
+
+        self.assertEqual(
+            registry.render().splitlines(),
+            [
+                "# HELP test_total Test counter.",
+                "# TYPE test_total counter",
+                'test_total{kind="a"} 2.0',
+                'test_total{kind="b"} 2.0',
+                "# HELP test_seconds Test histogram.",
+                "# TYPE test_seconds histogram",
+                'test_seconds_bucket{le="0.1"} 2.0',
+                'test_seconds_bucket{le="1.0"} 3.0',
+                'test_seconds_bucket{le="+Inf"} 4.0',
+                "test_seconds_sum 3.65",
+                "test_seconds_count 4.0",
+            ],
+        )
+
+    @override_settings(ALLOWED_HOSTS=["testserver"])
+    async def test_metrics_endpoint_exposes_game_loop_metrics(self):
+        response = await self.async_client.get("/metrics/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        for name in (
+            "pong_tick_duration_seconds_bucket",
+            "pong_active_games",
+            "pong_frames_sent_total",
+            "pong_bytes_sent_total",
+            "pong_outbound_queue_depth_max",
+            "pong_inputs_total",
+        ):
+            self.assertIn(f"\n{name}", body)
+
+
+class GameLogTest(SimpleTestCase):
+    def setUp(self):
+        self.logger = logging.getLogger("game_logs")
+        self.level = self.logger.level
+
+    def tearDown(self):
+        self.logger.setLevel(self.level)
+        game_log.refresh()
+        game_log.stop_trace()
+
+    def test_debug_check_is_cached_until_refreshed(self):
+        self.logger.setLevel(logging.INFO)
+        game_log.refresh()
+        ball = Ball()
+        paddle = Paddle(name="left", side="left")
+
+        # assertNoLogs lowers the logger to DEBUG, the cached check still says no
+        with self.assertNoLogs("game_logs", logging.DEBUG):
+            ball.hit_paddle(paddle)
+
+        self.logger.setLevel(logging.DEBUG)
+        game_log.refresh()
+        with self.assertLogs("game_logs", logging.DEBUG) as logs:
+            ball.hit_paddle(paddle)
+        self.assertIn("collided with LEFT paddle", logs.output[0])
+
+    def test_trace_samples_a_single_game(self):
+        game_log.start_trace("abc", 30)
+
+        self.assertTrue(game_log.is_traced("abc", 60))
+        self.assertFalse(game_log.is_traced("abc", 61))
+        self.assertFalse(game_log.is_traced("other", 60))
+
+        game_log.stop_trace()
+        self.assertFalse(game_log.is_traced("abc", 60))
+
+
+class GameLogsEndpointTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.level = logging.getLogger("game_logs").level
+
+    def tearDown(self):
+        logging.getLogger("game_logs").setLevel(self.level)
+        game_log.refresh()
+        game_log.stop_trace()
+
+    @override_settings(ALLOWED_HOSTS=["testserver"])
+    def test_endpoint_is_for_staff_only(self):
+        response = self.client.post("/api/pong/game_logs/", {"level": "debug"})
+        self.assertEqual(response.status_code, 403)
+
+        user = User.objects.create(email="player@example.com", username="player")
+        self.client.force_authenticate(user)
+        response = self.client.post("/api/pong/game_logs/", {"level": "debug"})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(logging.getLogger("game_logs").level, self.level)
+
+    @override_settings(ALLOWED_HOSTS=["testserver"])
+    def test_endpoint_switches_level_and_trace(self):
+        staff = User.objects.create(
+            email="staff@example.com", username="staff", is_staff=True
+        )
+        self.client.force_authenticate(staff)
+
+        response = self.client.post(
+            "/api/pong/game_logs/", {"level": "debug", "trace": "abc", "interval": "10"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {"level": "DEBUG", "trace_game_id": "abc", "trace_interval": 10},
+        )
+        self.assertTrue(game_log.debug)
+
+        response = self.client.post("/api/pong/game_logs/", {"level": "verbose"})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post("/api/pong/game_logs/", {"trace": ""})
+        self.assertIsNone(response.json()["trace_game_id"])
+
+
+class ResultQueueTest(SimpleTestCase):
+    async def test_results_are_retried_and_applied_once_per_key(self):
+        calls = []
+
+        async def handler(result):
+            calls.append(result)
+            if len(calls) == 1:
+                raise ConnectionError("database unavailable")
+
+        queue = ResultQueue(handler, workers=2, retry_delays=(0,))
+
+        self.assertTrue(queue.submit("match", "first"))
+        # Reported again while queued, then after it was applied
+        self.assertFalse(queue.submit("match", "again"))
+        await queue.join()
+        self.assertFalse(queue.submit("match", "late"))
+
+        self.assertEqual(calls, ["first", "first"])
+        self.assertEqual(queue.get_stats()["retries"], 1)
+
+    async def test_failing_result_is_given_up(self):
+        async def handler():
+            raise ConnectionError("database unavailable")
+
+        queue = ResultQueue(handler, retry_delays=(0, 0))
+
+        queue.submit("match")
+        await queue.join()
+
+        self.assertEqual(queue.get_stats()["failed"], 1)
+        # Not applied: it can be reported again
+        self.assertTrue(queue.submit("match"))
+        await queue.join()
+
+    async def test_submit_never_waits_on_a_full_queue(self):
+        release = asyncio.Event()
+
+        async def handler():
+            await release.wait()
+
+        queue = ResultQueue(handler, workers=1, maxsize=1)
+
+        self.assertTrue(queue.submit("a"))
+        await asyncio.sleep(0)  # the worker takes "a"
+        self.assertTrue(queue.submit("b"))
+        self.assertFalse(queue.submit("c"))
+
+        release.set()
+        await queue.join()
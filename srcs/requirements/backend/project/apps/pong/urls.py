@@ -3,4 +3,8 @@ from . import consumers
 
 websocket_urlpatterns = [
     path("ws/pong/", consumers.PongConsumer.as_asgi()),
+    path(
+        "ws/pong/spectate/<str:game_id>/",
+        consumers.SpectatorConsumer.as_asgi(),
+    ),
 ]
@@ -1,5 +1,64 @@
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
+from project.authentication import JWTOrIntraAuthentication
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .services import (
+    metrics_registry,
+    game_log,
+    METRICS_CONTENT_TYPE,
+    GAME_TRACE_INTERVAL,
+)
+
+GAME_LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
 
 
 def index(request):
     return JsonResponse({"message": "Welcome to Pong!"})
+
+
+async def metrics(request):
+    # Async, so the metrics are read on the event loop that runs the games
+    return HttpResponse(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+class GameLogs(APIView):
+    """
+    Game logs switches, for staff only: POST `level` to change the level of
+    the game logs, `trace` to trace one game (empty to stop) every
+    `interval` ticks. The tick loop picks the changes up on its next tick.
+    """
+
+    authentication_classes = [JWTOrIntraAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(game_log.get_state(), status=status.HTTP_200_OK)
+
+    def post(self, request):
+        data = request.data
+        level = str(data.get("level", "")).upper()
+        if level and level not in GAME_LOG_LEVELS:
+            return Response(
+                {"error": f"Unknown level: {level}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            interval = int(data.get("interval", GAME_TRACE_INTERVAL))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "interval must be an integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if level:
+            game_log.set_level(level)
+        if "trace" in data:
+            if data["trace"]:
+                game_log.start_trace(str(data["trace"]), interval)
+            else:
+                game_log.stop_trace()
+
+        return Response(game_log.get_state(), status=status.HTTP_200_OK)
@@ -1,5 +1,20 @@
 from django.contrib import admin
-from project.apps.tournaments.models import Tournament
+from project.apps.tournaments.models import Tournament, Match
+
+
+class MatchInline(admin.TabularInline):
+    model = Match
+    fields = (
+        "stage",
+        "slot",
+        "left_name",
+        "right_name",
+        "winner",
+        "left_score",
+        "right_score",
+    )
+    readonly_fields = ("stage", "slot", "left_name", "right_name")
+    extra = 0
 
 
 @admin.register(Tournament)
@@ -16,3 +31,4 @@ class TournamentAdmin(admin.ModelAdmin):
     search_fields = ("name", "host__email")
     list_filter = ("status",)
     ordering = ("-created_at",)
+    inlines = (MatchInline,)
@@ -0,0 +1,161 @@
+import logging
+import random
+
+from .models import Stage, Match
+
+logger = logging.getLogger("tournaments_logs")
+
+# Bracket engine
+#
+# The bracket is a binary tree built once, when the tournament is created:
+# every match but the final points to the match its winner plays next
+# (`next_match`) and to the side they take there (`next_side`). Advancing a
+# winner is a pointer update; nothing is searched or sorted afterwards.
+# Matches of the first stage are seeded in pairs, so the winners of slots
+# 2k and 2k + 1 meet in slot k of the next stage.
+
+SIDES = ("left", "right")
+
+
+def get_other_side(side):
+    return "right" if side == "left" else "left"
+
+
+def get_stage_names(num_players):
+    # 8 players: ["1/4", "1/2", "Final"]
+    stage_names = ["Final"]
+    i = 2
+    while i <= num_players // 2:
+        stage_names.insert(0, f"1/{i}")
+        i *= 2
+    return stage_names
+
+
+def build_bracket(tournament, players):
+    """
+    Unsaved stages and matches of a bracket for `players`, in order: the
+    first stage is filled pairwise from `players`, the next stages are empty
+    and linked to by `next_match`.
+    """
+    if len(players) < 2:
+        raise ValueError("At least two players are required to create a tournament.")
+
+    stages = [
+        Stage(tournament=tournament, name=name, order=order)
+        for order, name in enumerate(get_stage_names(len(players)))
+    ]
+
+    matches = []
+    previous_stage = []
+    num_matches = len(players) // 2
+    for stage in stages:
+        current_stage = [
+            Match(tournament=tournament, stage=stage, slot=slot)
+            for slot in range(num_matches)
+        ]
+        for slot, match in enumerate(previous_stage):
+            match.next_match = current_stage[slot // 2]
+            match.next_side = SIDES[slot % 2]
+        matches.extend(current_stage)
+        previous_stage = current_stage
+        num_matches //= 2
+
+    for i, player in enumerate(players[: len(matches) * 2]):
+        matches[i // 2].set_player(SIDES[i % 2], player)
+
+    return stages, matches
+
+
+def save_bracket(stages, matches):
+    """Insert a bracket from `build_bracket` in a fixed number of queries."""
+    Stage.objects.bulk_create(stages)
+
+    # Rows can only point to rows that exist: the links are set afterwards
+    next_matches = [match.next_match for match in matches]
+    for match in matches:
+        match.next_match = None
+    Match.objects.bulk_create(matches)
+
+    for match, next_match in zip(matches, next_matches):
+        match.next_match = next_match
+    Match.objects.bulk_update(
+        [match for match in matches if match.next_match is not None],
+        ["next_match"],
+    )
+
+
+def advance(match, winner_name, score_data):
+    """
+    Record the result of `match` and move its winner to the match they play
+    next. Only changes the objects: returns the next match, None after the
+    final.
+    """
+    winner_side = match.get_side(winner_name)
+    if winner_side is None:
+        raise ValueError(f"{winner_name} does not play this match.")
+    if match.get_player(get_other_side(winner_side)) is None:
+        raise ValueError(f"{winner_name} has no opponent in this match yet.")
+
+    match.winner = winner_name
+    match.left_score = int(score_data.get("left", 0))
+    match.right_score = int(score_data.get("right", 0))
+
+    next_match = match.next_match
+    if next_match is not None:
+        next_match.set_player(match.next_side, match.get_player(winner_side))
+    return next_match
+
+
+def link_matches(matches):
+    """Point the loaded `matches` to each other instead of to new queries."""
+    matches_by_id = {match.id: match for match in matches}
+    for match in matches:
+        if match.next_match_id in matches_by_id:
+            match.next_match = matches_by_id[match.next_match_id]
+
+
+def play_ai_match(match, end_score, rng=random):
+    """Pick the winner and score of a match between two AIs."""
+    winner_side = rng.choice(SIDES)
+    score_data = {
+        winner_side: end_score,
+        get_other_side(winner_side): rng.randint(0, end_score - 1),
+    }
+    logger.debug(f"ⓘ Early win for ai: {match.get_player(winner_side)['name']}")
+    return match.get_player(winner_side)["name"], score_data
+
+
+def play_ai_matches(matches, end_score, rng=random):
+    """
+    Play every match between two AIs in `matches`, in memory, in one pass.
+
+    `matches` are linked and in stage order, so the winners of a stage have
+    reached the next one before it is played: a chain of AIs is resolved up
+    to the final. Returns the matches changed.
+    """
+    updated_matches = []
+    for match in matches:
+        if match.winner is not None or not match.is_ai_only():
+            continue
+        next_match = advance(match, *play_ai_match(match, end_score, rng))
+        updated_matches.append(match)
+        if next_match is not None:
+            updated_matches.append(next_match)
+    return updated_matches
+
+
+def save_results(matches):
+    """Write the players and results of `matches` in a single query."""
+    unique_matches = list({match.id: match for match in matches}.values())
+    Match.objects.bulk_update(
+        unique_matches,
+        [
+            "left",
+            "left_name",
+            "right",
+            "right_name",
+            "winner",
+            "left_score",
+            "right_score",
+        ],
+    )
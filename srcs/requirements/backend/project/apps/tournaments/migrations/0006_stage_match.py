@@ -0,0 +1,174 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def stage_sort_key(stage):
+    if stage == "Final":
+        return float("inf")
+    try:
+        num, denom = map(int, stage.split("/"))
+        return num / denom
+    except Exception:
+        return float("inf")
+
+
+def get_name(player):
+    # Early AI wins stored the whole player as the winner
+    return player.get("name") if isinstance(player, dict) else player
+
+
+def brackets_to_rows(apps, schema_editor):
+    Tournament = apps.get_model("tournaments", "Tournament")
+    Stage = apps.get_model("tournaments", "Stage")
+    Match = apps.get_model("tournaments", "Match")
+
+    for tournament in Tournament.objects.iterator():
+        brackets = tournament.brackets or {}
+        for order, stage_name in enumerate(sorted(brackets, key=stage_sort_key)):
+            stage = Stage.objects.create(
+                tournament=tournament, name=stage_name, order=order
+            )
+            Match.objects.bulk_create(
+                Match(
+                    tournament=tournament,
+                    stage=stage,
+                    slot=slot,
+                    left=match.get("left"),
+                    right=match.get("right"),
+                    left_name=get_name(match.get("left")),
+                    right_name=get_name(match.get("right")),
+                    winner=get_name(match.get("winner")),
+                    left_score=(match.get("score") or {}).get("left", 0),
+                    right_score=(match.get("score") or {}).get("right", 0),
+                )
+                for slot, match in enumerate(brackets[stage_name])
+            )
+
+
+def rows_to_brackets(apps, schema_editor):
+    Tournament = apps.get_model("tournaments", "Tournament")
+
+    for tournament in Tournament.objects.prefetch_related("stages__matches"):
+        tournament.brackets = {
+            stage.name: [
+                {
+                    "left": match.left,
+                    "right": match.right,
+                    "winner": match.winner,
+                    "score": {"left": match.left_score, "right": match.right_score},
+                }
+                for match in stage.matches.all()
+            ]
+            for stage in tournament.stages.all()
+        }
+        tournament.save(update_fields=["brackets"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tournaments", "0005_tournament_notified"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Stage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=10)),
+                ("order", models.PositiveSmallIntegerField()),
+                (
+                    "tournament",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stages",
+                        to="tournaments.tournament",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("order",),
+            },
+        ),
+        migrations.CreateModel(
+            name="Match",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("slot", models.PositiveSmallIntegerField()),
+                ("left", models.JSONField(blank=True, null=True)),
+                ("right", models.JSONField(blank=True, null=True)),
+                ("left_name", models.CharField(blank=True, max_length=100, null=True)),
+                ("right_name", models.CharField(blank=True, max_length=100, null=True)),
+                ("winner", models.CharField(blank=True, max_length=100, null=True)),
+                ("left_score", models.PositiveIntegerField(default=0)),
+                ("right_score", models.PositiveIntegerField(default=0)),
+                (
+                    "tournament",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="matches",
+                        to="tournaments.tournament",
+                    ),
+                ),
+                (
+                    "stage",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="matches",
+                        to="tournaments.stage",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("slot",),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="stage",
+            constraint=models.UniqueConstraint(
+                fields=("tournament", "order"), name="unique_tournament_stage_order"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="match",
+            index=models.Index(
+                fields=["tournament", "left_name"], name="match_left_name_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="match",
+            index=models.Index(
+                fields=["tournament", "right_name"], name="match_right_name_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="match",
+            constraint=models.UniqueConstraint(
+                fields=("tournament", "stage", "slot"),
+                name="unique_tournament_stage_slot",
+            ),
+        ),
+        migrations.RunPython(brackets_to_rows, rows_to_brackets),
+        migrations.RemoveField(
+            model_name="tournament",
+            name="brackets",
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SIDES = ("left", "right")
+
+
+def link_matches(apps, schema_editor):
+    """
+    Link the matches of existing brackets. Winners used to be placed on a
+    random free side of the next stage: a match whose winner was placed
+    keeps that place, the others take the free sides left, in tree order
+    when possible.
+    """
+    Tournament = apps.get_model("tournaments", "Tournament")
+    Match = apps.get_model("tournaments", "Match")
+
+    for tournament in Tournament.objects.prefetch_related("stages__matches"):
+        stages = list(tournament.stages.all())
+        linked = []
+        for stage, next_stage in zip(stages, stages[1:]):
+            next_matches = list(next_stage.matches.all())
+            places = {}
+            free = []
+            for next_match in next_matches:
+                for side in SIDES:
+                    player = getattr(next_match, side)
+                    if player:
+                        places[player.get("name")] = (next_match, side)
+                    else:
+                        free.append((next_match, side))
+
+            unplaced = []
+            for match in stage.matches.all():
+                if match.winner in places:
+                    match.next_match, match.next_side = places.pop(match.winner)
+                    linked.append(match)
+                else:
+                    unplaced.append(match)
+
+            for match in unplaced:
+                default = (match.slot // 2, SIDES[match.slot % 2])
+                place = next(
+                    (p for p in free if (p[0].slot, p[1]) == default),
+                    free[0] if free else None,
+                )
+                if place is None:
+                    continue
+                free.remove(place)
+                match.next_match, match.next_side = place
+                linked.append(match)
+
+        Match.objects.bulk_update(linked, ["next_match", "next_side"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tournaments", "0006_stage_match"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="match",
+            name="next_match",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="previous_matches",
+                to="tournaments.match",
+            ),
+        ),
+        migrations.AddField(
+            model_name="match",
+            name="next_side",
+            field=models.CharField(
+                blank=True,
+                choices=[("left", "Left"), ("right", "Right")],
+                max_length=5,
+                null=True,
+            ),
+        ),
+        migrations.RunPython(link_matches, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,11 @@
-import json
 import logging
 import random
 import uuid
 from typing import Optional
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 
 logger = logging.getLogger("tournaments_logs")
 
@@ -21,7 +21,6 @@ class Tournament(models.Model):
     )
 
     players: models.JSONField = models.JSONField(default=list)
-    brackets: models.JSONField = models.JSONField(default=dict)
     game: models.JSONField = models.JSONField(default=dict)
     gameplay: models.JSONField = models.JSONField(default=dict)
 
@@ -47,93 +46,108 @@ class Tournament(models.Model):
         return f"{self.name} ({self.status})"
 
     def generate_brackets(self):
-        players_list = self.players.copy()
-        auto_advance_ai_winners = []
+        from .bracket import build_bracket, play_ai_matches, save_bracket
 
+        players_list = self.players.copy()
         random.shuffle(players_list)
 
-        num_players = len(players_list)
-        if num_players < 2:
-            raise ValueError(
-                "At least two players are required to create a tournament."
-            )
+        # Matches between two AIs are played before anything is written
+        stages, matches = build_bracket(self, players_list)
+        play_ai_matches(matches, self.get_end_score())
+
+        with transaction.atomic():
+            save_bracket(stages, matches)
+            self.finish(matches[-1])
+
+    def find_latest_match(self, player_name):
+        # Indexed on (tournament, player name): no scan of the whole bracket
+        if not player_name:
+            return None
+        return (
+            Match.objects.filter(tournament=self)
+            .filter(Q(left_name=player_name) | Q(right_name=player_name))
+            .select_related("stage")
+            .order_by("-stage__order")
+            .first()
+        )
 
-        brackets = {}
+    def find_match(self, player_name, opponent_name):
+        # The two players of a match meet nowhere else in the bracket
+        return (
+            Match.objects.filter(tournament=self)
+            .filter(
+                Q(left_name=player_name, right_name=opponent_name)
+                | Q(left_name=opponent_name, right_name=player_name)
+            )
+            .select_related("stage")
+            .first()
+        )
 
-        # Assign stages
-        num_rounds = num_players // 2
-        stage_names = ["Final"]
+    def record_result(self, winner_name, score_data, loser_name):
+        """
+        Record the result of the match of `winner_name` against `loser_name`
+        and advance the winner. The matches between
+        two AIs that follow are played in memory; everything is written at
+        once. A match already played is left as it is, so a result can be
+        reported twice. Returns False if the tournament is over or the
+        winner has no match in it with both players.
+        """
+        from .bracket import advance, link_matches, play_ai_matches, save_results
+
+        with transaction.atomic():
+            # Results of one tournament are applied one at a time, on fresh
+            # rows; the lock only holds up results of this tournament
+            status = (
+                Tournament.objects.select_for_update()
+                .values_list("status", flat=True)
+                .get(pk=self.pk)
+            )
+            if status != "in_progress":
+                logger.warning(f"⚠️ Tournament {self.pk} is {status}, result ignored")
+                return False
+
+            match = self.find_match(winner_name, loser_name)
+            if match is None:
+                logger.warning(
+                    f"⚠️ No match '{winner_name}' vs '{loser_name}' in the brackets"
+                )
+                return False
+            if match.winner is not None:
+                logger.info(f"ⓘ Match already recorded: {match}")
+                return True
+            if None in (match.left_name, match.right_name):
+                logger.warning(f"⚠️ Match not ready, its players are missing: {match}")
+                return False
+
+            # The winner can only go up: the stages below are never read
+            later_matches = list(
+                Match.objects.filter(
+                    tournament=self, stage__order__gt=match.stage.order
+                ).order_by("stage__order", "slot")
+            )
+            link_matches([match, *later_matches])
 
-        i = 2
-        while i <= num_rounds:
-            stage_names.insert(0, f"1/{i}")
-            i *= 2
+            next_match = advance(match, winner_name, score_data)
+            updated_matches = [match, *([next_match] if next_match else [])]
+            updated_matches += play_ai_matches(later_matches, self.get_end_score())
 
-        # Assign stage players
-        stage_index = 0
-        num_matches = num_players // 2
-        current_round = players_list
+            save_results(updated_matches)
+            self.finish((later_matches or [match])[-1])
 
-        while num_matches >= 1:
-            stage = stage_names[stage_index]
-            brackets[stage] = []
+        logger.info(f"✓ UPDATED BRACKET MATCH: {match}")
+        return True
 
-            next_round = []
-            for i in range(0, len(current_round), 2):
-                left_player = current_round[i]
-                right_player = (
-                    current_round[i + 1] if i + 1 < len(current_round) else None
-                )
+    def finish(self, final):
+        if final.winner is None:
+            return
+        self.winner = final.winner
+        self.status = "finished"
+        self.save(update_fields=["winner", "status", "updated_at"])
 
-                match = {
-                    "left": left_player,
-                    "right": right_player,
-                    "winner": None,
-                    "score": {"left": 0, "right": 0},
-                }
-
-                if (
-                    left_player
-                    and right_player
-                    and left_player["controlled_by"]
-                    == right_player["controlled_by"]
-                    == "ai"
-                ):
-                    end_score = self.game.get("end_score", 6)
-
-                    winner = random.choice(["left", "right"])
-                    loser = "right" if winner == "left" else "left"
-
-                    match["winner"] = match[winner]
-                    match["score"][winner] = end_score
-                    match["score"][loser] = random.randint(0, end_score - 1)
-
-                    logger.debug(f"ⓘ Early win for ai: {match['winner']['name']}")
-                    auto_advance_ai_winners.append(
-                        {
-                            "winner_name": match[winner]["name"],
-                            "score_data": match["score"],
-                        }
-                    )
-
-                brackets[stage].append(match)
-                next_round.append(None)
-
-            current_round = next_round
-            num_matches //= 2
-            stage_index += 1
-
-        self.brackets = json.loads(json.dumps(brackets))
-        self.save()
-
-        for data in auto_advance_ai_winners:
-            self.update_bracket(
-                tournament_id=self.id,
-                winner_name=data["winner_name"],
-                score_data=data["score_data"],
-            )
+    def get_end_score(self):
+        return self.game.get("end_score", 6)
 
-    def update_bracket(self, tournament_id, winner_name, score_data):
+    def update_bracket(self, tournament_id, winner_name, score_data, loser_name):
         logger.info(
             f"ⓘ UPDATING BRACKET | winner_name: {winner_name}: score_data: {score_data}"
         )
@@ -143,133 +157,126 @@ class Tournament(models.Model):
             logger.error(f"Tournament {tournament_id} not found.")
             return False
 
-        brackets = tournament.brackets
-        updated_brackets = brackets.copy()
-        next_ai_winner = None
-
-        def stage_sort_key(stage):
-            if stage == "Final":
-                return float("inf")
-            try:
-                num, denom = map(int, stage.split("/"))
-                return num / denom
-            except Exception:
-                return float("inf")
-
-        sorted_stage_names = sorted(brackets.keys(), key=stage_sort_key)
-
-        winner_stage = None
-        winner_stage_index = None
-        winner_match_index = None
-        winner_side = None
-
-        # Find latest stage where winner is present
-        for stage_index, stage_name in enumerate(sorted_stage_names):
-            matches = brackets.get(stage_name, [])
-            logger.debug(f"ⓘ Stage {stage_name} Matches: {matches}")
-            for idx, match in enumerate(matches):
-                left = match.get("left")
-                right = match.get("right")
-
-                if left and left.get("name") == winner_name:
-                    winner_stage = stage_name
-                    winner_stage_index = stage_index
-                    winner_match_index = idx
-                    winner_side = "left"
-                elif right and right.get("name") == winner_name:
-                    winner_stage = stage_name
-                    winner_stage_index = stage_index
-                    winner_match_index = idx
-                    winner_side = "right"
-
-        # Now update only if we found something
-        if winner_stage is not None:
-            logger.debug(
-                f"✓ Found latest winner '{winner_name}' in stage '{winner_stage}', match index {winner_match_index}, side: {winner_side}"
-            )
+        return tournament.record_result(winner_name, score_data, loser_name)
+
+
+class Stage(models.Model):
+    tournament: models.ForeignKey = models.ForeignKey(
+        Tournament,
+        on_delete=models.CASCADE,
+        related_name="stages",
+    )
+    # "1/8", "1/4", "1/2", "Final"
+    name: models.CharField = models.CharField(max_length=10)
+    # 0 for the first stage played
+    order: models.PositiveSmallIntegerField = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ("order",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=("tournament", "order"), name="unique_tournament_stage_order"
+            ),
+        ]
 
-            updated_brackets = brackets.copy()
-            updated_match = updated_brackets[winner_stage][winner_match_index]
-            updated_match["winner"] = winner_name
-            updated_match["score"] = score_data
+    def __str__(self) -> str:
+        return f"{self.tournament_id} {self.name}"
 
-            logger.debug(f"✓ Updated match with winner and score: {updated_match}")
 
-        logger.debug(f"updated_brackets: {updated_brackets}")
-        logger.debug(
-            f"winner_stage: {winner_stage}, winner_stage_index: {winner_stage_index}, next stage index: {winner_stage_index + 1}"
+class Match(models.Model):
+    tournament: models.ForeignKey = models.ForeignKey(
+        Tournament,
+        on_delete=models.CASCADE,
+        related_name="matches",
+    )
+    stage: models.ForeignKey = models.ForeignKey(
+        Stage,
+        on_delete=models.CASCADE,
+        related_name="matches",
+    )
+    # Position of the match in its stage
+    slot: models.PositiveSmallIntegerField = models.PositiveSmallIntegerField()
+
+    # Players as stored in Tournament.players, None until they advance here
+    left: models.JSONField = models.JSONField(null=True, blank=True)
+    right: models.JSONField = models.JSONField(null=True, blank=True)
+    # Copies of the players' names, indexed to find a player's match
+    left_name: Optional[models.CharField] = models.CharField(
+        max_length=100, null=True, blank=True
+    )
+    right_name: Optional[models.CharField] = models.CharField(
+        max_length=100, null=True, blank=True
+    )
+
+    # The match the winner plays next and their side there, None for the final
+    next_match: Optional[models.ForeignKey] = models.ForeignKey(
+        "self",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="previous_matches",
+    )
+    next_side: Optional[models.CharField] = models.CharField(
+        max_length=5,
+        choices=[("left", "Left"), ("right", "Right")],
+        null=True,
+        blank=True,
+    )
+
+    winner: Optional[models.CharField] = models.CharField(
+        max_length=100, null=True, blank=True
+    )
+    left_score: models.PositiveIntegerField = models.PositiveIntegerField(default=0)
+    right_score: models.PositiveIntegerField = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ("slot",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=("tournament", "stage", "slot"),
+                name="unique_tournament_stage_slot",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=("tournament", "left_name"), name="match_left_name_idx"
+            ),
+            models.Index(
+                fields=("tournament", "right_name"), name="match_right_name_idx"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return (
+            f"{self.left_name} vs {self.right_name} "
+            f"({self.left_score}-{self.right_score}, winner: {self.winner})"
         )
 
-        if winner_stage == "Final":
-            tournament.winner = winner_name
-            tournament.status = "finished"
+    def get_player(self, side):
+        return self.left if side == "left" else self.right
+
+    def get_side(self, player_name):
+        if player_name is not None and player_name == self.left_name:
+            return "left"
+        if player_name is not None and player_name == self.right_name:
+            return "right"
+        return None
+
+    def set_player(self, side, player):
+        name = player.get("name") if player else None
+        if side == "left":
+            self.left, self.left_name = player, name
         else:
-            logger.debug("adding winner to the next stage...")
-            matches = brackets.get(sorted_stage_names[winner_stage_index + 1], [])
-            logger.debug(f"next stage matches: {matches}")
-
-            # Find available slots (only one side is empty)
-            available_slots = []
-            for i, match in enumerate(matches):
-                if match.get("left") is None:
-                    available_slots.append((i, "left"))
-                if match.get("right") is None:
-                    available_slots.append((i, "right"))
-
-            if available_slots:
-                selected_index, side = random.choice(available_slots)
-                logger.debug(
-                    f"✓ Selected random match stage: {winner_stage_index + 1}, index: {selected_index}, side: {side}, match: {updated_brackets[sorted_stage_names[winner_stage_index + 1]][selected_index]}"
-                )
-                winner_player = updated_brackets[winner_stage][winner_match_index][
-                    winner_side
-                ]
-                updated_brackets[sorted_stage_names[winner_stage_index + 1]][
-                    selected_index
-                ][side] = winner_player
-                logger.debug("✓ Winner inserted into next stage")
-
-                opponent_side = "right" if side == "left" else "left"
-                opponent = updated_brackets[sorted_stage_names[winner_stage_index + 1]][
-                    selected_index
-                ][opponent_side]
-
-                if (
-                    opponent
-                    and opponent.get("controlled_by") == "ai"
-                    and winner_player.get("controlled_by") == "ai"
-                ):
-                    logger.debug(
-                        "AI vs AI detected in next stage, resolving automatically..."
-                    )
-
-                    end_score = tournament.game.get("end_score", 6)
-                    winner_side = random.choice([side, opponent_side])
-                    loser_side = opponent_side if winner_side == side else side
-                    next_match = updated_brackets[
-                        sorted_stage_names[winner_stage_index + 1]
-                    ][selected_index]
-                    actual_winner = next_match[winner_side]
-
-                    new_score_data = {side: 0, opponent_side: 0}
-                    new_score_data[winner_side] = end_score
-                    new_score_data[loser_side] = random.randint(0, end_score - 1)
-
-                    next_ai_winner = {
-                        "winner_name": actual_winner.get("name"),
-                        "score_data": new_score_data,
-                    }
-            else:
-                logger.warning("⚠️ No available slots in next stage to insert winner")
-
-        tournament.brackets = updated_brackets
-        tournament.save()
-        logger.info(f"✓ UPDATED BRACKETS: {updated_brackets}")
-
-        logger.debug(f"next ai winner needs updating: {next_ai_winner}")
-        if next_ai_winner:
-            self.update_bracket(
-                tournament_id=tournament.id,
-                winner_name=next_ai_winner["winner_name"],
-                score_data=next_ai_winner["score_data"],
-            )
+            self.right, self.right_name = player, name
+
+    def get_score(self):
+        return {"left": self.left_score, "right": self.right_score}
+
+    def is_ai_only(self):
+        return bool(
+            self.left
+            and self.right
+            and self.left.get("controlled_by")
+            == self.right.get("controlled_by")
+            == "ai"
+        )
@@ -0,0 +1,55 @@
+from rest_framework import serializers
+
+from .models import Tournament
+
+# Loads a tournament's stages and matches in two queries, whatever its size
+BRACKETS_PREFETCH = ("stages__matches",)
+
+
+def serialize_match(match):
+    return {
+        "left": match.left,
+        "right": match.right,
+        "winner": match.winner,
+        "score": match.get_score(),
+    }
+
+
+def serialize_brackets(tournament):
+    """
+    Brackets in the shape the API always had, from the Stage and Match rows:
+    {stage name: [match, ...]}, stages in the order they are played.
+    """
+    return {
+        stage.name: [serialize_match(match) for match in stage.matches.all()]
+        for stage in tournament.stages.all()
+    }
+
+
+class TournamentSerializer(serializers.ModelSerializer):
+    id = serializers.CharField(read_only=True)
+    host = serializers.SerializerMethodField()
+    brackets = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Tournament
+        fields = [
+            "id",
+            "winner",
+            "notified",
+            "name",
+            "host",
+            "status",
+            "players",
+            "game",
+            "gameplay",
+            "brackets",
+            "created_at",
+            "updated_at",
+        ]
+
+    def get_host(self, tournament):
+        return {"id": tournament.host.id, "email": tournament.host.email}
+
+    def get_brackets(self, tournament):
+        return serialize_brackets(tournament)
@@ -4,6 +4,10 @@ import logging
 logger = logging.getLogger("tournaments_logs")
 
 
-def update_bracket(tournament_id, winner_name, score):
-    tournament = Tournament.objects.get(id=tournament_id)
-    tournament.update_bracket(tournament_id, winner_name, score)
+def update_bracket(tournament_id, winner_name, score, loser_name):
+    try:
+        tournament = Tournament.objects.get(id=tournament_id)
+    except Tournament.DoesNotExist:
+        logger.error(f"Tournament {tournament_id} not found.")
+        return False
+    return tournament.record_result(winner_name, score, loser_name)
@@ -1,3 +1,432 @@
-from django.test import TestCase
+import threading
+from unittest import skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from hypothesis import given, settings, strategies as st
+from hypothesis.extra.django import TestCase as HypothesisTestCase
+from rest_framework.test import APIClient
+
+from .bracket import build_bracket, advance, get_other_side, get_stage_names
+from .models import Tournament, Match
+from .serializers import serialize_brackets
+
+User = get_user_model()
+
+
+def make_players(controllers):
+    return [
+        {"name": f"player{i}", "controlled_by": controlled_by, "key": str(i)}
+        for i, controlled_by in enumerate(controllers)
+    ]
+
+
+class BracketStorageTest(TestCase):
+    def setUp(self):
+        self.host = User.objects.create(email="host@example.com", username="host")
+
+    def create_tournament(self, controllers):
+        tournament = Tournament.objects.create(
+            name="Cup",
+            host=self.host,
+            players=make_players(controllers),
+            game={"end_score": 3},
+        )
+        tournament.generate_brackets()
+        return tournament
+
+    def test_brackets_keep_their_api_shape(self):
+        tournament = self.create_tournament(["user"] * 4)
+
+        brackets = serialize_brackets(tournament)
+
+        self.assertEqual(list(brackets), ["1/2", "Final"])
+        self.assertEqual(len(brackets["1/2"]), 2)
+        self.assertEqual(
+            brackets["Final"],
+            [
+                {
+                    "left": None,
+                    "right": None,
+                    "winner": None,
+                    "score": {"left": 0, "right": 0},
+                }
+            ],
+        )
+        names = {
+            match[side]["name"]
+            for match in brackets["1/2"]
+            for side in ("left", "right")
+        }
+        self.assertEqual(names, {f"player{i}" for i in range(4)})
+
+    def test_result_updates_the_match_and_advances_the_winner(self):
+        tournament = self.create_tournament(["user"] * 4)
+        match = Match.objects.get(tournament=tournament, stage__order=0, slot=0)
+        winner = match.left
+
+        tournament.update_bracket(
+            tournament.id, winner["name"], {"left": 3, "right": 1}, match.right_name
+        )
+
+        match.refresh_from_db()
+        self.assertEqual(match.winner, winner["name"])
+        self.assertEqual(match.get_score(), {"left": 3, "right": 1})
+        final = Match.objects.get(tournament=tournament, stage__name="Final")
+        self.assertIn(winner, (final.left, final.right))
+        self.assertEqual(tournament.find_latest_match(winner["name"]), final)
+
+    def test_creation_takes_constant_queries(self):
+        counts = []
+        for size in (4, 64):
+            tournament = Tournament.objects.create(
+                name="Cup", host=self.host, players=make_players(["ai"] * size)
+            )
+            with CaptureQueriesContext(connection) as queries:
+                tournament.generate_brackets()
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_result_plays_the_following_ai_matches_at_once(self):
+        tournament = self.create_tournament(["user"] + ["ai"] * 7)
+        match = tournament.find_latest_match("player0")
+        opponent = match.get_player("right" if match.left_name == "player0" else "left")
+
+        with CaptureQueriesContext(connection) as queries:
+            tournament.record_result(
+                opponent["name"], {"left": 3, "right": 0}, "player0"
+            )
+
+        # Every later match involves the AI that won, until the final
+        tournament.refresh_from_db()
+        self.assertEqual(tournament.status, "finished")
+        self.assertNotEqual(tournament.winner, "player0")
+        self.assertFalse(Match.objects.filter(winner__isnull=True).exists())
+        # Lock, lookup, later matches, bulk update and tournament update, in
+        # a transaction: whatever the number of AI matches played
+        self.assertLessEqual(len(queries), 7)
+
+    def test_results_from_stale_instances_both_reach_the_final(self):
+        tournament = self.create_tournament(["user"] * 4)
+        # Two games of the same tournament end one after the other
+        first = Tournament.objects.get(pk=tournament.pk)
+        second = Tournament.objects.get(pk=tournament.pk)
+        matches = [
+            Match.objects.get(tournament=tournament, stage__order=0, slot=slot)
+            for slot in (0, 1)
+        ]
+        winners = [match.left for match in matches]
+
+        first.record_result(winners[0]["name"], {"left": 3}, matches[0].right_name)
+        second.record_result(winners[1]["name"], {"left": 3}, matches[1].right_name)
+
+        final = Match.objects.get(tournament=tournament, stage__name="Final")
+        self.assertEqual([final.left, final.right], winners)
+
+    def test_stale_instance_sees_the_result_committed_before_it(self):
+        tournament = self.create_tournament(["user"] * 2)
+        first = Tournament.objects.get(pk=tournament.pk)
+        second = Tournament.objects.get(pk=tournament.pk)
+
+        self.assertTrue(first.record_result("player0", {"left": 3}, "player1"))
+        # Still in progress in memory, finished in the database
+        self.assertEqual(second.status, "in_progress")
+        self.assertFalse(second.record_result("player1", {"right": 3}, "player0"))
+
+        tournament.refresh_from_db()
+        self.assertEqual(tournament.winner, "player0")
+        final = Match.objects.get(tournament=tournament)
+        self.assertEqual(final.winner, "player0")
+
+    def test_result_reported_twice_is_recorded_once(self):
+        tournament = self.create_tournament(["user"] * 4)
+        match = Match.objects.get(tournament=tournament, stage__order=0, slot=0)
+
+        for _ in range(2):
+            tournament.record_result(
+                match.left_name, {"left": 3, "right": 1}, match.right_name
+            )
+
+        final = Match.objects.get(tournament=tournament, stage__name="Final")
+        self.assertIsNone(final.winner)
+        self.assertEqual(final.left_name, match.left_name)
+
+    def test_results_of_an_abandoned_tournament_are_ignored(self):
+        tournament = self.create_tournament(["user"] * 2)
+        stale = Tournament.objects.get(pk=tournament.pk)
+        Tournament.objects.filter(pk=tournament.pk).update(status="abandoned")
+
+        self.assertFalse(stale.record_result("player0", {"left": 3}, "player1"))
+
+        tournament.refresh_from_db()
+        self.assertEqual(tournament.status, "abandoned")
+        self.assertFalse(Match.objects.filter(winner__isnull=False).exists())
+
+    def test_ai_only_tournament_finishes_on_creation(self):
+        tournament = self.create_tournament(["ai"] * 8)
+
+        tournament.refresh_from_db()
+        self.assertEqual(tournament.status, "finished")
+        final = Match.objects.get(tournament=tournament, stage__name="Final")
+        self.assertEqual(final.winner, tournament.winner)
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class TournamentResultEndpointTest(TestCase):
+    def setUp(self):
+        self.host = User.objects.create(email="host@example.com", username="host")
+        self.tournament = Tournament.objects.create(
+            name="Cup", host=self.host, players=make_players(["user"] * 4)
+        )
+        self.tournament.generate_brackets()
+        self.match = Match.objects.get(
+            tournament=self.tournament, stage__order=0, slot=0
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.host)
+
+    def put_result(self, score, **players):
+        data = {"winner": self.match.left_name, "loser": self.match.right_name}
+        data.update(players, score=score)
+        return self.client.put(
+            f"/api/tournaments/{self.tournament.id}", data, format="json"
+        )
+
+    def test_invalid_scores_are_refused(self):
+        for score in [
+            [3, 1],
+            {"left": 3, "middle": 1},
+            {"left": -1, "right": 3},
+            {"left": "3", "right": 1},
+            {"left": 3.5, "right": 1},
+            {"left": True, "right": 0},
+        ]:
+            response = self.put_result(score)
+            self.assertEqual(response.status_code, 400, score)
+            self.assertIn("error", response.json())
+
+        self.assertFalse(Match.objects.filter(winner__isnull=False).exists())
+
+    def test_result_without_a_loser_is_refused(self):
+        response = self.put_result({"left": 3}, loser=None)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Match.objects.filter(winner__isnull=False).exists())
+
+    def test_valid_score_is_recorded(self):
+        response = self.put_result({"left": 3, "right": 1})
+
+        self.assertEqual(response.status_code, 200)
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.winner, self.match.left_name)
+        self.assertEqual(self.match.get_score(), {"left": 3, "right": 1})
+
+    def test_result_sent_twice_is_recorded_once(self):
+        for _ in range(2):
+            response = self.put_result({"left": 3, "right": 1})
+            self.assertEqual(response.status_code, 200)
+
+        # The winner waits in the final for an opponent, nothing more
+        final = Match.objects.get(tournament=self.tournament, stage__name="Final")
+        self.assertEqual(final.left_name, self.match.left_name)
+        self.assertIsNone(final.right_name)
+        self.assertIsNone(final.winner)
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.status, "in_progress")
+
+
+@skipUnless(
+    connection.features.has_select_for_update,
+    "Results are applied concurrently only on databases with row locks",
+)
+class ConcurrentResultsTest(TransactionTestCase):
+    def report_at_once(self, tournament, players):
+        """Record one (winner, loser) result per thread, started together."""
+        stale_instances = [Tournament.objects.get(pk=tournament.pk) for _ in players]
+        barrier = threading.Barrier(len(players))
+        results = [None] * len(players)
+
+        def report(index):
+            winner_name, loser_name = players[index]
+            try:
+                barrier.wait()
+                results[index] = stale_instances[index].record_result(
+                    winner_name, {"left": 3}, loser_name
+                )
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=report, args=(index,))
+            for index in range(len(players))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def create_tournament(self, num_players):
+        host = User.objects.create(email="host@example.com", username="host")
+        tournament = Tournament.objects.create(
+            name="Cup", host=host, players=make_players(["user"] * num_players)
+        )
+        tournament.generate_brackets()
+        return tournament
+
+    def test_concurrent_results_both_reach_the_final(self):
+        tournament = self.create_tournament(4)
+        matches = [
+            Match.objects.get(tournament=tournament, stage__order=0, slot=slot)
+            for slot in (0, 1)
+        ]
+        winners = [match.left for match in matches]
+
+        results = self.report_at_once(
+            tournament, [(match.left_name, match.right_name) for match in matches]
+        )
+
+        self.assertEqual(results, [True, True])
+        final = Match.objects.get(tournament=tournament, stage__name="Final")
+        self.assertEqual([final.left, final.right], winners)
+
+    def test_concurrent_results_of_the_final_finish_it_once(self):
+        tournament = self.create_tournament(2)
+
+        results = self.report_at_once(
+            tournament, [("player0", "player1"), ("player1", "player0")]
+        )
+
+        # The second result sees the finished tournament and is refused
+        self.assertEqual(sorted(results), [False, True])
+
+        tournament.refresh_from_db()
+        final = Match.objects.get(tournament=tournament)
+        self.assertEqual(tournament.status, "finished")
+        self.assertIn(final.winner, ("player0", "player1"))
+        self.assertEqual(tournament.winner, final.winner)
+
+
+def play(matches, pick_left):
+    """Play a built bracket in order, `pick_left(match)` choosing each winner."""
+    for match in matches:
+        side = "left" if pick_left(match) else "right"
+        advance(match, match.get_player(side)["name"], {side: 3})
+
+
+class BracketEngineTest(SimpleTestCase):
+    def test_stage_names(self):
+        self.assertEqual(get_stage_names(2), ["Final"])
+        self.assertEqual(get_stage_names(16), ["1/8", "1/4", "1/2", "Final"])
+
+    def test_winners_meet_in_the_next_stage(self):
+        stages, matches = build_bracket(Tournament(), make_players(["user"] * 4))
+        play(matches[:2], lambda match: True)
+
+        final = matches[2]
+        self.assertEqual(final.left_name, "player0")
+        self.assertEqual(final.right_name, "player2")
+        self.assertIsNone(advance(final, "player2", {"right": 3}))
+        self.assertEqual(final.winner, "player2")
+
+    def test_advancing_a_stranger_is_refused(self):
+        stages, matches = build_bracket(Tournament(), make_players(["user"] * 2))
+
+        with self.assertRaises(ValueError):
+            advance(matches[0], "player9", {})
+
+    def test_winning_without_an_opponent_is_refused(self):
+        stages, matches = build_bracket(Tournament(), make_players(["user"] * 4))
+        advance(matches[0], "player0", {"left": 3})
+
+        with self.assertRaises(ValueError):
+            advance(matches[2], "player0", {"left": 3})
+        self.assertIsNone(matches[2].winner)
+
+
+class BracketEnginePropertyTest(SimpleTestCase):
+    @given(st.integers(1, 7), st.randoms(use_true_random=False))
+    def test_bracket_is_a_tree_played_to_one_champion(self, rounds, rng):
+        players = make_players(["user"] * 2**rounds)
+        stages, matches = build_bracket(Tournament(), players)
+
+        self.assertEqual(len(stages), rounds)
+        self.assertEqual(len(matches), len(players) - 1)
+        # Each match but the final feeds one side of a match of the next stage
+        feeds = {}
+        for match in matches:
+            if match.stage is stages[-1]:
+                self.assertIsNone(match.next_match)
+                continue
+            self.assertEqual(match.next_match.stage.order, match.stage.order + 1)
+            key = (id(match.next_match), match.next_side)
+            self.assertNotIn(key, feeds)
+            feeds[key] = match
+        self.assertEqual(len(feeds), len(matches) - 1)
+
+        play(matches, lambda match: rng.random() < 0.5)
+
+        # Every match had two players; each winner plays the next stage
+        wins = {}
+        for match in matches:
+            self.assertIsNotNone(match.left_name)
+            self.assertIsNotNone(match.right_name)
+            self.assertIn(match.winner, (match.left_name, match.right_name))
+            wins[match.winner] = wins.get(match.winner, 0) + 1
+            if match.next_match is not None:
+                self.assertEqual(
+                    match.next_match.get_side(match.winner), match.next_side
+                )
+        champion = matches[-1].winner
+        self.assertEqual(wins[champion], rounds)
+        self.assertEqual(len(wins), len(players) // 2)
+
+
+class BracketPropertyTest(HypothesisTestCase):
+    @settings(max_examples=20, deadline=None)
+    @given(
+        st.lists(st.sampled_from(["user", "ai"]), min_size=2, max_size=16).filter(
+            lambda controllers: len(controllers) & (len(controllers) - 1) == 0
+        ),
+        st.randoms(use_true_random=False),
+    )
+    def test_results_lead_to_a_single_winner(self, controllers, rng):
+        host = User.objects.create(email="host@example.com", username="host")
+        tournament = Tournament.objects.create(
+            name="Cup", host=host, players=make_players(controllers)
+        )
+        tournament.generate_brackets()
+
+        # Report results the way the games do, by winner and loser name
+        for _ in range(len(controllers)):
+            tournament.refresh_from_db()
+            if tournament.status == "finished":
+                break
+            match = Match.objects.filter(
+                tournament=tournament,
+                winner__isnull=True,
+                left__isnull=False,
+                right__isnull=False,
+            ).first()
+            side = rng.choice(["left", "right"])
+            self.assertTrue(
+                tournament.record_result(
+                    match.get_player(side)["name"],
+                    {side: 6},
+                    match.get_player(get_other_side(side))["name"],
+                )
+            )
+
+        tournament.refresh_from_db()
+        self.assertEqual(tournament.status, "finished")
+        self.assertFalse(Match.objects.filter(winner__isnull=True).exists())
+        final = Match.objects.get(tournament=tournament, next_match__isnull=True)
+        self.assertEqual(final.winner, tournament.winner)
@@ -1,9 +1,12 @@
 import logging
-import random
 
 import requests
 from django.contrib.auth import get_user_model
 from project.apps.tournaments.models import Tournament
+from project.apps.tournaments.serializers import (
+    TournamentSerializer,
+    BRACKETS_PREFETCH,
+)
 from project.authentication import JWTOrIntraAuthentication
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
@@ -21,6 +24,15 @@ def get_next_power_of_two(n):
     return 1 if n < 1 else 2 ** (n - 1).bit_length()
 
 
+def is_valid_score(score_data):
+    # {"left": int, "right": int}, either side may be left out
+    return (
+        isinstance(score_data, dict)
+        and set(score_data) <= {"left", "right"}
+        and all(type(points) is int and points >= 0 for points in score_data.values())
+    )
+
+
 def fetch_unique_random_names(existing_names, needed):
     tries = 0
     max_tries = 5
@@ -122,46 +134,24 @@ class UserTournaments(APIView):
         )
         tournament.generate_brackets()
 
-        response_data = {
-            "id": str(tournament.id),
-            "name": tournament.name,
-            "host": {"id": tournament.host.id, "email": tournament.host.email},
-            "status": tournament.status,
-            "players": tournament.players,
-            "brackets": tournament.brackets,
-            "game": tournament.game,
-            "gameplay": tournament.gameplay,
-            "created_at": tournament.created_at.isoformat(),
-            "updated_at": tournament.updated_at.isoformat(),
-        }
+        response_data = TournamentSerializer(tournament).data
 
         return Response(response_data, status=status.HTTP_201_CREATED)
 
     def get(self, request):
         user = request.user
         status_filter = request.query_params.get("status")
-        tournaments_query = Tournament.objects.filter(host=user).order_by("-created_at")
+        tournaments_query = (
+            Tournament.objects.filter(host=user)
+            .select_related("host")
+            .prefetch_related(*BRACKETS_PREFETCH)
+            .order_by("-created_at")
+        )
 
         if status_filter:
             tournaments_query = tournaments_query.filter(status=status_filter)
 
-        response_data = [
-            {
-                "id": str(t.id),
-                "winner": t.winner,
-                "notified": t.notified,
-                "name": t.name,
-                "host": {"id": t.host.id, "email": t.host.email},
-                "status": t.status,
-                "players": t.players,
-                "game": t.game,
-                "gameplay": t.gameplay,
-                "brackets": t.brackets,
-                "created_at": t.created_at.isoformat(),
-                "updated_at": t.updated_at.isoformat(),
-            }
-            for t in tournaments_query
-        ]
+        response_data = TournamentSerializer(tournaments_query, many=True).data
 
         return Response(response_data, status=status.HTTP_200_OK)
 
@@ -197,133 +187,58 @@ class UserTournaments(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Apply updates
+        # Apply updates, leaving the fields a result may be writing alone
+        update_fields = ["updated_at"]
         if status_update:
             t.status = status_update
+            update_fields.append("status")
         if winner_update:
             t.winner = winner_update
+            update_fields.append("winner")
         if notified_update:
             t.notified = notified_update
+            update_fields.append("notified")
 
-        t.save()
+        t.save(update_fields=update_fields)
 
-        return Response(
-            {
-                "id": str(t.id),
-                "winner": t.winner,
-                "notified": t.notified,
-                "name": t.name,
-                "host": {"id": t.host.id, "email": t.host.email},
-                "status": t.status,
-                "players": t.players,
-                "game": t.game,
-                "gameplay": t.gameplay,
-                "brackets": t.brackets,
-                "created_at": t.created_at.isoformat(),
-                "updated_at": t.updated_at.isoformat(),
-            },
-            status=status.HTTP_200_OK,
-        )
+        return Response(TournamentSerializer(t).data, status=status.HTTP_200_OK)
 
     def put(self, request, tournament_id):
         data = request.data
         winner_name = data.get("winner")
+        loser_name = data.get("loser")
         score_data = data.get("score", {})
 
+        # The two players name the match: a result sent twice finds it again
+        if not winner_name or not loser_name:
+            return Response(
+                {"error": "A winner and a loser must be provided."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if not is_valid_score(score_data):
+            return Response(
+                {
+                    "error": "Invalid score. Expected non-negative integers for left and right."
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
         try:
             tournament = Tournament.objects.get(id=tournament_id)
         except Tournament.DoesNotExist:
             logger.error(f"Tournament {tournament_id} not found.")
-            return False
-
-        brackets = tournament.brackets
-        updated_brackets = brackets.copy()
-
-        def stage_sort_key(stage):
-            if stage == "Final":
-                return float("inf")
-            try:
-                num, denom = map(int, stage.split("/"))
-                return num / denom
-            except Exception:
-                return float("inf")
-
-        sorted_stage_names = sorted(brackets.keys(), key=stage_sort_key)
-        logger.debug(f"sorted_stage_names: {sorted_stage_names}")
-
-        winner_stage = None
-        winner_stage_index = None
-        winner_match_index = None
-        winner_side = None
-
-        # Find latest stage where winner is present
-        for stage_index, stage_name in enumerate(sorted_stage_names):
-            matches = brackets.get(stage_name, [])
-            for idx, match in enumerate(matches):
-                left = match.get("left")
-                right = match.get("right")
-
-                if left and left.get("name") == winner_name:
-                    winner_stage = stage_name
-                    winner_stage_index = stage_index
-                    winner_match_index = idx
-                    winner_side = "left"
-                elif right and right.get("name") == winner_name:
-                    winner_stage = stage_name
-                    winner_stage_index = stage_index
-                    winner_match_index = idx
-                    winner_side = "right"
-
-        # Now update only if we found something
-        if winner_stage is not None:
-            logger.debug(
-                f"✓ Found latest winner '{winner_name}' in stage '{winner_stage}', match index {winner_match_index}, side: {winner_side}"
+            return Response(
+                {"error": "No tournament found."},
+                status=status.HTTP_404_NOT_FOUND,
             )
 
-            updated_brackets = brackets.copy()
-            updated_match = updated_brackets[winner_stage][winner_match_index]
-            updated_match["winner"] = winner_name
-            updated_match["score"] = score_data
-
-            logger.debug(f"✔ Updated match with winner and score: {updated_match}")
-
-        logger.debug(f"updated_brackets: {updated_brackets}")
-        logger.debug(f"winner_stage: {winner_stage}")
-        logger.debug(f"winner_stage_index: {winner_stage_index}")
-        logger.debug(f"next stage index: {winner_stage_index + 1}")
+        if not tournament.record_result(winner_name, score_data, loser_name):
+            return Response(
+                {"error": "No match of this tournament between these players."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        if winner_stage == "Final":
-            tournament.winner = winner_name
-            tournament.status = "finished"
-        else:
-            logger.debug("adding winner to the next stage...")
-            matches = brackets.get(sorted_stage_names[winner_stage_index + 1], [])
-            logger.debug(f"next stage matches: {matches}")
-
-            # Find available slots (only one side is empty)
-            available_slots = []
-            for i, match in enumerate(matches):
-                if match.get("left") is None:
-                    available_slots.append((i, "left"))
-                if match.get("right") is None:
-                    available_slots.append((i, "right"))
-            logger.debug(f"available_slots: {available_slots}")
-
-            if available_slots:
-                selected_index, side = random.choice(available_slots)
-                logger.debug(
-                    f"✓ Selected random match index: {selected_index}, side: {side}"
-                )
-                updated_brackets[sorted_stage_names[winner_stage_index + 1]][
-                    selected_index
-                ][side] = {"name": winner_name}
-                logger.debug("✓ Winner inserted into next stage")
-            else:
-                logger.warning("⚠️ No available slots in next stage to insert winner")
-
-        tournament.brackets = updated_brackets
-        tournament.save()
-        logger.info(f"✓ UPDATED BRACKETS: {updated_brackets}")
         return Response(
             {
                 "id": str(tournament.id),
@@ -12,7 +12,7 @@ from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 from django.urls import path
-from project.apps.pong.consumers import PongConsumer
+from project.apps.pong.consumers import PongConsumer, SpectatorConsumer
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
 
@@ -23,6 +23,10 @@ application = ProtocolTypeRouter(
             URLRouter(
                 [
                     path("ws/pong/", PongConsumer.as_asgi()),
+                    path(
+                        "ws/pong/spectate/<str:game_id>/",
+                        SpectatorConsumer.as_asgi(),
+                    ),
                 ]
             )
         ),
@@ -0,0 +1,451 @@
+import asyncio
+import json
+import random
+import struct
+import time
+import tracemalloc
+
+import numpy as np
+from channels.layers import InMemoryChannelLayer
+from django.core.management.base import BaseCommand
+
+from project.apps.pong.consumers import PongConsumer
+from project.apps.pong.services import (
+    Ball,
+    Paddle,
+    Score,
+    GameState,
+    FrameEncoder,
+    GameReplay,
+    AiController,
+    replay_frames,
+    GameRoom,
+    OutboundQueue,
+    SendRateController,
+    encode_input,
+    join_room,
+    GAME_TICK_RATE,
+    FRAME_RATES,
+)
+from project.apps.pong.services.engine import BatchEngine
+
+
+def legacy_encode_frame(ball, paddles):
+    # Frame encoding as it was done inline in the game loop, kept as baseline
+    updated_ball = ball.get_current_ball_state()
+    payload_format = "<f f f f B f B B" + (" f f f f" * len(paddles))
+    payload_values = [
+        updated_ball["position"]["x"],
+        updated_ball["position"]["y"],
+        updated_ball["velocity"]["x"],
+        updated_ball["velocity"]["y"],
+        int(updated_ball["is_out_of_bounds"]),
+        updated_ball["curve"],
+        updated_ball["bounced_off_surface"],
+        updated_ball["hit_stop"],
+    ]
+
+    offset = struct.calcsize("<f f f f B f B B")
+    for paddle in paddles:
+        payload_values.extend(
+            [paddle.width, paddle.height, paddle.position, paddle.speed]
+        )
+        offset += struct.calcsize("<f f f f")
+
+    return struct.pack(payload_format, *payload_values)
+
+
+def create_game(paddle_count):
+    ball = Ball()
+    paddles = [
+        Paddle(name=f"paddle{i}", side="left" if i % 2 == 0 else "right")
+        for i in range(paddle_count)
+    ]
+    return ball, paddles
+
+
+def run_until_complete(coroutine):
+    # Input handlers never suspend, so drive them without an event loop
+    try:
+        coroutine.send(None)
+    except StopIteration:
+        return
+    raise RuntimeError("Coroutine suspended unexpectedly")
+
+
+def measure(func, iterations):
+    """Return (microseconds per call, transient bytes allocated per call)."""
+    func()  # warm up caches
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed / iterations * 1e6, peak - baseline
+
+
+class BenchmarkSpectator:
+    def __init__(self):
+        self.outbound = OutboundQueue(None)
+        self.channel = None
+        self.encoder = None
+
+    async def send(self, text_data=None, bytes_data=None):
+        self.outbound.put(text_data=text_data, bytes_data=bytes_data)
+
+
+class Command(BaseCommand):
+    help = "Run micro-benchmarks of the pong engine hot paths"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "scenario",
+            choices=[
+                "frames",
+                "bandwidth",
+                "input",
+                "spectators",
+                "replay",
+                "ai",
+                "memory",
+                "engine",
+            ],
+            help="Hot path to benchmark",
+        )
+        parser.add_argument("--iterations", type=int, default=100_000)
+        parser.add_argument("--paddles", type=int, default=2)
+        parser.add_argument("--ticks", type=int, default=3600)
+        parser.add_argument("--spectators", type=int, default=500)
+        parser.add_argument("--games", type=int, default=10_000)
+
+    def report(self, label, func, iterations):
+        per_call, allocated = measure(func, iterations)
+        self.stdout.write(
+            f"{label:<28} {per_call:8.3f} µs/op {allocated:8d} bytes allocated/op"
+        )
+
+    def benchmark_frames(self, iterations, paddles, **kwargs):
+        ball, paddle_list = create_game(paddles)
+        encoder = FrameEncoder(paddles)
+
+        self.stdout.write(f"Game update frame, {paddles} paddles:")
+        self.report(
+            "before: inline struct.pack",
+            lambda: legacy_encode_frame(ball, paddle_list),
+            iterations,
+        )
+        self.report(
+            "after: FrameEncoder.encode",
+            lambda: encoder.encode(0, ball, paddle_list),
+            iterations,
+        )
+
+    def benchmark_bandwidth(self, ticks, paddles, **kwargs):
+        ball, paddle_list = create_game(paddles)
+        encoder = FrameEncoder(paddles)
+        rng = random.Random(0)
+        legacy_bytes = 0
+        encoded_bytes = 0
+        send_rates = []
+        for level in range(len(FRAME_RATES)):
+            send_rates.append(SendRateController())
+            send_rates[-1].level = level
+        rate_bytes = [0] * len(send_rates)
+
+        for tick in range(ticks):
+            if tick % 20 == 0:
+                for paddle in paddle_list:
+                    paddle.set_direction(rng.choice([-1, 0, 0, 1]))
+            for paddle in paddle_list:
+                paddle.update_position()
+            ball.update_ball("demo", paddle_list, None)
+
+            legacy_bytes += len(legacy_encode_frame(ball, paddle_list))
+            frame = encoder.encode(tick, ball, paddle_list)
+            encoded_bytes += len(frame)
+            for index, send_rate in enumerate(send_rates):
+                if send_rate.should_send(tick, frame):
+                    rate_bytes[index] += len(frame)
+
+        self.stdout.write(f"Bytes per frame over {ticks} ticks, {paddles} paddles:")
+        self.stdout.write(f"before: float32 full frames   {legacy_bytes / ticks:8.2f}")
+        self.stdout.write(f"after: keyframes + deltas     {encoded_bytes / ticks:8.2f}")
+        self.stdout.write(
+            f"ratio                         {encoded_bytes / legacy_bytes:8.2%}"
+        )
+        self.stdout.write("Bytes per second sent to a client, by frame rate:")
+        for send_rate, sent in zip(send_rates, rate_bytes):
+            self.stdout.write(
+                f"{send_rate.rate} Hz                         "
+                f"{sent * GAME_TICK_RATE / ticks:8.0f}"
+            )
+
+    def benchmark_input(self, iterations, paddles, **kwargs):
+        consumer = PongConsumer()
+        _, paddle_list = create_game(paddles)
+        consumer.paddles = {paddle.name: paddle for paddle in paddle_list}
+        consumer.paddle_list = paddle_list
+
+        text_data = json.dumps(
+            {
+                "action": "update_paddle",
+                "name": "paddle0",
+                "side": "left",
+                "direction": 1,
+            }
+        )
+        bytes_data = encode_input(0, 1, 0)
+
+        self.stdout.write(f"update_paddle message handling, {paddles} paddles:")
+        self.report(
+            "before: JSON text_data",
+            lambda: run_until_complete(consumer.receive(text_data=text_data)),
+            iterations,
+        )
+        self.report(
+            "after: binary bytes_data",
+            lambda: run_until_complete(consumer.receive(bytes_data=bytes_data)),
+            iterations,
+        )
+
+    async def run_spectators(self, ticks, paddles, spectators, mode):
+        ball, paddle_list = create_game(paddles)
+        channel_layer = InMemoryChannelLayer(capacity=ticks + 1)
+        room = GameRoom(channel_layer)
+        await room.open(await channel_layer.new_channel())
+        encoder = FrameEncoder(paddles)
+
+        # Spectator consumers reduced to their outbound queue, drained at once
+        viewers = []
+        for _ in range(spectators):
+            viewer = BenchmarkSpectator()
+            if mode == "local":
+                await room.attach(viewer)
+            elif mode == "channel_layer":
+                viewer.channel = await channel_layer.new_channel()
+                await join_room(channel_layer, room.game_id, viewer.channel)
+                await room.subscribe()
+            else:
+                viewer.encoder = FrameEncoder(paddles)
+            viewers.append(viewer)
+
+        start = time.perf_counter()
+        for tick in range(ticks):
+            for paddle in paddle_list:
+                paddle.update_position()
+            ball.update_ball("demo", paddle_list, None)
+
+            if mode == "per_viewer":
+                for viewer in viewers:
+                    await viewer.send(
+                        bytes_data=viewer.encoder.encode(tick, ball, paddle_list)
+                    )
+            else:
+                frame = encoder.encode(tick, ball, paddle_list)
+                await room.publish_frame(frame, tick)
+                if mode == "channel_layer":
+                    for viewer in viewers:
+                        message = await channel_layer.receive(viewer.channel)
+                        await viewer.send(bytes_data=message["bytes"])
+
+            for viewer in viewers:
+                viewer.outbound.queue.clear()
+        return (time.perf_counter() - start) / ticks
+
+    def benchmark_spectators(self, ticks, paddles, spectators, **kwargs):
+        ticks = min(ticks, 300)
+        budget = 1 / GAME_TICK_RATE
+
+        self.stdout.write(
+            f"Spectator fan-out, {spectators} spectators, {paddles} paddles:"
+        )
+        for label, mode in [
+            ("before: encode per viewer", "per_viewer"),
+            ("after: in-memory channel layer", "channel_layer"),
+            ("after: encode once, local", "local"),
+        ]:
+            per_tick = asyncio.run(
+                self.run_spectators(ticks, paddles, spectators, mode)
+            )
+            sustainable = int(budget / (per_tick / spectators))
+            self.stdout.write(
+                f"{label:<32} {per_tick * 1e3:8.3f} ms/tick "
+                f"~{sustainable} spectators at {GAME_TICK_RATE} Hz"
+            )
+
+    def benchmark_replay(self, ticks, paddles, **kwargs):
+        seed = 0
+        ball, paddle_list = create_game(paddles)
+        ball.rng = random.Random(seed)
+        replay = GameReplay(
+            seed,
+            "demo",
+            [(paddle.name, paddle.side) for paddle in paddle_list],
+            None,
+            ball.get_state(),
+        )
+        encoder = FrameEncoder(paddles)
+        rng = random.Random(0)
+        frames = []
+
+        for tick in range(ticks):
+            if tick % 20 == 0:
+                for i, paddle in enumerate(paddle_list):
+                    direction = rng.choice([-1, 0, 0, 1])
+                    paddle.apply_input(direction, paddle.input_sequence + 1)
+                    replay.record_input(tick, i, direction, paddle.input_sequence)
+            for paddle in paddle_list:
+                paddle.update_position()
+            ball.update_ball("demo", paddle_list, None)
+            replay.ticks = tick + 1
+            frames.append(encoder.encode(tick + 1, ball, paddle_list))
+
+        data = replay.to_bytes()
+        start = time.perf_counter()
+        replayed = list(replay_frames(GameReplay.from_bytes(data)))
+        elapsed = time.perf_counter() - start
+        if replayed != frames:
+            raise RuntimeError("Replayed frames differ from the recorded game")
+
+        frame_bytes = sum(len(frame) for frame in frames)
+        self.stdout.write(f"Replay of {ticks} ticks, {paddles} paddles:")
+        self.stdout.write(f"replay file               {len(data) / 1024:10.2f} KiB")
+        self.stdout.write(f"recorded frames           {frame_bytes / 1024:10.2f} KiB")
+        self.stdout.write(f"replay time               {elapsed * 1000:10.2f} ms")
+        self.stdout.write(
+            f"speed vs real time        {ticks / GAME_TICK_RATE / elapsed:10.1f}x"
+        )
+
+    def benchmark_ai(self, ticks, paddles, **kwargs):
+        ball, paddle_list = create_game(paddles)
+        ball.rng = random.Random(0)
+        ai_controllers = [AiController(paddle, 3) for paddle in paddle_list]
+
+        decisions = 0
+        start = time.perf_counter()
+        for _ in range(ticks):
+            decision_start = time.perf_counter()
+            for ai_controller in ai_controllers:
+                ai_controller.paddle.set_direction(ai_controller.update(ball))
+            decisions += time.perf_counter() - decision_start
+            for paddle in paddle_list:
+                paddle.update_position()
+            ball.update_ball("demo", paddle_list, None)
+        simulation = time.perf_counter() - start - decisions
+
+        updates = ticks * paddles
+        self.stdout.write(f"AI paddles over {ticks} ticks, {paddles} paddles:")
+        self.stdout.write(
+            f"AI update                 {decisions / updates * 1e6:8.2f} µs"
+        )
+        self.stdout.write(
+            f"game step (ball, paddles) {simulation / ticks * 1e6:8.2f} µs"
+        )
+        self.stdout.write(
+            f"AI paddles per core at {GAME_TICK_RATE} Hz "
+            f"{1 / (decisions / updates * GAME_TICK_RATE):8.0f}"
+        )
+
+    def benchmark_memory(self, iterations, paddles, **kwargs):
+        games = 1000
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        objects = [(*create_game(paddles), Score(), GameState()) for _ in range(games)]
+        footprint, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del objects
+
+        consumer = PongConsumer()
+        consumer.game_state = GameState()
+        consumer.ball, paddle_list = create_game(paddles)
+        consumer.ball.rng = random.Random(0)
+        consumer.paddles = {paddle.name: paddle for paddle in paddle_list}
+        consumer.paddle_list = paddle_list
+        consumer.score = Score(end_score=1_000_000)
+        consumer.game_mode = "new_game"
+        consumer.outbound.is_closed = True  # drop messages, only the tick counts
+        rng = random.Random(0)
+
+        def simulate():
+            for paddle in paddle_list:
+                paddle.update_position()
+            consumer.ball.update_ball("new_game", paddle_list, consumer.score)
+
+        def tick():
+            for paddle in paddle_list:
+                paddle.set_direction(rng.choice([-1, 0, 1]))
+            run_until_complete(consumer.step())
+
+        self.stdout.write(f"Game objects and tick, {paddles} paddles:")
+        self.stdout.write(
+            f"{'footprint per game':<28} {(footprint - baseline) / games:8.0f} bytes"
+        )
+        self.report("Ball and Paddle update", simulate, iterations)
+        self.report("PongConsumer.step", tick, iterations)
+
+    def benchmark_engine(self, ticks, paddles, games, **kwargs):
+        ticks = min(ticks, 600)
+        budget = 1 / GAME_TICK_RATE
+        rng = random.Random(0)
+
+        # One game object per game; a sample is enough to time a step
+        scalar_games = []
+        for _ in range(min(games, 1000)):
+            ball, paddle_list = create_game(paddles)
+            ball.rng = rng
+            scalar_games.append((ball, paddle_list))
+
+        start = time.perf_counter()
+        for tick in range(ticks):
+            for ball, paddle_list in scalar_games:
+                if tick % 20 == 0:
+                    for paddle in paddle_list:
+                        paddle.set_direction(rng.choice([-1, 0, 0, 1]))
+                for paddle in paddle_list:
+                    paddle.update_position()
+                ball.update_ball("demo", paddle_list, None)
+        per_game = (time.perf_counter() - start) / ticks / len(scalar_games)
+
+        self.stdout.write(f"Game step over {ticks} ticks, {paddles} paddles:")
+        self.stdout.write(
+            f"{'before: Ball and Paddle':<32} {per_game * 1e6:8.3f} µs/game "
+            f"~{int(budget / per_game)} games per core at {GAME_TICK_RATE} Hz"
+        )
+
+        sides = [i % 2 for i in range(paddles)]
+        inputs_rng = np.random.default_rng(0)
+        for label, exact in [
+            (f"after: BatchEngine x{games}", True),
+            (f"after: BatchEngine x{games} fast", False),
+        ]:
+            engine = BatchEngine(
+                games,
+                sides,
+                is_demo=True,
+                has_score=False,
+                exact=exact,
+                rng=random.Random(0),
+            )
+            start = time.perf_counter()
+            for tick in range(ticks):
+                if tick % 20 == 0:
+                    engine.set_directions(
+                        inputs_rng.integers(-1, 2, size=(games, paddles))
+                    )
+                engine.step()
+            per_game = (time.perf_counter() - start) / ticks / games
+            self.stdout.write(
+                f"{label:<32} {per_game * 1e6:8.3f} µs/game "
+                f"~{int(budget / per_game)} games per core at {GAME_TICK_RATE} Hz"
+            )
+
+    def handle(self, *args, **options):
+        getattr(self, f"benchmark_{options['scenario']}")(**options)
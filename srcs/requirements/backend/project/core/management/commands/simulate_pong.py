@@ -0,0 +1,176 @@
+import logging
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from project.apps.pong.services import (
+    Ball,
+    Paddle,
+    Score,
+    AiController,
+    NEW_GAME_GAME_MODE,
+    GAME_TICK_RATE,
+    BALL_HIT_STOP_TICKS,
+    AI_DIFFICULTY_OPTIONS,
+    AI_DEFAULT_DIFFICULTY,
+)
+
+logger = logging.getLogger("game_logs")
+
+
+def simulate_match(options):
+    """Play one match headless and return its final score and rally lengths."""
+    (
+        seed,
+        ball_speed,
+        max_ball_curve,
+        end_score,
+        is_deuce_on,
+        difficulties,
+        max_ticks,
+    ) = options
+    rng = random.Random(seed)
+    ball = Ball(rng=rng)
+    ball.set_ball_speed(ball_speed)
+    ball.set_ball_max_curve_angle(max_ball_curve)
+    paddles = [Paddle("left", "left"), Paddle("right", "right")]
+    ai_controllers = [
+        AiController(paddle, difficulty, rng)
+        for paddle, difficulty in zip(paddles, difficulties)
+    ]
+    score = Score(end_score=end_score, is_deuce_on=is_deuce_on)
+
+    rallies = []
+    hits = 0
+    tick = 0
+    while tick < max_ticks and not score.winner:
+        for ai_controller in ai_controllers:
+            ai_controller.paddle.set_direction(ai_controller.update(ball))
+        for paddle in paddles:
+            paddle.update_position()
+        ball.update_ball(NEW_GAME_GAME_MODE, paddles, score)
+        tick += 1
+
+        # The hit-stop timer is only armed by a paddle hit
+        if ball.hit_stop_timer == BALL_HIT_STOP_TICKS:
+            hits += 1
+        if ball.scored:
+            rallies.append(hits)
+            hits = 0
+
+    return {
+        "winner": score.winner,
+        "left": score.left,
+        "right": score.right,
+        "ticks": tick,
+        "rallies": rallies,
+    }
+
+
+def silence_game_logs():
+    # Per-hit debug logs would dominate the run
+    logger.setLevel(logging.WARNING)
+
+
+class Command(BaseCommand):
+    help = "Run headless pong matches between AI paddles and report statistics"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--matches", type=int, default=1000)
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--ball-speed", type=int, choices=[1, 2, 3], default=2)
+        parser.add_argument("--max-ball-curve", type=int, choices=[1, 2, 3], default=2)
+        parser.add_argument("--end-score", type=int, default=11)
+        parser.add_argument("--deuce", action="store_true")
+        for side in ("left", "right"):
+            parser.add_argument(
+                f"--{side}-difficulty",
+                type=int,
+                choices=list(AI_DIFFICULTY_OPTIONS),
+                default=AI_DEFAULT_DIFFICULTY,
+            )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--max-minutes",
+            type=float,
+            default=30,
+            help="Game time after which a match is abandoned",
+        )
+
+    def handle(self, *args, **options):
+        matches = options["matches"]
+        workers = max(1, options["workers"])
+        max_ticks = int(options["max_minutes"] * 60 * GAME_TICK_RATE)
+        match_options = [
+            (
+                options["seed"] + i,
+                options["ball_speed"],
+                options["max_ball_curve"],
+                options["end_score"],
+                options["deuce"],
+                (options["left_difficulty"], options["right_difficulty"]),
+                max_ticks,
+            )
+            for i in range(matches)
+        ]
+
+        silence_game_logs()
+        start = time.perf_counter()
+        if workers == 1:
+            results = [simulate_match(match) for match in match_options]
+        else:
+            with ProcessPoolExecutor(workers, initializer=silence_game_logs) as pool:
+                chunksize = max(1, matches // (workers * 4))
+                results = list(
+                    pool.map(simulate_match, match_options, chunksize=chunksize)
+                )
+        elapsed = time.perf_counter() - start
+
+        self.report(results, elapsed, workers)
+
+    def report(self, results, elapsed, workers):
+        finished = [result for result in results if result["winner"]]
+        rallies = [hits for result in results for hits in result["rallies"]]
+        ticks = sum(result["ticks"] for result in results)
+
+        self.stdout.write(
+            f"{len(results)} matches on {workers} worker(s) in {elapsed:.2f} s"
+        )
+        self.stdout.write(f"matches per second      {len(results) / elapsed:10.1f}")
+        self.stdout.write(f"ticks per second        {ticks / elapsed:10.0f}")
+        self.stdout.write(f"abandoned matches       {len(results) - len(finished):10d}")
+        if not finished:
+            return
+
+        self.stdout.write(
+            f"match duration          "
+            f"{ticks / len(results) / GAME_TICK_RATE:10.1f} s of game time"
+        )
+        self.stdout.write(f"points                  {len(rallies):10d}")
+        self.stdout.write(
+            f"rally length            {sum(rallies) / len(rallies):10.2f} hits "
+            f"(max {max(rallies)})"
+        )
+
+        winners = Counter(result["winner"] for result in finished)
+        self.stdout.write(
+            f"left / right wins       {winners[1]:>5d} / {winners[2]:<5d}"
+        )
+
+        self.stdout.write("rally length distribution:")
+        for hits, count in sorted(Counter(rallies).items())[:15]:
+            self.stdout.write(f"  {hits:3d} hits  {count / len(rallies):7.2%}")
+
+        self.stdout.write("final score distribution:")
+        scores = Counter(
+            (max(result["left"], result["right"]), min(result["left"], result["right"]))
+            for result in finished
+        )
+        for (winner, loser), count in scores.most_common(10):
+            self.stdout.write(
+                f"  {winner:2d}-{loser:<2d}  {count / len(finished):7.2%}"
+            )
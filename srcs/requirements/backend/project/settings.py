@@ -216,11 +216,38 @@ DATABASES = {
 # ⚡ DJANGO CHANNELS (WebSockets)
 # -----------------------------------------------
 
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer",
-    },
-}
+# Game rooms are addressed through channel layer groups. The in-memory layer
+# only reaches consumers of the same process; set CHANNEL_LAYER_URL (e.g.
+# redis://redis:6379/0, served by channels-redis) to run several Daphne
+# processes that share rooms.
+CHANNEL_LAYER_URL = os.getenv("CHANNEL_LAYER_URL")
+
+if CHANNEL_LAYER_URL:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {"hosts": [CHANNEL_LAYER_URL]},
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        },
+    }
+
+# -----------------------------------------------
+# 🏓 PONG
+# -----------------------------------------------
+
+# Directory where finished games are saved as replays (disabled when unset)
+GAME_REPLAY_DIR = os.getenv("GAME_REPLAY_DIR")
+
+# Level of the game logs at startup, changed at runtime by staff from
+# /api/pong/game_logs/
+GAME_LOG_LEVEL = os.getenv(
+    "GAME_LOG_LEVEL", "DEBUG" if APP_ENV_MODE == "development" else "INFO"
+)
 
 # -----------------------------------------------
 # ⚙️ REST FRAMEWORK SETTINGS
@@ -259,11 +286,20 @@ LOGGING = {
             "class": "logging.StreamHandler",
             "formatter": "colored",
         },
+        # Filtered by the game_logs level only, so it can be lowered at runtime
+        "game_console": {
+            "class": "logging.StreamHandler",
+            "formatter": "colored",
+        },
     },
     "loggers": {
         "django": {"handlers": ["console"], "level": "INFO", "propagate": False},
         "channels": {"handlers": ["console"], "level": "DEBUG", "propagate": False},
-        "game_logs": {"handlers": ["console"], "level": "DEBUG", "propagate": False},
+        "game_logs": {
+            "handlers": ["game_console"],
+            "level": GAME_LOG_LEVEL,
+            "propagate": False,
+        },
         "auth_logs": {"handlers": ["console"], "level": "DEBUG", "propagate": False},
         "fast-reload_logs": {
             "handlers": ["console"],
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.http import HttpResponse
 from django.urls import path, include
+from project.apps.pong.views import metrics, GameLogs
 from project.apps.oauth.views import (
     SignUp,
     GetOTP,
@@ -19,6 +20,10 @@ def home(request):
 urlpatterns = [
     path("", home),
     path("admin/", admin.site.urls),
+    # monitoring, scraped by Prometheus inside the stack only
+    path("metrics/", metrics, name="metrics"),
+    # pong, staff only
+    path("api/pong/game_logs/", GameLogs.as_view(), name="game_logs"),
     # oauth
     path("api/signup/", SignUp.as_view(), name="signup"),
     path("api/otp/", GetOTP.as_view(), name="otp"),
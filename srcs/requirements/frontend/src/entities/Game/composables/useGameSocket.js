@@ -1,8 +1,25 @@
 import {
+  BALL_STATE_SIZE,
+  CONTROLLED_BY_INPUT_NAME,
   CONTROLLERS_INPUT_NAME,
   DEMO_DEFAULT_GAME_SETTINGS,
+  FRAME_INTERVAL_SIZE,
+  GAME_ERROR_MESSAGE_TYPE,
+  GAME_HEADER_SIZE,
+  GAME_PING_MESSAGE_TYPE,
+  GAME_PROTOCOL_VERSION,
+  GAME_STATE_MESSAGE_TYPE,
+  GAME_UPDATE_MESSAGE_TYPE,
+  INPUT_ACK_SIZE,
+  INPUT_MESSAGE_SIZE,
+  INPUT_PONG_OPCODE,
+  INPUT_UPDATE_PADDLE_OPCODE,
   NAME_INPUT_NAME,
+  PADDLE_FIELDS_COUNT,
+  PADDLE_STATE_SIZE,
+  POSITION_SCALE,
   SIDE_INPUT_NAME,
+  VELOCITY_SCALE,
 } from 'entities/Game/config/constants.js';
 import { isPlainObject } from 'lodash';
 import { useWebSocket } from 'shared/composables';
@@ -29,12 +46,22 @@ const useGameSocket = (url) => {
   const isBallOutOfBounds = ref(false);
   const ballCurve = ref(0);
   const ballBouncedOffSurface = ref(0);
+  const ballHitStop = ref(0);
 
   const paddleNames = ref([]);
   const paddleWidths = ref([]);
   const paddleHeights = ref([]);
   const paddlePositions = ref([]);
   const paddleSpeeds = ref([]);
+  const serverTick = ref(0);
+  // Ticks until the next frame: the server lowers the frame rate on slow links
+  const frameInterval = ref(1);
+  const paddleInputAcks = ref([]);
+  let keyframePaddles = [];
+  let keyframeAcks = [];
+  // Inputs sent but not yet acknowledged by a frame, for client-side prediction
+  let pendingInputs = [];
+  let inputSequence = 1;
 
   const gameSettings = ref(DEMO_DEFAULT_GAME_SETTINGS);
 
@@ -63,57 +90,137 @@ const useGameSocket = (url) => {
     }
 
     if (data instanceof DataView) {
-      let offset = 0;
+      if (data.byteLength < GAME_HEADER_SIZE) {
+        console.error('❌ Invalid game message: Payload too short for header', data.byteLength);
+        return;
+      }
+
+      const messageType = data.getUint8(0);
+      const version = data.getUint8(1);
+      const tick = data.getUint32(2, true);
+      let offset = GAME_HEADER_SIZE;
+
+      if (version !== GAME_PROTOCOL_VERSION) {
+        console.error(`❌ Unsupported game protocol version: ${version}`);
+        return;
+      }
 
-      const minBallStateSize = 4 * 4 + 1 + 4 + 1;
-      if (data.byteLength < minBallStateSize) {
-        console.error(
-          '❌ Invalid GAME_UPDATE_MESSAGE_TYPE: Payload too short for ball state',
-          data.byteLength
+      if (messageType === GAME_ERROR_MESSAGE_TYPE) {
+        const length = data.getUint32(offset, true);
+        offset += 4;
+        error.value = new TextDecoder().decode(
+          new Uint8Array(data.buffer, data.byteOffset + offset, length)
         );
         return;
       }
 
+      if (messageType === GAME_PING_MESSAGE_TYPE) {
+        sendPong(data.getUint16(offset, true));
+        return;
+      }
+
+      if (data.byteLength < GAME_HEADER_SIZE + FRAME_INTERVAL_SIZE + BALL_STATE_SIZE) {
+        console.error('❌ Invalid game update: Payload too short for ball state', data.byteLength);
+        return;
+      }
+
+      serverTick.value = tick;
+      frameInterval.value = data.getUint8(offset) || 1;
+      offset += FRAME_INTERVAL_SIZE;
+
       // Ball State
-      ballPositionX.value = data.getFloat32(offset, true);
-      offset += 4;
-      ballPositionY.value = data.getFloat32(offset, true);
-      offset += 4;
-      ballVelocityX.value = data.getFloat32(offset, true);
-      offset += 4;
-      ballVelocityY.value = data.getFloat32(offset, true);
-      offset += 4;
-      isBallOutOfBounds.value = data.getUint8(offset) === 1;
-      offset += 1;
-      ballCurve.value = data.getFloat32(offset, true);
-      offset += 4;
-      ballBouncedOffSurface.value = data.getUint8(offset);
+      ballPositionX.value = data.getInt16(offset, true) / POSITION_SCALE;
+      offset += 2;
+      ballPositionY.value = data.getInt16(offset, true) / POSITION_SCALE;
+      offset += 2;
+      ballVelocityX.value = data.getInt16(offset, true) / VELOCITY_SCALE;
+      offset += 2;
+      ballVelocityY.value = data.getInt16(offset, true) / VELOCITY_SCALE;
+      offset += 2;
+      ballCurve.value = data.getInt16(offset, true) / VELOCITY_SCALE;
+      offset += 2;
+      const flags = data.getUint8(offset);
       offset += 1;
+      isBallOutOfBounds.value = (flags & 0x1) === 1;
+      ballBouncedOffSurface.value = (flags >> 1) & 0x7;
+      ballHitStop.value = flags >> 4;
 
-      const paddleDataSize = 4 * 4;
-      const expectedSize = minBallStateSize + paddleNames.value.length * paddleDataSize;
+      // Paddle States: keyframes carry every field, deltas only what changed since the keyframe
+      if (messageType === GAME_STATE_MESSAGE_TYPE) {
+        const count = data.getUint8(offset);
+        offset += 1;
 
-      if (data.byteLength < expectedSize) {
-        console.error(
-          `❌ Incomplete paddle data: Expected ${expectedSize}, got ${data.byteLength}`
-        );
-        return;
-      }
+        const expectedSize = offset + count * (PADDLE_STATE_SIZE + INPUT_ACK_SIZE);
+        if (data.byteLength < expectedSize) {
+          console.error(
+            `❌ Incomplete paddle data: Expected ${expectedSize}, got ${data.byteLength}`
+          );
+          return;
+        }
 
-      // Paddle States
-      for (let i = 0; i < paddleNames.value.length; i++) {
-        paddleWidths.value[i] = data.getFloat32(offset, true);
-        offset += 4;
-        paddleHeights.value[i] = data.getFloat32(offset, true);
-        offset += 4;
-        paddlePositions.value[i] = data.getFloat32(offset, true);
-        offset += 4;
-        paddleSpeeds.value[i] = data.getFloat32(offset, true);
-        offset += 4;
+        keyframePaddles = [];
+        for (let i = 0; i < count; i++) {
+          const paddle = [];
+          for (let field = 0; field < PADDLE_FIELDS_COUNT; field++) {
+            paddle.push(data.getInt16(offset, true));
+            offset += 2;
+          }
+          keyframePaddles.push(paddle);
+        }
+        keyframeAcks = [];
+        for (let i = 0; i < count; i++) {
+          keyframeAcks.push(data.getUint16(offset, true));
+          offset += INPUT_ACK_SIZE;
+        }
+        applyPaddles(keyframePaddles);
+        applyInputAcks(keyframeAcks);
+      } else if (messageType === GAME_UPDATE_MESSAGE_TYPE) {
+        const maskOffset = offset;
+        offset += Math.ceil(keyframePaddles.length / 2);
+
+        const paddles = keyframePaddles.map((keyframePaddle, i) => {
+          const mask = (data.getUint8(maskOffset + (i >> 1)) >> (4 * (i % 2))) & 0xf;
+          return keyframePaddle.map((value, field) => {
+            if (!(mask & (1 << field))) return value;
+            const changedValue = data.getInt16(offset, true);
+            offset += 2;
+            return changedValue;
+          });
+        });
+
+        // Acks are sent as the number of inputs processed since the keyframe
+        const ackMaskOffset = offset;
+        offset += Math.ceil(keyframeAcks.length / 8);
+        const acks = keyframeAcks.map((keyframeAck, i) => {
+          if (!((data.getUint8(ackMaskOffset + (i >> 3)) >> (i % 8)) & 0x1)) return keyframeAck;
+          const ackOffset = data.getUint8(offset);
+          offset += 1;
+          return (keyframeAck + ackOffset) & 0xffff;
+        });
+        applyPaddles(paddles);
+        applyInputAcks(acks);
       }
     }
   }
 
+  function applyInputAcks(acks) {
+    paddleInputAcks.value = acks;
+    // Sequences wrap around at 16 bits: keep inputs that are newer than their paddle's ack
+    pendingInputs = pendingInputs.filter(({ paddleIndex, sequence }) => {
+      const distance = (sequence - acks[paddleIndex]) & 0xffff;
+      return distance > 0 && distance < 0x8000;
+    });
+  }
+
+  function applyPaddles(paddles) {
+    paddles.forEach(([width, height, position, speed], i) => {
+      paddleWidths.value[i] = width / POSITION_SCALE;
+      paddleHeights.value[i] = height / POSITION_SCALE;
+      paddlePositions.value[i] = position / POSITION_SCALE;
+      paddleSpeeds.value[i] = speed / VELOCITY_SCALE;
+    });
+  }
+
   const {
     socket,
     sendMessage,
@@ -134,8 +241,13 @@ const useGameSocket = (url) => {
       action: 'start',
       data: {
         ...settings,
+        // AI paddles are driven by the server
         [CONTROLLERS_INPUT_NAME]: settings[CONTROLLERS_INPUT_NAME].map(
-          ({ [SIDE_INPUT_NAME]: side, [NAME_INPUT_NAME]: name }) => ({ side, name })
+          ({
+            [SIDE_INPUT_NAME]: side,
+            [NAME_INPUT_NAME]: name,
+            [CONTROLLED_BY_INPUT_NAME]: controlledBy,
+          }) => ({ side, name, [CONTROLLED_BY_INPUT_NAME]: controlledBy?.key })
         ),
       },
     };
@@ -155,11 +267,27 @@ const useGameSocket = (url) => {
     sendMessage({ action: 'resume' });
   }
 
-  function updatePaddlePosition(data) {
-    sendMessage({
-      action: 'update_paddle',
-      ...convertObjectKeys(data, toSnakeCase),
-    });
+  function updatePaddlePosition({ name, direction }) {
+    const paddleIndex = paddleNames.value.indexOf(name);
+    if (paddleIndex === -1) return;
+
+    const message = new DataView(new ArrayBuffer(INPUT_MESSAGE_SIZE));
+    message.setUint8(0, INPUT_UPDATE_PADDLE_OPCODE);
+    message.setUint8(1, paddleIndex);
+    message.setInt8(2, direction);
+    message.setUint16(3, inputSequence, true);
+    pendingInputs.push({ paddleIndex, sequence: inputSequence, direction });
+    inputSequence = (inputSequence + 1) & 0xffff;
+
+    sendMessage(message.buffer);
+  }
+
+  function sendPong(pingId) {
+    const message = new DataView(new ArrayBuffer(INPUT_MESSAGE_SIZE));
+    message.setUint8(0, INPUT_PONG_OPCODE);
+    message.setUint16(3, pingId, true);
+
+    sendMessage(message.buffer);
   }
 
   function updateGameDimensions(data) {
@@ -169,6 +297,15 @@ const useGameSocket = (url) => {
     });
   }
 
+  // Hidden tabs render nothing: the server lets their game rest until they are shown again
+  function handleVisibilityChange() {
+    if (socket.value?.readyState !== WebSocket.OPEN) return;
+
+    sendMessage({ action: 'visibility', visible: !document.hidden });
+  }
+
+  document.addEventListener('visibilitychange', handleVisibilityChange);
+
   Object.assign(actions, {
     closeGameSocket,
     handleMessage,
@@ -182,6 +319,7 @@ const useGameSocket = (url) => {
 
   onUnmounted(() => {
     cancelAnimationFrame(animationFrameId);
+    document.removeEventListener('visibilitychange', handleVisibilityChange);
   });
 
   return {
@@ -200,11 +338,16 @@ const useGameSocket = (url) => {
     isBallOutOfBounds,
     ballCurve,
     ballBouncedOffSurface,
+    ballHitStop,
     paddleNames,
     paddleWidths,
     paddleHeights,
     paddlePositions,
     paddleSpeeds,
+    serverTick,
+    frameInterval,
+    paddleInputAcks,
+    getPendingInputs: () => pendingInputs,
     actions,
     gameSettings,
     error,
@@ -37,6 +37,20 @@ export const DEFAULT_MAX_BALL_CURVE = VELOCITY_OPTIONS[1].value;
 export const GAME_STATE_MESSAGE_TYPE = 1;
 export const GAME_UPDATE_MESSAGE_TYPE = 2;
 export const GAME_ERROR_MESSAGE_TYPE = 3;
+export const GAME_PING_MESSAGE_TYPE = 4;
+export const GAME_PROTOCOL_VERSION = 3;
+export const GAME_HEADER_SIZE = 1 + 1 + 4; // type, version, tick
+export const FRAME_INTERVAL_SIZE = 1; // ticks until the next frame, in every frame
+export const GAME_TICK_DURATION = 1000 / 60; // ms of simulation per server tick
+export const BALL_STATE_SIZE = 5 * 2 + 1; // x, y, vx, vy, curve, flags
+export const PADDLE_FIELDS_COUNT = 4; // width, height, position, speed
+export const PADDLE_STATE_SIZE = PADDLE_FIELDS_COUNT * 2;
+export const INPUT_ACK_SIZE = 2;
+export const POSITION_SCALE = 256; // 8.8 fixed point
+export const VELOCITY_SCALE = 4096; // 4.12 fixed point
+export const INPUT_UPDATE_PADDLE_OPCODE = 1;
+export const INPUT_PONG_OPCODE = 2;
+export const INPUT_MESSAGE_SIZE = 1 + 1 + 1 + 2; // opcode, paddle index, direction, sequence
 
 export const GAME_STATUS_IDLE = 1;
 export const GAME_STATUS_INIT = 2;
@@ -1,4 +0,0 @@
-export const PREDICTION_INTERVAL = 1000; // ms
-export const MOVEMENT_WINDOW = 1; // ms, defines a window in which AI may stop its paddle
-export const EARLY_STOP_BUFFER = 0.5;
-export const MAX_ERROR_FACTOR = 10; // determines an error in prediction based on ball distance from paddle
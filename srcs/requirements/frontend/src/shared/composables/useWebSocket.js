@@ -87,7 +87,8 @@ const useWebSocket = (url, options = {}) => {
 
   const sendMessage = (message) => {
     if (socketRef.value && socketRef.value.readyState === WebSocket.OPEN) {
-      socketRef.value.send(JSON.stringify(message));
+      // Binary messages are sent as is, everything else as JSON
+      socketRef.value.send(message instanceof ArrayBuffer ? message : JSON.stringify(message));
       // console.log('📤 Message sent:', message);
     } else {
       isError.value = true;